@@ -0,0 +1 @@
+"""Offline benchmarks for OpenQuantKit ingestion code paths."""
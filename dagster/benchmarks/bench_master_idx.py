@@ -0,0 +1,94 @@
+# dagster/benchmarks/bench_master_idx.py
+"""
+Benchmark the master.idx parser on a synthetic file.
+
+    python -m benchmarks.bench_master_idx --rows 300000
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from open_quant_kit.raw.raw_filing_index import parse_master_idx
+
+PREAMBLE = (
+    "Description:           Master Index of EDGAR Dissemination Feed\n"
+    "Last Data Received:    March 31, 2024\n"
+    "Comments:              webmaster@sec.gov\n"
+    "Anonymous FTP:         ftp://ftp.sec.gov/edgar/\n"
+    "\n\n\n"
+    "CIK|Company Name|Form Type|Date Filed|Filename\n"
+    "--------------------------------------------------------------------------------\n"
+)
+FORM_TYPES = ["10-K", "10-Q", "8-K", "4", "3", "SC 13G", "S-1", "424B2", "D"]
+
+
+def make_master_idx(rows: int, year: int = 2024, quarter: int = 1, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    first_month = 3 * (quarter - 1) + 1
+    lines = [PREAMBLE]
+    for i in range(rows):
+        cik = rng.randint(1000, 2_000_000)
+        date = f"{year}-{first_month + rng.randint(0, 2):02d}-{rng.randint(1, 28):02d}"
+        accession = f"{cik:010d}-{year % 100:02d}-{i:06d}"
+        lines.append(f"{cik}|Company {cik} Inc|{rng.choice(FORM_TYPES)}|{date}|edgar/data/{cik}/{accession}.txt\n")
+    return "".join(lines).encode("latin-1")
+
+
+def parse_master_idx_rowwise(data: bytes) -> pd.DataFrame:
+    """The previous per-line parser, kept here as the baseline."""
+    lines = data.decode("latin-1").splitlines()
+    start_index = next(i for i, line in enumerate(lines) if line.startswith("CIK|"))
+    rows = []
+    for line in lines[start_index + 1:]:
+        parts = line.split("|")
+        if len(parts) == 5:
+            cik, name, form_type, date_filed, filename = parts
+            date_parsed = pd.to_datetime(date_filed, errors="coerce")
+            if pd.isna(date_parsed):
+                continue
+            rows.append({
+                "cik": str(cik).zfill(10),
+                "company_name": name,
+                "form_type": form_type,
+                "date_filed": date_parsed.date(),
+                "filename": filename,
+                "year": date_parsed.year,
+                "quarter": (date_parsed.month - 1) // 3 + 1,
+            })
+    return pd.DataFrame(rows)
+
+
+def _time(fn, data: bytes, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(fn(data))
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-baseline", action="store_true", help="only time the columnar parser")
+    args = parser.parse_args()
+
+    data = make_master_idx(args.rows)
+    print(f"Synthetic master.idx: {args.rows} rows, {len(data) / 1e6:.1f} MB")
+
+    seconds, rows = _time(parse_master_idx, data, args.repeat)
+    print(f"columnar : {seconds:8.3f}s  {rows / seconds:12,.0f} rows/s")
+
+    if not args.skip_baseline:
+        baseline, baseline_rows = _time(parse_master_idx_rowwise, data, 1)
+        print(f"row-wise : {baseline:8.3f}s  {baseline_rows / baseline:12,.0f} rows/s")
+        print(f"speedup  : {baseline / seconds:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# dagster/benchmarks/fakes.py
+"""
+Local stand-ins for sec.gov and Yahoo Finance, so ingestion can be benchmarked
+offline and reproducibly.
+"""
+
+import hashlib
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from open_quant_kit.raw.raw_price import PRICE_COLUMNS
+from .bench_master_idx import make_master_idx
+
+HISTORY_START = "2015-01-01"
+_WORDS = (
+    "revenue income assets liabilities equity cash operating segment quarter fiscal net "
+    "shares market risk interest tax expense goodwill lease debt dividend capital"
+).split()
+
+
+def _make_corpus(size: int = 1 << 20, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(_WORDS) if rng.random() < 0.8 else f"{rng.randint(0, 10 ** 6):,}"
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+_CORPUS = _make_corpus()
+
+
+def make_filing_body(accession: str, size: int) -> bytes:
+    """
+    SGML-like text of roughly `size` bytes, compressing about as well as a real
+    filing. Bodies are slices of a shared corpus so that serving them costs the
+    fake server (which shares the benchmark's process) next to no CPU.
+    """
+    header = (
+        f"<SEC-DOCUMENT>{accession}.txt\n<SEC-HEADER>\nACCESSION NUMBER:\t\t{accession}\n"
+        f"CONFORMED SUBMISSION TYPE:\t10-K\n</SEC-HEADER>\n<DOCUMENT>\n<TYPE>10-K\n<TEXT>\n"
+    )
+    start = int(hashlib.md5(accession.encode("utf-8")).hexdigest()[:8], 16) % len(_CORPUS)
+    text = (_CORPUS[start:] + " " + _CORPUS)[:max(size - len(header), 0)]
+    return (header + text + "\n</TEXT>\n</DOCUMENT>\n</SEC-DOCUMENT>\n").encode("latin-1")
+
+
+class _EdgarHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        edgar = self.server.edgar
+        if edgar.latency:
+            time.sleep(edgar.latency)
+
+        body = edgar.body_for(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        with edgar.lock:
+            edgar.requests += 1
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", edgar.last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeEdgarServer:
+    """
+    Threaded HTTP server answering EDGAR archive paths with generated data:
+    full-index master.idx files of `index_rows` rows and filing bodies of
+    `filing_bytes` bytes, each after `latency` seconds.
+
+        with FakeEdgarServer(index_rows=20_000) as edgar:
+            raw_filing_index.SEC_ARCHIVES_URL = edgar.archives_url
+    """
+
+    def __init__(self, index_rows: int = 20_000, filing_bytes: int = 50_000, latency: float = 0.0):
+        self.index_rows = index_rows
+        self.filing_bytes = filing_bytes
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.last_modified = formatdate(usegmt=True)
+        self._indexes: dict[tuple[int, int], bytes] = {}
+        self._server = None
+        self._thread = None
+
+    @property
+    def archives_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/Archives"
+
+    def master_idx(self, year: int, quarter: int) -> bytes:
+        with self.lock:
+            if (year, quarter) not in self._indexes:
+                self._indexes[year, quarter] = make_master_idx(self.index_rows, year, quarter, seed=year * 10 + quarter)
+            return self._indexes[year, quarter]
+
+    def body_for(self, path: str) -> bytes | None:
+        parts = path.strip("/").split("/")
+        if parts[:3] == ["Archives", "edgar", "full-index"] and len(parts) == 6 and parts[5] == "master.idx":
+            return self.master_idx(int(parts[3]), int(parts[4].removeprefix("QTR")))
+        if parts[:3] == ["Archives", "edgar", "data"] and parts[-1].endswith(".txt"):
+            return make_filing_body(parts[-1].removesuffix(".txt"), self.filing_bytes)
+        return None
+
+    def start(self) -> "FakeEdgarServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _EdgarHandler)
+        self._server.daemon_threads = True
+        self._server.edgar = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeEdgarServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def synthetic_tickers(count: int) -> list[str]:
+    return [f"T{i:05d}" for i in range(count)]
+
+
+def synthetic_prices(ticker: str, start, end) -> pd.DataFrame:
+    """Deterministic business-day random walk for `ticker` on [start, end)."""
+    dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+    seed = int(hashlib.md5(ticker.encode("utf-8")).hexdigest()[:8], 16)
+    rng = np.random.default_rng(seed)
+    # Index the walk by business days since HISTORY_START so incremental windows line up
+    offset = max(len(pd.bdate_range(HISTORY_START, dates[0])) - 1, 0) if len(dates) else 0
+    steps = rng.normal(0.0003, 0.02, offset + len(dates))[offset:]
+    close = 50 * np.exp(np.cumsum(steps))
+    spread = np.abs(rng.normal(0, 0.01, len(dates)))
+    return pd.DataFrame({
+        "Open": close * (1 - spread / 2),
+        "High": close * (1 + spread),
+        "Low": close * (1 - spread),
+        "Close": close,
+        "Volume": rng.integers(10_000, 5_000_000, len(dates)),
+    }, index=dates)
+
+
+def make_yf_download(latency: float = 0.0, history_start: str = HISTORY_START):
+    """A stand-in for yf.download(tickers=..., start=/period=..., end=...) on a single ticker."""
+
+    def download(tickers, end, start=None, period=None, **kwargs) -> pd.DataFrame:
+        if latency:
+            time.sleep(latency)
+        return synthetic_prices(tickers, start if start is not None else history_start, end)
+
+    return download
+
+
+def make_price_fetcher(latency: float = 0.0, history_start: str = HISTORY_START):
+    """A PriceFetcher for run_raw_price_ingestion_batched; one simulated round trip per batch."""
+
+    def fetcher(tickers: list[str], start_date, end_date) -> pd.DataFrame:
+        if latency:
+            time.sleep(latency)
+        start = start_date if start_date is not None else history_start
+        end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+        frames = []
+        for ticker in tickers:
+            df = synthetic_prices(ticker, start, end).reset_index()
+            df.columns = [str(c).lower() for c in df.columns]
+            df["ticker"] = ticker
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)[PRICE_COLUMNS]
+
+    return fetcher
@@ -0,0 +1,159 @@
+# dagster/benchmarks/harness.py
+"""Timing, memory and result-file helpers shared by the benchmarks."""
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Iterable
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+@dataclass
+class CaseResult:
+    name: str
+    units: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+    rows_per_second: float = 0.0
+    latency_ms: dict = field(default_factory=dict)
+    peak_memory_mb: float | None = None
+    max_rss_mb: float | None = None
+    error: str | None = None
+
+    def summary(self) -> str:
+        if self.error:
+            return f"{self.name:<28} ERROR {self.error}"
+        latency = self.latency_ms
+        memory = f"peak {self.peak_memory_mb:8.1f} MB" if self.peak_memory_mb is not None else ""
+        return (f"{self.name:<28} {self.rows:>10,} rows {self.seconds:8.2f}s {self.rows_per_second:>12,.0f} rows/s  "
+                f"p50 {latency['p50']:8.1f}ms  p95 {latency['p95']:8.1f}ms  p99 {latency['p99']:8.1f}ms  "
+                f"rss {self.max_rss_mb:8.1f} MB  {memory}")
+
+
+def _percentiles(latencies: list[float]) -> dict:
+    ms = np.asarray(latencies) * 1000
+    return {
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "p99": float(np.percentile(ms, 99)),
+        "max": float(ms.max()),
+    }
+
+
+def _max_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def run_case(name: str, calls: Iterable[Callable[[], int]], trace_memory: bool = False) -> CaseResult:
+    """
+    Time each unit of work in `calls` (each returns the rows it processed).
+    Latency percentiles are over units. max_rss_mb is the process high-water
+    mark after the case; with `trace_memory`, peak_memory_mb is the tracemalloc
+    peak of the case's own allocations, at a noticeable cost in speed.
+    """
+    latencies = []
+    rows = 0
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        for call in calls:
+            unit_start = time.perf_counter()
+            rows += call() or 0
+            latencies.append(time.perf_counter() - unit_start)
+    except Exception as e:
+        return CaseResult(name=name, error=f"{type(e).__name__}: {e}")
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+    if not latencies:
+        return CaseResult(name=name, error="no units of work")
+    return CaseResult(
+        name=name,
+        units=len(latencies),
+        rows=rows,
+        seconds=seconds,
+        rows_per_second=rows / seconds if seconds else 0.0,
+        latency_ms=_percentiles(latencies),
+        peak_memory_mb=peak / 1024 ** 2 if peak is not None else None,
+        max_rss_mb=_max_rss_mb(),
+    )
+
+
+def child_max_rss_mb() -> float:
+    """High-water RSS of the largest finished child process (e.g. dbt), in MB."""
+    return _max_rss_mb(resource.RUSAGE_CHILDREN)
+
+
+@contextmanager
+def disposable_database(admin_url: str):
+    """Create a throwaway database on the server behind `admin_url`; yields its URL and drops it on exit."""
+    admin = create_engine(admin_url.replace("postgres://", "postgresql://"), isolation_level="AUTOCOMMIT")
+    name = f"oqk_bench_{uuid.uuid4().hex[:8]}"
+    with admin.connect() as conn:
+        conn.execute(text(f"CREATE DATABASE {name}"))
+    try:
+        yield make_url(admin.url).set(database=name).render_as_string(hide_password=False)
+    finally:
+        with admin.connect() as conn:
+            conn.execute(text(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)"))
+        admin.dispose()
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results: list[CaseResult], params: dict, out_dir: str = RESULTS_DIR) -> str:
+    created_at = datetime.now(timezone.utc)
+    document = {
+        "created_at": created_at.isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": params,
+        "cases": [asdict(r) for r in results],
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"bench-{created_at:%Y%m%dT%H%M%SZ}.json")
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def compare_results(results: list[CaseResult], baseline_path: str) -> list[str]:
+    """One line per case present in both runs: throughput and p95 change against the baseline file."""
+    with open(baseline_path, "r") as f:
+        baseline = {case["name"]: case for case in json.load(f)["cases"]}
+
+    lines = []
+    for result in results:
+        before = baseline.get(result.name)
+        if result.error or not before or before.get("error"):
+            continue
+        throughput = (result.rows_per_second / before["rows_per_second"] - 1) * 100 if before["rows_per_second"] else 0
+        p95 = (result.latency_ms["p95"] / before["latency_ms"]["p95"] - 1) * 100 if before["latency_ms"]["p95"] else 0
+        lines.append(f"{result.name:<28} rows/s {throughput:+7.1f}%   p95 {p95:+7.1f}%")
+    return lines
@@ -1,13 +1,10 @@
 -- macros/if_table_exists.sql
+-- Looks the relation up in dbt's relation cache, filled once per invocation for the
+-- schemas dbt manages, instead of issuing one catalog query per call.
 {% macro if_table_exists(schema, table) %}
-  {% set query %}
-    select to_regclass('{{ schema }}.{{ table }}') is not null as exists
-  {% endset %}
-  {% set result = run_query(query) %}
-  {% if execute %}
-    {% set exists = result.columns[0].values()[0] %}
-    {{ return(exists) }}
-  {% else %}
+  {% if not execute %}
     {{ return(false) }}
   {% endif %}
+  {% set relation = adapter.get_relation(database=target.database, schema=schema, identifier=table) %}
+  {{ return(relation is not none) }}
 {% endmacro %}
@@ -1,12 +1,106 @@
 -- models/fct/fct_ticker_data_quality.sql
 
-WITH base AS (
+-- dim_ticker is only referenced in incremental runs, so declare it for parsing
+-- depends_on: {{ ref('dim_ticker') }}
+
+-- Incremental: each run only scans raw_price rows newer than a ticker's stored
+-- last_date (plus full history for tickers seen for the first time) and folds
+-- them into mergeable running aggregates (count, sum, sum of squares, gaps).
+-- Tickers whose raw_price history was rewritten in place since they were
+-- aggregated (raw_price_basis.updated_at moved, e.g. the one-time refetch of
+-- adjusted history as traded prices) are rebuilt from their full history.
+-- Run with --full-refresh to rebuild everything from scratch.
+
+{{ config(
+    materialized='incremental',
+    unique_key='ticker',
+    on_schema_change='append_new_columns',
+) }}
+
+{#- Tables built before basis_updated_at existed count as built against no basis -#}
+{% set stored_basis = 'NULL::timestamp' %}
+{% if execute and is_incremental() %}
+    {% set stored_columns = adapter.get_columns_in_relation(this) | map(attribute='name') | list %}
+    {% if 'basis_updated_at' in stored_columns %}
+        {% set stored_basis = 't.basis_updated_at' %}
+    {% endif %}
+{% endif %}
+
+WITH prev AS (
+{% if is_incremental() %}
+    -- Rewritten tickers are left out, so the new-ticker branch below rebuilds them
+    SELECT
+        t.ticker,
+        t.first_date,
+        t.last_date,
+        t.num_data_points,
+        t.num_zero_close,
+        t.sum_close,
+        t.sum_sq_close,
+        t.largest_gap_days,
+        t.num_gaps_gt_3_days,
+        t.num_gaps_gt_5_days,
+        t.num_unique_days,
+        t.num_weekdays,
+        t.num_duplicate_dates
+    FROM {{ this }} t
+    LEFT JOIN {{ source('market_data', 'raw_price_basis') }} b ON b.ticker = t.ticker
+    WHERE b.updated_at IS NOT DISTINCT FROM {{ stored_basis }}
+{% else %}
+    SELECT
+        NULL::text AS ticker,
+        NULL::date AS first_date,
+        NULL::date AS last_date,
+        NULL::bigint AS num_data_points,
+        NULL::bigint AS num_zero_close,
+        NULL::numeric AS sum_close,
+        NULL::numeric AS sum_sq_close,
+        NULL::integer AS largest_gap_days,
+        NULL::bigint AS num_gaps_gt_3_days,
+        NULL::bigint AS num_gaps_gt_5_days,
+        NULL::bigint AS num_unique_days,
+        NULL::bigint AS num_weekdays,
+        NULL::bigint AS num_duplicate_dates
+    WHERE FALSE
+{% endif %}
+),
+
+base AS (
+{% if is_incremental() %}
+    -- Known tickers: rows after their stored last_date. The constant lower bound
+    -- lets the planner use the date index / partition pruning on raw_price.
+    SELECT
+        r.ticker,
+        r.date::date AS date,
+        r.close
+    FROM {{ source('market_data', 'raw_price') }} r
+    JOIN prev p ON p.ticker = r.ticker
+    WHERE r.close IS NOT NULL
+      AND r.date > p.last_date
+      AND r.date > (SELECT MIN(last_date) FROM prev)
+
+    UNION ALL
+
+    -- New tickers: full history, looked up by ticker
+    SELECT
+        r.ticker,
+        r.date::date AS date,
+        r.close
+    FROM {{ source('market_data', 'raw_price') }} r
+    WHERE r.close IS NOT NULL
+      AND r.ticker IN (
+          SELECT symbol FROM {{ ref('dim_ticker') }}
+          EXCEPT
+          SELECT ticker FROM prev
+      )
+{% else %}
     SELECT
         ticker,
         date::date,
         close
     FROM {{ source('market_data', 'raw_price') }}
     WHERE close IS NOT NULL
+{% endif %}
 ),
 
 deduped AS (
@@ -14,14 +108,15 @@ deduped AS (
     FROM base
 ),
 
-per_ticker AS (
+delta_per_ticker AS (
     SELECT
         ticker,
         MIN(date) AS first_date,
         MAX(date) AS last_date,
         COUNT(*) AS num_data_points,
         COUNT(*) FILTER (WHERE close <= 1e-5) AS num_zero_close,
-        STDDEV(close) AS std_close,
+        SUM(close::numeric) AS sum_close,
+        SUM(close::numeric * close::numeric) AS sum_sq_close,
         COUNT(*) - COUNT(DISTINCT date) AS num_duplicate_dates
     FROM base
     GROUP BY ticker
@@ -35,7 +130,7 @@ calendar_gaps AS (
     FROM deduped
 ),
 
-gap_stats AS (
+delta_gap_stats AS (
     SELECT
         ticker,
         MAX((next_date - date) - 1) AS largest_gap_days,
@@ -50,7 +145,7 @@ gap_stats AS (
     GROUP BY ticker
 ),
 
-weekday_coverage AS (
+delta_weekday_coverage AS (
     SELECT
         ticker,
         COUNT(DISTINCT date) AS num_unique_days,
@@ -59,25 +154,116 @@ weekday_coverage AS (
     GROUP BY ticker
 ),
 
-joined AS (
+changed AS (
+    -- Fold the delta into the stored aggregates; the gap between the stored
+    -- last_date and the first new date is the only gap spanning both sides.
+    SELECT
+        d.ticker,
+        d.first_date,
+        d.last_date,
+        d.num_data_points,
+        d.num_zero_close,
+        d.sum_close,
+        d.sum_sq_close,
+        g.largest_gap_days,
+        g.num_gaps_gt_3_days,
+        g.num_gaps_gt_5_days,
+        w.num_unique_days,
+        w.num_weekdays,
+        d.num_duplicate_dates,
+        p.ticker IS NOT NULL AS has_prev,
+        p.first_date AS prev_first_date,
+        p.num_data_points AS prev_num_data_points,
+        p.num_zero_close AS prev_num_zero_close,
+        p.sum_close AS prev_sum_close,
+        p.sum_sq_close AS prev_sum_sq_close,
+        p.largest_gap_days AS prev_largest_gap_days,
+        p.num_gaps_gt_3_days AS prev_num_gaps_gt_3_days,
+        p.num_gaps_gt_5_days AS prev_num_gaps_gt_5_days,
+        p.num_unique_days AS prev_num_unique_days,
+        p.num_weekdays AS prev_num_weekdays,
+        p.num_duplicate_dates AS prev_num_duplicate_dates,
+        (d.first_date - p.last_date) - 1 AS boundary_gap_days
+    FROM delta_per_ticker d
+    LEFT JOIN delta_gap_stats g ON d.ticker = g.ticker
+    LEFT JOIN delta_weekday_coverage w ON d.ticker = w.ticker
+    LEFT JOIN prev p ON d.ticker = p.ticker
+),
+
+aggregates AS (
+    SELECT
+        ticker,
+        COALESCE(prev_first_date, first_date) AS first_date,
+        last_date,
+        COALESCE(prev_num_data_points, 0) + num_data_points AS num_data_points,
+        COALESCE(prev_num_zero_close, 0) + num_zero_close AS num_zero_close,
+        COALESCE(prev_sum_close, 0) + sum_close AS sum_close,
+        COALESCE(prev_sum_sq_close, 0) + sum_sq_close AS sum_sq_close,
+        GREATEST(prev_largest_gap_days, largest_gap_days, boundary_gap_days) AS largest_gap_days,
+        CASE WHEN has_prev OR largest_gap_days IS NOT NULL THEN
+            COALESCE(prev_num_gaps_gt_3_days, 0) + COALESCE(num_gaps_gt_3_days, 0)
+                + (COALESCE(boundary_gap_days, 0) > 3)::int
+        END AS num_gaps_gt_3_days,
+        CASE WHEN has_prev OR largest_gap_days IS NOT NULL THEN
+            COALESCE(prev_num_gaps_gt_5_days, 0) + COALESCE(num_gaps_gt_5_days, 0)
+                + (COALESCE(boundary_gap_days, 0) > 5)::int
+        END AS num_gaps_gt_5_days,
+        COALESCE(prev_num_unique_days, 0) + num_unique_days AS num_unique_days,
+        COALESCE(prev_num_weekdays, 0) + num_weekdays AS num_weekdays,
+        COALESCE(prev_num_duplicate_dates, 0) + num_duplicate_dates AS num_duplicate_dates
+    FROM changed
+
+{% if is_incremental() %}
+    UNION ALL
+
+    -- Untouched tickers are carried over so has_recent_data stays current
     SELECT
         p.ticker,
         p.first_date,
         p.last_date,
-        (p.last_date - p.first_date) + 1 AS data_duration_days,
         p.num_data_points,
-        ROUND(p.num_data_points::numeric / NULLIF((p.last_date - p.first_date) + 1, 0), 3) AS completeness_ratio,
-        g.largest_gap_days,
-        g.num_gaps_gt_3_days,
-        g.num_gaps_gt_5_days,
-        ROUND(p.std_close::numeric, 5) AS std_close,
         p.num_zero_close,
-        ROUND(w.num_unique_days::numeric / NULLIF((p.last_date - p.first_date) + 1, 0), 3) AS weekday_coverage,
-        (p.last_date >= CURRENT_DATE - INTERVAL '1 day') AS has_recent_data,
+        p.sum_close,
+        p.sum_sq_close,
+        p.largest_gap_days,
+        p.num_gaps_gt_3_days,
+        p.num_gaps_gt_5_days,
+        p.num_unique_days,
+        p.num_weekdays,
         p.num_duplicate_dates
-    FROM per_ticker p
-    LEFT JOIN gap_stats g ON p.ticker = g.ticker
-    LEFT JOIN weekday_coverage w ON p.ticker = w.ticker
+    FROM prev p
+    WHERE NOT EXISTS (SELECT 1 FROM delta_per_ticker d WHERE d.ticker = p.ticker)
+{% endif %}
+),
+
+joined AS (
+    SELECT
+        a.ticker,
+        a.first_date,
+        a.last_date,
+        (a.last_date - a.first_date) + 1 AS data_duration_days,
+        a.num_data_points,
+        ROUND(a.num_data_points::numeric / NULLIF((a.last_date - a.first_date) + 1, 0), 3) AS completeness_ratio,
+        a.largest_gap_days,
+        a.num_gaps_gt_3_days,
+        a.num_gaps_gt_5_days,
+        CASE WHEN a.num_data_points > 1 THEN
+            ROUND(SQRT(GREATEST(
+                (a.sum_sq_close - a.sum_close * a.sum_close / a.num_data_points) / (a.num_data_points - 1),
+                0
+            )), 5)
+        END AS std_close,
+        a.num_zero_close,
+        ROUND(a.num_unique_days::numeric / NULLIF((a.last_date - a.first_date) + 1, 0), 3) AS weekday_coverage,
+        (a.last_date >= CURRENT_DATE - INTERVAL '1 day') AS has_recent_data,
+        a.num_duplicate_dates,
+        a.sum_close,
+        a.sum_sq_close,
+        a.num_unique_days,
+        a.num_weekdays,
+        b.updated_at AS basis_updated_at
+    FROM aggregates a
+    LEFT JOIN {{ source('market_data', 'raw_price_basis') }} b ON b.ticker = a.ticker
 )
 
 SELECT * FROM joined
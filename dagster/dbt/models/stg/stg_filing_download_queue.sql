@@ -1,39 +1,116 @@
+-- models/stg/stg_filing_download_queue.sql
+
+-- Incremental, accession-keyed queue of 10-K/10-Q filings for known tickers.
+-- Each run only appends index rows loaded since the last run; rows stay in the
+-- queue after download and consumers skip those already in raw_filing.
+-- CIKs that dim_cik gained or remapped since the last run (per dim_change_log)
+-- also bring in their earlier filings.
+-- loaded_at and changed_at are transaction start times, so a quarter load still
+-- running when this model builds commits rows stamped before the new watermark.
+-- Both filters therefore look back a day behind it; the (ticker, accession) key
+-- makes re-selected rows idempotent.
+-- Reads the normalized sec_filing_index directly (rather than the raw_filing_index
+-- view) so the form filter and the dim_cik join run on integer keys.
+
+{{ config(
+    materialized='incremental',
+    unique_key=['ticker', 'accession'],
+    indexes=[
+        {'columns': ['ticker', 'accession'], 'unique': True},
+        {'columns': ['index_loaded_at']},
+    ],
+) }}
+
 {% set raw_filing_exists = if_table_exists('public', 'raw_filing') %}
+{% set dim_change_log_exists = if_table_exists('public', 'dim_change_log') %}
+{% set watermark_lookback = "interval '1 day'" %}
+
+with periodic_forms as (
+  -- 10-K and 10-Q have pinned ids (PERIODIC_FORM_TYPE_IDS); naming them as literals
+  -- lets the planner use the partial index on sec_filing_index
+  select form_type_id, form_type
+  from {{ source('sec_data', 'sec_form_type') }}
+  where form_type_id in (1, 2)
+),
+
+{% if is_incremental() %}
+watermark as (
+  select coalesce(max(index_loaded_at), '-infinity'::timestamp) - {{ watermark_lookback }} as since
+  from {{ this }}
+),
+{% endif %}
 
-with filings as (
-  select *
-  from {{ source('sec_data', 'raw_filing_index') }}
-  where form_type in ('10-K', '10-Q')
+filings as (
+  select
+    f.cik,
+    f.accession,
+    p.form_type,
+    f.date_filed,
+    f.filename_override,
+    f.loaded_at
+  from {{ source('sec_data', 'sec_filing_index') }} f
+  join periodic_forms p on p.form_type_id = f.form_type_id
+  where f.form_type_id in (1, 2)
+  {% if is_incremental() %}
+  and (
+      f.loaded_at >= (select since from watermark)
+      {% if dim_change_log_exists %}
+      or f.cik in (
+        select (l.row_data ->> 'cik')::int
+        from {{ source('sec_data', 'dim_change_log') }} l
+        where l.table_name = 'dim_cik'
+          and l.change in ('insert', 'update')
+          and l.changed_at >= (select since from watermark)
+      )
+      {% endif %}
+    )
+  {% endif %}
 ),
 
 ciks as (
-  select *
+  select ticker, cik, cik::int as cik_id
   from {{ source('sec_data', 'dim_cik') }}
-)
+),
 
-{% if raw_filing_exists %}
-, raw as (
-  select *
-  from {{ source('sec_data', 'raw_filing') }}
+queue as (
+  select
+    c.ticker,
+    c.cik,
+    sec_accession_text(f.accession) as accession,
+    f.accession as accession_id,
+    f.form_type,
+    f.date_filed,
+    extract(year from f.date_filed)::int as year,
+    extract(quarter from f.date_filed)::int as quarter,
+    coalesce(
+      f.filename_override,
+      'edgar/data/' || f.cik || '/' || sec_accession_text(f.accession) || '.txt'
+    ) as filename,
+    f.loaded_at
+  from filings f
+  join ciks c on f.cik = c.cik_id
 )
-{% endif %}
 
-select
-  c.ticker,
-  f.cik,
-  f.form_type,
-  f.date_filed,
-  f.year,
-  f.quarter,
-  f.filename,
-  'https://www.sec.gov/Archives/' || f.filename as full_url
-from filings f
-join ciks c on f.cik = c.cik
+select distinct on (q.ticker, q.accession_id)
+  q.ticker,
+  q.cik,
+  q.accession,
+  q.form_type,
+  q.date_filed,
+  q.year,
+  q.quarter,
+  q.filename,
+  'https://www.sec.gov/Archives/' || q.filename as full_url,
+  q.loaded_at as index_loaded_at
+from queue q
 
 {% if raw_filing_exists %}
-left join raw r
-  on c.ticker = r.ticker
-  and f.form_type = r.form_type
-  and f.date_filed = r.filing_date
-where r.ticker is null
+where not exists (
+  select 1
+  from {{ source('sec_data', 'raw_filing') }} r
+  where r.ticker = q.ticker
+    and r.accession = q.accession
+)
 {% endif %}
+
+order by q.ticker, q.accession_id, q.date_filed
@@ -1,6 +1,10 @@
 # List of assets
 from .dbt import open_quant_kit_dbt_assets
 from .dim.dim_cik import dim_cik
+from .fct.fct_filing_financials import fct_filing_financials
+from .fct.fct_filing_search import fct_filing_search
+from .fct.fct_price_features import fct_price_features
+from .lake.parquet_lake import parquet_lake
 from .raw.raw_filing import raw_filing
 from .raw.raw_filing_index import raw_filing_index
 from .raw.raw_price import raw_price
@@ -11,4 +15,8 @@ assets = [
     dim_cik,
     raw_filing_index,
     raw_filing,
+    parquet_lake,
+    fct_price_features,
+    fct_filing_financials,
+    fct_filing_search,
 ]
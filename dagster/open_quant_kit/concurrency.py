@@ -0,0 +1,64 @@
+# dagster/open_quant_kit/concurrency.py
+
+import os
+
+from dagster import DagsterInstance, multiprocess_executor
+
+# One pool per external rate budget plus one for Postgres-bound work. Every asset
+# claims a slot in exactly one pool for the duration of its step.
+SEC_POOL = "sec"
+# raw_filing_index makes a handful of requests per quarter: its partitions get their
+# own pool so they neither queue behind raw_filing and the archive backfill nor block them
+SEC_INDEX_POOL = "sec_index"
+YAHOO_POOL = "yahoo"
+POSTGRES_POOL = "postgres"
+
+# Each step process opens up to PG_POOL_SIZE + PG_MAX_OVERFLOW connections (12 by
+# default), so the sum of these limits bounds the connections held by Dagster steps.
+# SEC allows ~10 requests/s per client and raw_filing alone uses SEC_REQUESTS_PER_SECOND,
+# so bulk SEC downloads run one step at a time.
+POOL_LIMITS = {
+    SEC_POOL: int(os.getenv("OQK_SEC_CONCURRENCY", "1")),
+    SEC_INDEX_POOL: int(os.getenv("OQK_SEC_INDEX_CONCURRENCY", "2")),
+    YAHOO_POOL: int(os.getenv("OQK_YAHOO_CONCURRENCY", "2")),
+    POSTGRES_POOL: int(os.getenv("OQK_POSTGRES_CONCURRENCY", "3")),
+}
+MAX_CONCURRENT_STEPS = sum(POOL_LIMITS.values())
+
+# Op tag the multiprocess executor limits on within a single run
+SOURCE_TAG = "open_quant_kit/source"
+
+
+def source_tags(pool: str) -> dict[str, str]:
+    """Op tags putting an asset's step under its pool's in-run limit."""
+    return {SOURCE_TAG: pool}
+
+
+# In-run limits: also hold under `dagster dev` or an instance without pool limits
+oqk_executor = multiprocess_executor.configured(
+    {
+        "max_concurrent": MAX_CONCURRENT_STEPS,
+        "tag_concurrency_limits": [
+            {"key": SOURCE_TAG, "value": pool, "limit": limit}
+            for pool, limit in POOL_LIMITS.items()
+        ],
+    },
+    name="oqk_multiprocess_executor",
+)
+
+
+def apply_pool_limits(instance: DagsterInstance | None = None, logger=print) -> None:
+    """
+    Set the instance-wide pool limits, which bound steps across runs: each
+    raw_price shard and raw_filing_index quarter is its own run.
+    """
+    instance = instance or DagsterInstance.get()
+    for pool, limit in POOL_LIMITS.items():
+        instance.event_log_storage.set_concurrency_slots(pool, limit)
+        logger(f"[INFO] Pool {pool}: {limit} concurrent steps")
+
+
+# CLI entrypoint
+if __name__ == "__main__":
+    apply_pool_limits()
+    print("[DONE] Concurrency pools configured")
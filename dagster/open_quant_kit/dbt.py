@@ -1,21 +1,107 @@
 import os
 
-from dagster_dbt import DagsterDbtTranslator, DbtCliResource, dbt_assets
+from dagster_dbt import DbtCliResource, dbt_assets
 
 import dagster
+from dagster import AssetKey, Config
 
-# Define paths as constants
-DBT_PROJECT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../dbt'))
-DBT_PROFILES = os.path.join(DBT_PROJECT_PATH, "config")
-MANIFEST_PATH = os.path.join(DBT_PROJECT_PATH, "target/manifest.json")
+from .concurrency import POSTGRES_POOL, source_tags
+from .utils.dbt_manifest import (
+    DBT_PROFILES,
+    DBT_PROJECT_PATH,
+    STATE_PATH,
+    existing_manifest,
+    save_state_manifest,
+    state_checksums,
+)
+
+# Prepared by compose/dagster/start (see prepare_manifest); imports only read it
+MANIFEST_PATH = existing_manifest()
+# Overrides the profile's thread count for Dagster-launched builds
+DBT_THREADS = int(os.getenv("DBT_THREADS", "4"))
+UNIQUE_ID_METADATA_KEY = "dagster_dbt/unique_id"
 
 # Base DBT resource configuration
 dbt_resource = DbtCliResource(
     project_dir=DBT_PROJECT_PATH,
     profiles_dir=DBT_PROFILES,
+    state_path=STATE_PATH,
 )
 
 
-@dbt_assets(manifest=MANIFEST_PATH)
-def open_quant_kit_dbt_assets(context: dagster.AssetExecutionContext, dbt: DbtCliResource):
-    yield from dbt.cli(["build"], context=context).stream()
+class DbtBuildConfig(Config):
+    only_stale: bool = True
+    """Skip selected models and seeds whose code matches the state manifest and whose
+    upstream assets have not materialized since their own last materialization."""
+    full_refresh: bool = False
+    """Rebuild incremental models from scratch; builds the whole selection."""
+    threads: int = DBT_THREADS
+    """dbt threads for this build."""
+
+
+def stale_asset_keys(context: dagster.AssetExecutionContext) -> set[AssetKey]:
+    """
+    Selected dbt assets that need a build: never materialized, changed against
+    the state manifest, downstream of a stale selected asset, or older than the
+    latest materialization of one of their upstream assets.
+    """
+    specs = context.assets_def.specs_by_key
+    selected = context.selected_asset_keys
+    checksums = state_checksums()
+    latest: dict[AssetKey, float | None] = {}
+    stale: dict[AssetKey, bool] = {}
+
+    def materialized_at(key: AssetKey) -> float | None:
+        if key not in latest:
+            event = context.instance.get_latest_materialization_event(key)
+            latest[key] = event.timestamp if event else None
+        return latest[key]
+
+    def is_stale(key: AssetKey) -> bool:
+        if key in stale:
+            return stale[key]
+        spec = specs[key]
+        built_at = materialized_at(key)
+        result = (
+            built_at is None
+            or checksums is None
+            or checksums.get(spec.metadata[UNIQUE_ID_METADATA_KEY]) != spec.code_version
+        )
+        for dep in spec.deps:
+            if result:
+                break
+            if dep.asset_key in selected:
+                result = is_stale(dep.asset_key)
+            else:
+                upstream_at = materialized_at(dep.asset_key)
+                result = upstream_at is not None and upstream_at > built_at
+        stale[key] = result
+        return result
+
+    return {key for key in selected if is_stale(key)}
+
+
+@dbt_assets(manifest=MANIFEST_PATH, pool=POSTGRES_POOL, op_tags=source_tags(POSTGRES_POOL))
+def open_quant_kit_dbt_assets(context: dagster.AssetExecutionContext, dbt: DbtCliResource, config: DbtBuildConfig):
+    args = ["build", "--threads", str(config.threads)]
+    if config.full_refresh:
+        args.append("--full-refresh")
+    elif config.only_stale:
+        stale = stale_asset_keys(context)
+        if not stale:
+            context.log.info("All selected dbt assets are up to date, nothing to build")
+            return
+        fresh = context.selected_asset_keys - stale
+        if fresh:
+            names = sorted(context.assets_def.specs_by_key[key].metadata[UNIQUE_ID_METADATA_KEY].split(".")[-1]
+                           for key in fresh)
+            context.log.info(f"Skipping {len(names)} up-to-date dbt assets: {', '.join(names)}")
+            args += ["--exclude", " ".join(names)]
+    args += dbt.get_defer_args()
+
+    invocation = dbt.cli(args, context=context)
+    yield from invocation.stream()
+
+    # A subset run leaves unselected models as they were, so only a full run may advance the state
+    if not context.is_subset:
+        save_state_manifest(os.fspath(invocation.target_path.joinpath("manifest.json")))
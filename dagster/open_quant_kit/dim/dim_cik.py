@@ -2,9 +2,33 @@ import json
 import os
 
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-from dagster import asset, AssetExecutionContext
+from dagster import asset, AssetExecutionContext, MaterializeResult
+from ..concurrency import POSTGRES_POOL, source_tags
+from ..utils.db import engine_from_env
+from ..utils.dim_sync import sync_dimension
+from ..utils.telemetry import asset_telemetry, materialize_result
+
+
+def ensure_dim_cik_schema(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS dim_cik (
+                ticker TEXT PRIMARY KEY,
+                cik TEXT NOT NULL,
+                title TEXT
+            );
+        """))
+        # Tables written by the old DROP + to_sql load have no key: dedupe once and add it
+        has_key = conn.execute(text("""
+            SELECT 1 FROM pg_constraint
+            WHERE conrelid = 'dim_cik'::regclass AND contype = 'p'
+        """)).first()
+        if has_key is None:
+            conn.execute(text("DELETE FROM dim_cik a USING dim_cik b WHERE a.ticker = b.ticker AND a.ctid > b.ctid"))
+            conn.execute(text("DELETE FROM dim_cik WHERE ticker IS NULL OR cik IS NULL"))
+            conn.execute(text("ALTER TABLE dim_cik ALTER COLUMN cik SET NOT NULL, ADD PRIMARY KEY (ticker)"))
 
 
 def run_dim_cik_ingestion(engine, logger=print) -> int:
@@ -32,32 +56,31 @@ def run_dim_cik_ingestion(engine, logger=print) -> int:
     logger(f"[INFO] Parsed {len(df)} rows from {json_path}")
 
     try:
-        with engine.begin() as conn:
-            conn.execute(text("DROP TABLE IF EXISTS dim_cik"))
-            df.to_sql("dim_cik", con=conn, index=False)
-        logger("[INFO] dim_cik table written to database")
-        return len(df)
+        ensure_dim_cik_schema(engine)
+        result = sync_dimension(engine, df, "dim_cik", key_columns=["ticker"])
+        logger(f"[INFO] dim_cik synced: {result}")
+        return result.changed
     except Exception as e:
-        logger(f"[ERROR] Failed to write dim_cik table: {e}")
+        logger(f"[ERROR] Failed to sync dim_cik table: {e}")
         return 0
 
 
 @asset(
     compute_kind="python",
     required_resource_keys={"dbt_postgres"},
+    pool=POSTGRES_POOL,
+    op_tags=source_tags(POSTGRES_POOL),
 )
-def dim_cik(context: AssetExecutionContext) -> None:
+def dim_cik(context: AssetExecutionContext) -> MaterializeResult:
     engine = context.resources.dbt_postgres
-    count = run_dim_cik_ingestion(engine, logger=context.log.info)
-    context.log.info(f"dim_cik asset completed — inserted {count} rows.")
+    with asset_telemetry(context) as telemetry:
+        count = run_dim_cik_ingestion(engine, logger=context.log.info)
+    context.log.info(f"dim_cik asset completed — changed {count} rows.")
+    return materialize_result(telemetry, changed=count)
 
 
 # CLI entrypoint
 if __name__ == "__main__":
-    DATABASE_URL = os.getenv("POSTGRES_DB_URL", "").replace("postgres://", "postgresql://")
-    if not DATABASE_URL:
-        raise ValueError("POSTGRES_DB_URL is not set")
-
-    engine = create_engine(DATABASE_URL)
+    engine = engine_from_env()
     count = run_dim_cik_ingestion(engine)
-    print(f"[DONE] Loaded {count} rows into dim_cik")
+    print(f"[DONE] Changed {count} rows in dim_cik")
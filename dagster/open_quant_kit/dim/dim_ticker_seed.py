@@ -3,29 +3,68 @@ import os
 
 import pandas as pd
 
+from ..utils.http import build_session
+from ..utils.http_cache import get_http_cache
+
 TICKER_CSV_PATH = "seeds/dim_ticker.csv"
+NASDAQ_LISTED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt"
+OTHER_LISTED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt"
+
+
+def read_symbol_directory(url: str) -> pd.DataFrame:
+    """Read a Nasdaq Trader symbol directory file, revalidated through the HTTP cache."""
+    cache = get_http_cache()
+    if cache is None:
+        df = pd.read_csv(url, sep="|")
+    else:
+        session = build_session("OpenQuantKit/1.0", pool_size=1)
+        try:
+            df = pd.read_csv(cache.get(session, url).path, sep="|")
+        finally:
+            session.close()
 
+    # Drop the trailing "File Creation Time: ..." footer row
+    first = df.columns[0]
+    return df[~df[first].astype(str).str.startswith("File Creation Time")]
 
-def populate_tickers_from_exchange(csv_path: str = TICKER_CSV_PATH) -> None:
-    """Download NASDAQ and NYSE tickers and save to CSV if not already present."""
+
+def populate_tickers_from_exchange(csv_path: str = TICKER_CSV_PATH, refresh: bool = False) -> bool:
+    """
+    Download NASDAQ and NYSE tickers into the dbt seed CSV. An existing list is
+    kept unless `refresh`, and is only rewritten when the symbols changed, so
+    `dbt seed` and the models downstream of dim_ticker see no spurious change.
+    Returns whether the file was written.
+    """
+    current = None
     if os.path.exists(csv_path):
         df = pd.read_csv(csv_path)
         if not df.empty and "symbol" in df.columns:
-            print("Ticker list already populated.")
-            return
+            current = set(df["symbol"].dropna().astype(str))
+            if not refresh:
+                print("Ticker list already populated.")
+                return False
 
     print("Downloading NASDAQ/NYSE tickers...")
 
-    nasdaq = pd.read_csv("ftp://ftp.nasdaqtrader.com/SymbolDirectory/nasdaqlisted.txt", sep="|")
-    nyse = pd.read_csv("ftp://ftp.nasdaqtrader.com/SymbolDirectory/otherlisted.txt", sep="|")
+    nasdaq = read_symbol_directory(NASDAQ_LISTED_URL)
+    nyse = read_symbol_directory(OTHER_LISTED_URL)
 
     symbols = set(nasdaq["Symbol"].dropna().tolist() + nyse["ACT Symbol"].dropna().tolist())
     symbols = sorted(t for t in symbols if "test" not in t.lower())
 
-    df = pd.DataFrame({"symbol": symbols})
-    df.to_csv(csv_path, index=False)
+    if current is not None and set(symbols) == current:
+        print(f"Ticker list unchanged ({len(symbols)} tickers), leaving {csv_path} as is.")
+        return False
+    if current is not None:
+        print(f"Ticker list changed: {len(set(symbols) - current)} added, {len(current - set(symbols))} removed")
+
+    # Write next to the seed and rename over it, so readers never see a partial file
+    tmp_path = f"{csv_path}.tmp"
+    pd.DataFrame({"symbol": symbols}).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, csv_path)
 
     print(f"Saved {len(symbols)} tickers to {csv_path}")
+    return True
 
 
 def get_tickers_needing_update(csv_path: str = TICKER_CSV_PATH) -> list:
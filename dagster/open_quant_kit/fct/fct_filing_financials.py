@@ -0,0 +1,375 @@
+# dagster/open_quant_kit/fct/fct_filing_financials.py
+
+import html
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+from dagster import asset, AssetDep, AssetExecutionContext, Config, MaterializeResult
+from ..concurrency import POSTGRES_POOL, source_tags
+from ..utils.bulk_load import copy_upsert
+from ..utils.compression import decompress_bytes
+from ..utils.db import engine_from_env
+from ..utils.telemetry import ProgressReporter, asset_telemetry, current_telemetry, materialize_result
+
+# Bump when extraction changes so stored accessions are parsed again
+PARSER_VERSION = 1
+FETCH_ROWS = 200
+WRITE_BATCH_ACCESSIONS = 500
+# Filings handed to the pool ahead of the results being collected, per worker
+IN_FLIGHT_PER_WORKER = 4
+
+# XBRL concepts extracted, and the metric each one reports
+KEY_CONCEPTS = {
+    "us-gaap:Revenues": "revenue",
+    "us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax": "revenue",
+    "us-gaap:RevenueFromContractWithCustomerIncludingAssessedTax": "revenue",
+    "us-gaap:SalesRevenueNet": "revenue",
+    "ifrs-full:Revenue": "revenue",
+    "us-gaap:GrossProfit": "gross_profit",
+    "us-gaap:OperatingIncomeLoss": "operating_income",
+    "us-gaap:NetIncomeLoss": "net_income",
+    "us-gaap:ProfitLoss": "net_income",
+    "ifrs-full:ProfitLoss": "net_income",
+    "us-gaap:EarningsPerShareBasic": "eps_basic",
+    "us-gaap:EarningsPerShareDiluted": "eps_diluted",
+    "ifrs-full:BasicEarningsLossPerShare": "eps_basic",
+    "ifrs-full:DilutedEarningsLossPerShare": "eps_diluted",
+    "us-gaap:Assets": "total_assets",
+    "ifrs-full:Assets": "total_assets",
+    "us-gaap:Liabilities": "total_liabilities",
+    "ifrs-full:Liabilities": "total_liabilities",
+    "us-gaap:StockholdersEquity": "stockholders_equity",
+    "ifrs-full:Equity": "stockholders_equity",
+    "us-gaap:CashAndCashEquivalentsAtCarryingValue": "cash",
+    "ifrs-full:CashAndCashEquivalents": "cash",
+    "us-gaap:NetCashProvidedByUsedInOperatingActivities": "operating_cash_flow",
+    "us-gaap:WeightedAverageNumberOfSharesOutstandingBasic": "weighted_shares_basic",
+    "us-gaap:WeightedAverageNumberOfDilutedSharesOutstanding": "weighted_shares_diluted",
+    "dei:EntityCommonStockSharesOutstanding": "shares_outstanding",
+}
+
+FINANCIAL_FORM_TYPES = ["10-K", "10-K/A", "10-Q", "10-Q/A", "20-F", "20-F/A", "40-F", "40-F/A"]
+
+FACT_COLUMNS = ["metric", "concept", "context_ref", "unit", "period_start", "period_end", "value", "decimals"]
+
+_DOCUMENT_RE = re.compile(r"<DOCUMENT>(.*?)</DOCUMENT>", re.S)
+_TYPE_RE = re.compile(r"<TYPE>([^\n<]*)")
+_FILENAME_RE = re.compile(r"<FILENAME>([^\n<]*)")
+_TEXT_RE = re.compile(r"<TEXT>(.*?)(?:</TEXT>|\Z)", re.S)
+_CONTEXT_RE = re.compile(r"<(?:[\w-]+:)?context\b[^>]*?\bid=[\"']([^\"']+)[\"'][^>]*>(.*?)</(?:[\w-]+:)?context>", re.S)
+_UNIT_RE = re.compile(r"<(?:[\w-]+:)?unit\b[^>]*?\bid=[\"']([^\"']+)[\"'][^>]*>(.*?)</(?:[\w-]+:)?unit>", re.S)
+_MEASURE_RE = re.compile(r"<(?:[\w-]+:)?measure>\s*([^<\s]+)")
+_DIMENSIONAL_RE = re.compile(r"<(?:[\w-]+:)?(?:segment|scenario)\b")
+_START_RE = re.compile(r"<(?:[\w-]+:)?startDate>\s*([^<\s]+)")
+_END_RE = re.compile(r"<(?:[\w-]+:)?endDate>\s*([^<\s]+)")
+_INSTANT_RE = re.compile(r"<(?:[\w-]+:)?instant>\s*([^<\s]+)")
+_INSTANCE_FACT_RE = re.compile(
+    r"<(" + "|".join(re.escape(c) for c in KEY_CONCEPTS) + r")\b([^>]*)>([^<]*)</\1>"
+)
+_IX_FACT_RE = re.compile(r"<ix:nonFraction\b([^>]*)>(.*?)</ix:nonFraction>", re.S)
+_ATTR_RE = re.compile(r"([\w:.-]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)')")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class FilingFinancialsConfig(Config):
+    max_workers: int = 0
+    """Parser processes; 0 uses every core."""
+    form_types: list[str] = FINANCIAL_FORM_TYPES
+    """Only filings of these form types are parsed."""
+    full_refresh: bool = False
+    """Drop all extracted facts and parse every stored filing again."""
+
+
+@dataclass
+class FilingDocument:
+    """One <DOCUMENT> of a full SEC submission."""
+    type: str
+    filename: str
+    body: str
+
+
+def ensure_fct_filing_financials_schema(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS fct_filing_financials (
+                accession TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                concept TEXT NOT NULL,
+                context_ref TEXT NOT NULL,
+                unit TEXT NOT NULL,
+                period_start DATE,
+                period_end DATE,
+                value DOUBLE PRECISION NOT NULL,
+                decimals INT,
+                PRIMARY KEY (accession, concept, context_ref, unit)
+            );
+        """))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_fct_filing_financials_metric ON fct_filing_financials (metric, period_end);"
+        ))
+        # One row per parsed accession, including those without facts, so nothing is parsed twice
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS fct_filing_financials_state (
+                accession TEXT PRIMARY KEY,
+                parser_version INT NOT NULL,
+                documents INT NOT NULL,
+                facts INT NOT NULL,
+                error TEXT,
+                parsed_at TIMESTAMP
+            );
+        """))
+
+
+def split_documents(submission: str) -> list[FilingDocument]:
+    """Split a full submission into its documents; a bare document is returned as the only one."""
+    documents = []
+    for match in _DOCUMENT_RE.finditer(submission):
+        block = match.group(1)
+        doc_type = _TYPE_RE.search(block)
+        filename = _FILENAME_RE.search(block)
+        body = _TEXT_RE.search(block)
+        documents.append(FilingDocument(
+            type=doc_type.group(1).strip() if doc_type else "",
+            filename=filename.group(1).strip() if filename else "",
+            body=body.group(1) if body else block,
+        ))
+    return documents or [FilingDocument(type="", filename="", body=submission)]
+
+
+def _attributes(raw: str) -> dict[str, str]:
+    return {name: double if double is not None else single for name, double, single in _ATTR_RE.findall(raw)}
+
+
+def parse_contexts(body: str) -> dict[str, tuple[str | None, str | None]]:
+    """{context id: (period start, period end)} for contexts without dimensions."""
+    contexts = {}
+    for context_id, block in _CONTEXT_RE.findall(body):
+        if _DIMENSIONAL_RE.search(block):
+            continue
+        instant = _INSTANT_RE.search(block)
+        if instant:
+            contexts[context_id] = (None, instant.group(1))
+            continue
+        start, end = _START_RE.search(block), _END_RE.search(block)
+        if end:
+            contexts[context_id] = (start.group(1) if start else None, end.group(1))
+    return contexts
+
+
+def parse_units(body: str) -> dict[str, str]:
+    """{unit id: measure}, e.g. "USD" or "USD/shares" for a divide."""
+    units = {}
+    for unit_id, block in _UNIT_RE.findall(body):
+        measures = [m.split(":")[-1] for m in _MEASURE_RE.findall(block)]
+        units[unit_id] = "/".join(measures)
+    return units
+
+
+def _decimals(attrs: dict[str, str]) -> int | None:
+    try:
+        return int(attrs["decimals"])
+    except (KeyError, ValueError):  # missing or "INF"
+        return None
+
+
+def _ix_value(raw: str, attrs: dict[str, str]) -> float | None:
+    """Numeric value of an inline XBRL fact, after its format, scale and sign."""
+    if attrs.get("xsi:nil") == "true":
+        return None
+    value = html.unescape(_TAG_RE.sub("", raw)).strip()
+    fmt = attrs.get("format", "").lower()
+    if "zero" in fmt or value in ("", "-", "–", "—"):
+        number = 0.0
+    else:
+        if "comma" in fmt and "decimal" in fmt:  # e.g. ixt:num-comma-decimal, 1.234,5
+            value = value.replace(".", "").replace(" ", "").replace(",", ".")
+        else:
+            value = value.replace(",", "").replace(" ", "")
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+    number *= 10 ** int(attrs.get("scale", "0") or 0)
+    return -number if attrs.get("sign") == "-" else number
+
+
+def extract_facts(body: str) -> list[tuple]:
+    """Key facts of one XBRL instance or inline XBRL document, as FACT_COLUMNS tuples."""
+    contexts = parse_contexts(body)
+    if not contexts:
+        return []
+    units = parse_units(body)
+
+    candidates = []
+    for attrs_raw, raw in _IX_FACT_RE.findall(body):
+        attrs = _attributes(attrs_raw)
+        if attrs.get("name") in KEY_CONCEPTS:
+            candidates.append((attrs["name"], attrs, _ix_value(raw, attrs)))
+    for concept, attrs_raw, raw in _INSTANCE_FACT_RE.findall(body):
+        attrs = _attributes(attrs_raw)
+        try:
+            value = float(raw.strip())
+        except ValueError:
+            value = None
+        candidates.append((concept, attrs, value))
+
+    facts = []
+    for concept, attrs, value in candidates:
+        context_ref = attrs.get("contextRef")
+        if value is None or context_ref not in contexts:
+            continue
+        unit_ref = attrs.get("unitRef", "")
+        period_start, period_end = contexts[context_ref]
+        facts.append((
+            KEY_CONCEPTS[concept], concept, context_ref, units.get(unit_ref, unit_ref),
+            period_start, period_end, value, _decimals(attrs),
+        ))
+    return facts
+
+
+def parse_filing(accession: str, codec: str, payload: bytes) -> dict:
+    """Decompress and parse one stored filing. Runs in a worker process."""
+    start = time.perf_counter()
+    try:
+        submission = decompress_bytes(payload, codec).decode("utf-8", errors="replace")
+        documents = split_documents(submission)
+        facts = []
+        for document in documents:
+            # Cheap pre-check: only XBRL instances and inline XBRL carry contextRef
+            if "contextRef" in document.body:
+                facts.extend(extract_facts(document.body))
+        error = None
+    except Exception as e:
+        documents, facts, error = [], [], f"{type(e).__name__}: {e}"
+    return {
+        "accession": accession,
+        "documents": len(documents),
+        "facts": facts,
+        "error": error,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+PENDING_FILTER = """
+    FROM raw_filing_content c
+    WHERE NOT EXISTS (
+        SELECT 1 FROM fct_filing_financials_state s
+        WHERE s.accession = c.accession AND s.parser_version = :parser_version
+    )
+    AND EXISTS (
+        SELECT 1 FROM raw_filing f
+        WHERE f.accession = c.accession AND f.form_type = ANY(:form_types)
+    )
+"""
+
+
+def write_parsed(engine, parsed: list[dict]) -> int:
+    """Store the facts of parsed filings, then mark the filings as parsed."""
+    facts = pd.DataFrame(
+        [(p["accession"], *fact) for p in parsed for fact in p["facts"]],
+        columns=["accession"] + FACT_COLUMNS,
+    )
+    written = 0
+    if not facts.empty:
+        facts["decimals"] = facts["decimals"].astype("Int64")
+        written = copy_upsert(engine, facts, "fct_filing_financials",
+                              key_columns=["accession", "concept", "context_ref", "unit"]).written
+
+    parsed_at = datetime.utcnow()
+    state = pd.DataFrame([{
+        "accession": p["accession"],
+        "parser_version": PARSER_VERSION,
+        "documents": p["documents"],
+        "facts": len(p["facts"]),
+        "error": p["error"],
+        "parsed_at": parsed_at,
+    } for p in parsed])
+    copy_upsert(engine, state, "fct_filing_financials_state", key_columns=["accession"])
+    return written
+
+
+def run_filing_financials(engine, config: FilingFinancialsConfig = FilingFinancialsConfig(), logger=print) -> int:
+    """
+    Parse every stored filing not yet parsed by this PARSER_VERSION. Compressed
+    bodies stream from a server-side cursor into a process pool, with a bounded
+    number in flight; the calling process writes the results in batches.
+    """
+    ensure_fct_filing_financials_schema(engine)
+    if config.full_refresh:
+        with engine.begin() as conn:
+            conn.execute(text("TRUNCATE fct_filing_financials, fct_filing_financials_state"))
+
+    params = {"parser_version": PARSER_VERSION, "form_types": list(config.form_types)}
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT COUNT(*) " + PENDING_FILTER), params).scalar()
+    if not total:
+        logger("[INFO] fct_filing_financials is up to date")
+        return 0
+
+    workers = config.max_workers or os.cpu_count() or 1
+    logger(f"[INFO] Parsing {total} filings with {workers} processes")
+    telemetry = current_telemetry()
+    written = 0
+    parsed = []
+
+    def collect(futures) -> None:
+        nonlocal written, parsed
+        for future in futures:
+            result = future.result()
+            progress.update(1)
+            telemetry.observe("filing_parse_seconds", result["seconds"])
+            telemetry.inc("filing_facts_extracted", len(result["facts"]))
+            if result["error"]:
+                telemetry.inc("filings_parse_failed")
+                logger(f"[ERROR] {result['accession']}: {result['error']}")
+            parsed.append(result)
+        if len(parsed) >= WRITE_BATCH_ACCESSIONS:
+            written += write_parsed(engine, parsed)
+            parsed = []
+
+    with ProgressReporter(total, "Parsing filings", logger=logger) as progress, \
+            ProcessPoolExecutor(max_workers=workers) as executor, \
+            engine.connect().execution_options(stream_results=True) as conn:
+        rows = conn.execute(text("SELECT c.accession, c.codec, c.content " + PENDING_FILTER), params)
+        in_flight = set()
+        for row in rows.yield_per(FETCH_ROWS):
+            if len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(executor.submit(parse_filing, row.accession, row.codec, bytes(row.content)))
+        collect(wait(in_flight).done)
+
+    if parsed:
+        written += write_parsed(engine, parsed)
+    logger(f"[INFO] Parsed {total} filings, wrote {written} facts to fct_filing_financials")
+    return written
+
+
+@asset(
+    compute_kind="python",
+    required_resource_keys={"dbt_postgres"},
+    pool=POSTGRES_POOL,
+    op_tags=source_tags(POSTGRES_POOL),
+    deps=[AssetDep("raw_filing")],
+)
+def fct_filing_financials(context: AssetExecutionContext, config: FilingFinancialsConfig) -> MaterializeResult:
+    """Key XBRL facts (revenue, net income, shares outstanding, ...) per filing, in long format."""
+    engine = context.resources.dbt_postgres
+    with asset_telemetry(context) as telemetry:
+        written = run_filing_financials(engine, config, logger=context.log.info)
+    context.log.info(f"fct_filing_financials asset completed — wrote {written} facts.")
+    return materialize_result(telemetry, written=written)
+
+
+# CLI entrypoint
+if __name__ == "__main__":
+    engine = engine_from_env()
+    count = run_filing_financials(engine)
+    print(f"[DONE] Wrote {count} facts into fct_filing_financials")
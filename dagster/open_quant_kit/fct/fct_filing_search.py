@@ -0,0 +1,388 @@
+# dagster/open_quant_kit/fct/fct_filing_search.py
+
+import html
+import os
+import re
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import text
+
+from dagster import asset, AssetDep, AssetExecutionContext, Config, MaterializeResult
+from ..concurrency import POSTGRES_POOL, source_tags
+from ..utils.bulk_load import COPY_CHUNK_ROWS, copy_frame
+from ..utils.compression import decompress_bytes
+from ..utils.db import create_pg_engine, engine_from_env
+from ..utils.telemetry import ProgressReporter, asset_telemetry, current_telemetry, materialize_result
+from .fct_filing_financials import split_documents
+
+# Bump when text extraction changes so indexed accessions are rebuilt
+INDEXER_VERSION = 1
+TEXT_SEARCH_CONFIG = "english"
+# Accessions cleaned and written per worker task
+INDEX_BATCH_ACCESSIONS = 25
+# Keeps every tsvector well below Postgres' 1 MB limit
+SEARCH_TEXT_MAX_CHARS = 1_000_000
+# Snippets are highlighted in a window around the first query term, not the whole filing
+SNIPPET_WINDOW_CHARS = 2000
+HEADLINE_OPTIONS = "MaxFragments=2, MaxWords=35, MinWords=15, FragmentDelimiter=' … '"
+
+# Exhibits that carry no prose: XBRL, schemas, images, archives, spreadsheets
+_SKIPPED_TYPE_RE = re.compile(r"^(EX-101\.|GRAPHIC|ZIP|EXCEL|XML|JSON)", re.I)
+_SKIPPED_FILENAME_RE = re.compile(r"\.(xml|xsd|jpg|jpeg|gif|png|pdf|zip|xlsx?|json|js|css)$", re.I)
+_UUENCODED_RE = re.compile(r"^\s*begin [0-7]{3} ")
+_COMPANY_RE = re.compile(r"COMPANY CONFORMED NAME:\s*([^\n]+)")
+_NON_PROSE_BLOCK_RE = re.compile(r"<(script|style|ix:header)\b.*?</\1>", re.S | re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+_worker_engine = None
+
+
+def ensure_fct_filing_search_schema(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS fct_filing_search (
+                accession TEXT PRIMARY KEY,
+                cik TEXT,
+                form_type TEXT,
+                filing_date DATE,
+                tickers TEXT[] NOT NULL,
+                content_sha256 TEXT NOT NULL,
+                indexer_version INT NOT NULL,
+                -- Company name and form type weigh as A, the filing text as D
+                document TSVECTOR NOT NULL,
+                -- Cleaned text the snippets are cut from
+                search_text TEXT NOT NULL,
+                indexed_at TIMESTAMP NOT NULL DEFAULT now()
+            );
+        """))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_fct_filing_search_document ON fct_filing_search USING GIN (document);"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_fct_filing_search_tickers ON fct_filing_search USING GIN (tickers);"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_fct_filing_search_date ON fct_filing_search (filing_date);"))
+
+
+def filing_search_text(submission: str) -> tuple[str, str]:
+    """
+    (header, text) of a full submission: the company name and form type, and
+    the prose of its documents with markup, XBRL, scripts and binary exhibits
+    removed, capped at SEARCH_TEXT_MAX_CHARS.
+    """
+    company = _COMPANY_RE.search(submission)
+    documents = split_documents(submission)
+    header = " ".join(filter(None, [company.group(1).strip() if company else "", documents[0].type]))
+
+    parts = []
+    size = 0
+    for document in documents:
+        if _SKIPPED_TYPE_RE.match(document.type) or _SKIPPED_FILENAME_RE.search(document.filename):
+            continue
+        if _UUENCODED_RE.match(document.body):
+            continue
+        body = _NON_PROSE_BLOCK_RE.sub(" ", document.body)
+        body = _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", body))).strip()
+        if not body:
+            continue
+        parts.append(body)
+        size += len(body) + 1
+        if size >= SEARCH_TEXT_MAX_CHARS:
+            break
+    # Postgres text cannot hold NUL
+    return header.replace("\x00", ""), " ".join(parts)[:SEARCH_TEXT_MAX_CHARS].replace("\x00", "")
+
+
+def _init_worker(db_url: str) -> None:
+    global _worker_engine
+    _worker_engine = create_pg_engine(db_url, pool_size=1, max_overflow=0)
+
+
+def _write_search_rows(engine, staged: list[dict]) -> int:
+    """Build and upsert the tsvectors of cleaned filings in one transaction."""
+    stage = f"_filing_search_{uuid.uuid4().hex[:8]}"
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            CREATE TEMP TABLE {stage} (accession TEXT, content_sha256 TEXT, header TEXT, body TEXT) ON COMMIT DROP
+        """))
+        copy_frame(conn.connection.cursor(), pd.DataFrame(staged), stage, COPY_CHUNK_ROWS)
+        return conn.execute(text(f"""
+            INSERT INTO fct_filing_search AS s (
+                accession, cik, form_type, filing_date, tickers,
+                content_sha256, indexer_version, document, search_text, indexed_at
+            )
+            SELECT
+                st.accession, f.cik, f.form_type, f.filing_date, f.tickers,
+                st.content_sha256, :indexer_version,
+                setweight(to_tsvector(CAST(:config AS regconfig), st.header), 'A')
+                    || setweight(to_tsvector(CAST(:config AS regconfig), st.body), 'D'),
+                st.body, now()
+            FROM {stage} st
+            JOIN LATERAL (
+                SELECT MIN(r.cik) AS cik, MIN(r.form_type) AS form_type, MIN(r.filing_date) AS filing_date,
+                       ARRAY_AGG(DISTINCT r.ticker ORDER BY r.ticker) AS tickers
+                FROM raw_filing r
+                WHERE r.accession = st.accession
+            ) f ON true
+            ON CONFLICT (accession) DO UPDATE SET
+                cik = EXCLUDED.cik,
+                form_type = EXCLUDED.form_type,
+                filing_date = EXCLUDED.filing_date,
+                tickers = EXCLUDED.tickers,
+                content_sha256 = EXCLUDED.content_sha256,
+                indexer_version = EXCLUDED.indexer_version,
+                document = EXCLUDED.document,
+                search_text = EXCLUDED.search_text,
+                indexed_at = EXCLUDED.indexed_at
+        """), {"indexer_version": INDEXER_VERSION, "config": TEXT_SEARCH_CONFIG}).rowcount
+
+
+def index_batch(accessions: list[str]) -> dict:
+    """
+    Read, clean and index a batch of stored filings. Runs in a worker process
+    with its own connection, so Postgres builds the tsvectors of several
+    batches in parallel. Errors end up in stats["errors"] rather than failing
+    the run; a batch whose write fails is retried one filing at a time, so a
+    single bad filing does not keep the rest of its batch out of the index.
+    """
+    start = time.perf_counter()
+    engine = _worker_engine
+    stats = {"accessions": len(accessions), "indexed": 0, "chars": 0, "errors": []}
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("""
+                    SELECT accession, codec, sha256, content FROM raw_filing_content WHERE accession = ANY(:accessions)
+                """),
+                {"accessions": list(accessions)},
+            ).fetchall()
+    except Exception as e:
+        stats["errors"].append(f"batch of {len(accessions)} from {accessions[0]}: {type(e).__name__}: {e}")
+        rows = []
+
+    staged = []
+    for row in rows:
+        try:
+            submission = decompress_bytes(bytes(row.content), row.codec).decode("utf-8", errors="replace")
+            header, body = filing_search_text(submission)
+        except Exception as e:
+            stats["errors"].append(f"{row.accession}: {type(e).__name__}: {e}")
+            continue
+        staged.append({"accession": row.accession, "content_sha256": row.sha256, "header": header, "body": body})
+        stats["chars"] += len(body)
+
+    if staged:
+        try:
+            stats["indexed"] = _write_search_rows(engine, staged)
+        except Exception as e:
+            stats["errors"].append(f"batch of {len(staged)} from {staged[0]['accession']}: {type(e).__name__}: {e}")
+            for filing in staged:
+                try:
+                    stats["indexed"] += _write_search_rows(engine, [filing])
+                except Exception as filing_error:
+                    stats["errors"].append(f"{filing['accession']}: {type(filing_error).__name__}: {filing_error}")
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+PENDING_QUERY = """
+    SELECT c.accession
+    FROM raw_filing_content c
+    WHERE NOT EXISTS (
+        SELECT 1 FROM fct_filing_search s
+        WHERE s.accession = c.accession
+          AND s.content_sha256 = c.sha256
+          AND s.indexer_version = :indexer_version
+    )
+    AND EXISTS (SELECT 1 FROM raw_filing r WHERE r.accession = c.accession)
+    ORDER BY c.accession
+"""
+
+
+def refresh_search_tickers(engine) -> int:
+    """Pick up tickers linked to already indexed filings since they were indexed; no text is rebuilt."""
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            UPDATE fct_filing_search s
+            SET tickers = t.tickers, indexed_at = now()
+            FROM (
+                SELECT r.accession, ARRAY_AGG(DISTINCT r.ticker ORDER BY r.ticker) AS tickers
+                FROM raw_filing r
+                WHERE r.accession IN (
+                    SELECT r2.accession FROM raw_filing r2
+                    JOIN fct_filing_search s2 ON s2.accession = r2.accession
+                    WHERE r2.downloaded_at > s2.indexed_at
+                )
+                GROUP BY r.accession
+            ) t
+            WHERE s.accession = t.accession AND s.tickers <> t.tickers
+        """)).rowcount
+
+
+class FilingSearchConfig(Config):
+    max_workers: int = 0
+    """Indexer processes, each with its own Postgres connection; 0 uses every core."""
+    full_refresh: bool = False
+    """Drop the index and rebuild it from every stored filing."""
+
+
+def run_filing_search_index(engine, config: FilingSearchConfig = FilingSearchConfig(), logger=print) -> int:
+    """
+    Index every stored filing that is new, changed or indexed by an older
+    INDEXER_VERSION. Batches of accessions go to a process pool; each worker
+    decompresses and cleans its filings and writes their tsvectors itself.
+    """
+    ensure_fct_filing_search_schema(engine)
+    if config.full_refresh:
+        with engine.begin() as conn:
+            conn.execute(text("TRUNCATE fct_filing_search"))
+
+    refreshed = refresh_search_tickers(engine)
+    if refreshed:
+        logger(f"[INFO] Refreshed tickers of {refreshed} indexed filings")
+
+    with engine.connect() as conn:
+        pending = conn.execute(text(PENDING_QUERY), {"indexer_version": INDEXER_VERSION}).scalars().all()
+    if not pending:
+        logger("[INFO] fct_filing_search is up to date")
+        return 0
+
+    batches = [pending[i:i + INDEX_BATCH_ACCESSIONS] for i in range(0, len(pending), INDEX_BATCH_ACCESSIONS)]
+    workers = max(1, min(config.max_workers or os.cpu_count() or 1, len(batches)))
+    db_url = engine.url.render_as_string(hide_password=False)
+    logger(f"[INFO] Indexing {len(pending)} filings with {workers} processes")
+    telemetry = current_telemetry()
+    indexed = 0
+
+    with ProgressReporter(len(pending), "Indexing filings", logger=logger) as progress, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_url,)) as executor:
+        futures = [executor.submit(index_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            stats = future.result()
+            progress.update(stats["accessions"])
+            telemetry.observe("search_batch_seconds", stats["seconds"])
+            telemetry.inc("search_text_chars", stats["chars"])
+            for error in stats["errors"]:
+                telemetry.inc("filings_index_failed")
+                logger(f"[ERROR] {error}")
+            indexed += stats["indexed"]
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE fct_filing_search"))
+    logger(f"[INFO] Indexed {indexed} filings into fct_filing_search")
+    return indexed
+
+
+def search_filings(
+        engine,
+        query: str,
+        tickers: list[str] | None = None,
+        form_types: list[str] | None = None,
+        start: date | str | None = None,
+        end: date | str | None = None,
+        limit: int = 20,
+        max_candidates: int | None = None,
+) -> pd.DataFrame:
+    """
+    Ranked filings matching a web-style query ("net revenue" -guidance, OR,
+    quoted phrases), optionally restricted to tickers, form types and a filing
+    date range. The GIN index finds the matches and every match is ranked.
+    Returns accession, tickers, cik, form_type, filing_date, rank (ts_rank_cd,
+    normalized to 0..1) and a highlighted snippet.
+
+    Ranking reads the whole tsvector of each match, so a broad query over a
+    large index can take seconds. `max_candidates` switches to a recent-only
+    mode: just the most recent `max_candidates` matches are ranked, and older
+    filings, however relevant, are left out.
+    """
+    columns = ["accession", "tickers", "cik", "form_type", "filing_date", "rank", "snippet"]
+    params = {"query": query, "config": TEXT_SEARCH_CONFIG, "limit": limit, "candidates": max_candidates,
+              "window": SNIPPET_WINDOW_CHARS, "options": HEADLINE_OPTIONS}
+    recent_only = "ORDER BY s.filing_date DESC LIMIT :candidates" if max_candidates is not None else ""
+    filters = ["s.document @@ q.query"]
+    if tickers:
+        filters.append("s.tickers && CAST(:tickers AS TEXT[])")
+        params["tickers"] = [t.upper() for t in tickers]
+    if form_types:
+        filters.append("s.form_type = ANY(:form_types)")
+        params["form_types"] = list(form_types)
+    if start is not None:
+        filters.append("s.filing_date >= :start")
+        params["start"] = start
+    if end is not None:
+        filters.append("s.filing_date <= :end")
+        params["end"] = end
+
+    # Only the top `limit` rows read search_text, and only a window of it
+    sql = f"""
+        WITH q AS (
+            SELECT
+                websearch_to_tsquery(CAST(:config AS regconfig), :query) AS query,
+                tsvector_to_array(to_tsvector(CAST(:config AS regconfig), :query)) AS lexemes
+        ),
+        candidates AS (
+            SELECT s.accession, s.tickers, s.cik, s.form_type, s.filing_date, s.document
+            FROM fct_filing_search s, q
+            WHERE {" AND ".join(filters)}
+            {recent_only}
+        ),
+        ranked AS (
+            SELECT c.accession, c.tickers, c.cik, c.form_type, c.filing_date,
+                   ts_rank_cd(c.document, q.query, 32) AS rank
+            FROM candidates c, q
+            ORDER BY rank DESC, c.filing_date DESC
+            LIMIT :limit
+        )
+        SELECT r.*,
+               ts_headline(
+                   CAST(:config AS regconfig),
+                   substr(s.search_text, GREATEST(1, COALESCE(hit.pos, 1) - :window / 4), :window),
+                   q.query, :options
+               ) AS snippet
+        FROM ranked r
+        JOIN fct_filing_search s ON s.accession = r.accession
+        CROSS JOIN q
+        LEFT JOIN LATERAL (
+            SELECT MIN(NULLIF(strpos(lower(s.search_text), lexeme), 0)) AS pos
+            FROM unnest(q.lexemes) AS lexeme
+        ) hit ON true
+        ORDER BY r.rank DESC, r.filing_date DESC
+    """
+    with engine.begin() as conn:
+        # A query of stopwords only matches nothing, and would make the GIN index scan everything
+        if not conn.execute(text("SELECT numnode(websearch_to_tsquery(CAST(:config AS regconfig), :query))"),
+                            params).scalar():
+            return pd.DataFrame(columns=columns)
+        # tsvectors live in TOAST, so the heap looks tiny and the planner would pick a
+        # sequential scan that detoasts every document
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        return pd.DataFrame(conn.execute(text(sql), params).mappings().all(), columns=columns)
+
+
+@asset(
+    compute_kind="python",
+    required_resource_keys={"dbt_postgres"},
+    pool=POSTGRES_POOL,
+    op_tags=source_tags(POSTGRES_POOL),
+    deps=[AssetDep("raw_filing")],
+)
+def fct_filing_search(context: AssetExecutionContext, config: FilingSearchConfig) -> MaterializeResult:
+    """Full-text search index (tsvector + GIN) over stored filing text."""
+    engine = context.resources.dbt_postgres
+    with asset_telemetry(context) as telemetry:
+        indexed = run_filing_search_index(engine, config, logger=context.log.info)
+    context.log.info(f"fct_filing_search asset completed — indexed {indexed} filings.")
+    return materialize_result(telemetry, indexed=indexed)
+
+
+# CLI entrypoint: build the index, or search it with a query
+if __name__ == "__main__":
+    engine = engine_from_env()
+    if len(sys.argv) > 1:
+        with pd.option_context("display.max_colwidth", 120, "display.width", 200):
+            print(search_filings(engine, " ".join(sys.argv[1:])))
+    else:
+        count = run_filing_search_index(engine)
+        print(f"[DONE] Indexed {count} filings into fct_filing_search")
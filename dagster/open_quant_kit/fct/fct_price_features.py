@@ -0,0 +1,304 @@
+# dagster/open_quant_kit/fct/fct_price_features.py
+
+import math
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import BDay
+from sqlalchemy import text
+
+from dagster import asset, AssetDep, AssetExecutionContext, Config
+from ..concurrency import POSTGRES_POOL, source_tags
+from ..utils.bulk_load import copy_select, copy_upsert
+from ..utils.db import engine_from_env
+
+
+TICKER_CHUNK_SIZE = 500
+# Share of a window that must hold observations before a rolling feature is emitted
+MIN_PERIODS_RATIO = 0.8
+# Extra history so a close carried forward over a ticker's own gaps is still in range
+LOOKBACK_MARGIN_DAYS = 21
+
+
+class PriceFeaturesConfig(Config):
+    return_windows: list[int] = [1, 5, 21, 63, 252]
+    """Simple returns over these many business days."""
+    vol_windows: list[int] = [21, 63]
+    """Rolling standard deviation of daily log returns."""
+    volume_z_windows: list[int] = [21]
+    """Z-score of volume against its rolling mean and standard deviation."""
+    ticker_chunk_size: int = TICKER_CHUNK_SIZE
+    full_refresh: bool = False
+    """Drop all stored features and rebuild them from the full price history."""
+
+
+def feature_columns(config: PriceFeaturesConfig) -> list[str]:
+    return (
+        [f"ret_{w}d" for w in config.return_windows]
+        + [f"vol_{w}d" for w in config.vol_windows]
+        + [f"volume_z_{w}d" for w in config.volume_z_windows]
+    )
+
+
+def lookback_days(config: PriceFeaturesConfig) -> int:
+    """Business days of history needed before the first recomputed date."""
+    return max(config.return_windows + config.vol_windows + config.volume_z_windows) + 1 + LOOKBACK_MARGIN_DAYS
+
+
+def ensure_fct_price_features_schema(engine, columns: list[str]) -> list[str]:
+    """Create the table and any missing feature columns; returns the columns that were added."""
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS fct_price_features (
+                ticker TEXT NOT NULL,
+                date DATE NOT NULL,
+                PRIMARY KEY (ticker, date)
+            );
+        """))
+        existing = set(conn.execute(text("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'fct_price_features'
+        """)).scalars())
+        added = [c for c in columns if c not in existing]
+        for column in added:
+            conn.execute(text(f'ALTER TABLE fct_price_features ADD COLUMN IF NOT EXISTS "{column}" DOUBLE PRECISION'))
+        # raw_price_basis.updated_at each ticker's stored features were built against
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS fct_price_features_basis (
+                ticker TEXT PRIMARY KEY,
+                basis_updated_at TIMESTAMP
+            );
+        """))
+    return added
+
+
+def reset_rewritten_tickers(engine) -> int:
+    """
+    Drop the features of tickers whose raw_price history was rewritten since
+    they were built (their raw_price_basis.updated_at moved), so they are
+    recomputed from full history like new tickers. The new basis is recorded
+    in the same transaction: should the rebuild fail, the missing features
+    still mark the ticker for a full recompute.
+    """
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            WITH rewritten AS (
+                SELECT b.ticker, b.updated_at
+                FROM raw_price_basis b
+                LEFT JOIN fct_price_features_basis f ON f.ticker = b.ticker
+                WHERE f.basis_updated_at IS DISTINCT FROM b.updated_at
+            ),
+            dropped AS (
+                DELETE FROM fct_price_features p USING rewritten r WHERE p.ticker = r.ticker
+            )
+            INSERT INTO fct_price_features_basis (ticker, basis_updated_at)
+            SELECT ticker, updated_at FROM rewritten
+            ON CONFLICT (ticker) DO UPDATE SET basis_updated_at = EXCLUDED.basis_updated_at
+        """)).rowcount
+
+
+def get_feature_watermarks(engine) -> pd.DataFrame:
+    """Per ticker: latest raw_price date and latest date with stored features (both may be NULL)."""
+    # Correlated MAX per ticker walks the (ticker, date) primary keys instead of scanning both tables
+    return pd.read_sql(text("""
+        SELECT
+            s.symbol AS ticker,
+            (SELECT MAX(r.date) FROM raw_price r WHERE r.ticker = s.symbol) AS price_max_date,
+            (SELECT MAX(f.date) FROM fct_price_features f WHERE f.ticker = s.symbol) AS feature_max_date
+        FROM (SELECT DISTINCT symbol FROM dim_ticker) s
+    """), engine, parse_dates=["price_max_date", "feature_max_date"])
+
+
+def load_price_history(engine, tickers: list[str], since: pd.Timestamp | None) -> pd.DataFrame:
+    # Split- and dividend-adjusted, so returns and volumes are comparable across corporate actions
+    query = "SELECT ticker, date, close, volume FROM price_adjusted WHERE ticker = ANY(%(tickers)s)"
+    params = {"tickers": list(tickers)}
+    if since is not None:
+        query += " AND date >= %(since)s"
+        params["since"] = since.date()
+    df = copy_select(engine, query, params, dtype={"ticker": str, "close": "float64", "volume": "float64"})
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
+    return df
+
+
+def build_panel(df: pd.DataFrame, tickers: list[str]) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Scatter long (ticker, date) rows into dense business-day x ticker arrays;
+    missing cells are NaN. A fixed business-day calendar keeps every feature
+    independent of which tickers share a chunk. Weekend rows are dropped.
+    """
+    dates = pd.bdate_range(df["date"].min(), df["date"].max()).to_numpy()
+    row = dates.searchsorted(df["date"].to_numpy())
+    on_calendar = (row < len(dates)) & (dates[np.minimum(row, len(dates) - 1)] == df["date"].to_numpy())
+    col = pd.Categorical(df["ticker"], categories=tickers).codes
+    panel = {}
+    for name in ("close", "volume"):
+        values = np.full((len(dates), len(tickers)), np.nan)
+        values[row[on_calendar], col[on_calendar]] = df[name].to_numpy()[on_calendar]
+        panel[name] = values
+    return dates, panel
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    shifted = np.full_like(values, np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:-periods]
+    return shifted
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    rows = np.where(~np.isnan(values), np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return np.take_along_axis(values, rows, axis=0)
+
+
+def _rolling_sums(values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """NaN-aware rolling count, sum and sum of squares via cumulative sums: O(n) for any window."""
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    stacked = np.stack([valid.astype(np.float64), filled, filled * filled])
+    cumulative = np.zeros((3, len(values) + 1, values.shape[1]))
+    np.cumsum(stacked, axis=1, out=cumulative[:, 1:])
+    upper = np.arange(1, len(values) + 1)
+    lower = np.maximum(upper - window, 0)
+    count, total, total_sq = cumulative[:, upper] - cumulative[:, lower]
+    return count, total, total_sq
+
+
+def rolling_mean_std(values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    # Centering each column keeps the sum-of-squares difference numerically stable
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        offset = np.nanmean(values, axis=0)
+    count, total, total_sq = _rolling_sums(values - offset, window)
+
+    min_periods = max(2, math.ceil(window * MIN_PERIODS_RATIO))
+    enough = count >= min_periods
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        var = np.maximum((total_sq - total * mean) / (count - 1), 0.0)
+    return np.where(enough, mean + offset, np.nan), np.where(enough, np.sqrt(var), np.nan)
+
+
+def compute_features(panel: dict[str, np.ndarray], config: PriceFeaturesConfig) -> dict[str, np.ndarray]:
+    close = panel["close"]
+    observed = ~np.isnan(close)
+    # Returns span the ticker's own gaps: a missing day carries the last close forward
+    filled = _ffill(close)
+
+    features = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for w in config.return_windows:
+            features[f"ret_{w}d"] = filled / _shift(filled, w) - 1.0
+
+        log_ret = np.where(observed, np.log(filled / _shift(filled, 1)), np.nan)
+        log_ret[~np.isfinite(log_ret)] = np.nan
+        for w in config.vol_windows:
+            features[f"vol_{w}d"] = rolling_mean_std(log_ret, w)[1]
+
+        volume = panel["volume"]
+        for w in config.volume_z_windows:
+            mean, std = rolling_mean_std(volume, w)
+            features[f"volume_z_{w}d"] = np.where(std > 0, (volume - mean) / std, np.nan)
+
+    for values in features.values():
+        values[~np.isfinite(values)] = np.nan
+    return features
+
+
+def features_frame(
+        dates: np.ndarray,
+        tickers: list[str],
+        panel: dict[str, np.ndarray],
+        features: dict[str, np.ndarray],
+        watermarks: np.ndarray,
+) -> pd.DataFrame:
+    """Long frame of observed (ticker, date) cells newer than each ticker's feature watermark."""
+    write = ~np.isnan(panel["close"]) & (dates[:, None] > watermarks[None, :])
+    row, col = np.nonzero(write)
+    out = pd.DataFrame({
+        "ticker": np.asarray(tickers, dtype=object)[col],
+        "date": pd.DatetimeIndex(dates[row]).date,
+    })
+    for name, values in features.items():
+        out[name] = values[row, col]
+    return out
+
+
+def run_price_features(engine, config: PriceFeaturesConfig = PriceFeaturesConfig(), logger=print) -> int:
+    columns = feature_columns(config)
+    added = ensure_fct_price_features_schema(engine, columns)
+    full_refresh = config.full_refresh
+    if added and not full_refresh:
+        logger(f"[INFO] New feature columns {added}, rebuilding fct_price_features")
+        full_refresh = True
+    if full_refresh:
+        with engine.begin() as conn:
+            conn.execute(text("TRUNCATE fct_price_features"))
+    reset = reset_rewritten_tickers(engine)
+    if reset:
+        logger(f"[INFO] {reset} tickers had their price history rewritten, rebuilding their features")
+
+    marks = get_feature_watermarks(engine)
+    marks = marks[marks["price_max_date"].notna()]
+    marks = marks[marks["feature_max_date"].isna() | (marks["price_max_date"] > marks["feature_max_date"])]
+    if marks.empty:
+        logger("[INFO] fct_price_features is up to date")
+        return 0
+
+    # Tickers without features need full history: keep them in chunks of their own
+    marks = marks.assign(is_new=marks["feature_max_date"].isna()).sort_values(["is_new", "ticker"])
+    chunks = [marks.iloc[i:i + config.ticker_chunk_size] for i in range(0, len(marks), config.ticker_chunk_size)]
+    lookback = BDay(lookback_days(config))
+    logger(f"[INFO] Computing {len(columns)} features for {len(marks)} tickers in {len(chunks)} chunks")
+
+    def load(chunk: pd.DataFrame) -> pd.DataFrame:
+        oldest = chunk["feature_max_date"].min()
+        since = None if chunk["is_new"].any() else oldest - lookback
+        return load_price_history(engine, chunk["ticker"].tolist(), since)
+
+    written = 0
+    # One chunk is read ahead while the current one is computed and written
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(load, chunks[0])
+        for i, chunk in enumerate(chunks):
+            history = pending.result()
+            if i + 1 < len(chunks):
+                pending = executor.submit(load, chunks[i + 1])
+            if history.empty:
+                continue
+
+            tickers = chunk["ticker"].tolist()
+            dates, panel = build_panel(history, tickers)
+            features = compute_features(panel, config)
+            watermarks = chunk["feature_max_date"].fillna(pd.Timestamp.min).to_numpy(dtype="datetime64[ns]")
+            out = features_frame(dates, tickers, panel, features, watermarks)
+
+            result = copy_upsert(engine, out, "fct_price_features", ["ticker", "date"])
+            written += result.written
+            logger(f"[INFO] Chunk {i + 1}/{len(chunks)}: {len(tickers)} tickers, {len(dates)} dates — {result}")
+
+    return written
+
+
+@asset(
+    compute_kind="python",
+    required_resource_keys={"dbt_postgres"},
+    pool=POSTGRES_POOL,
+    op_tags=source_tags(POSTGRES_POOL),
+    deps=[AssetDep("raw_price")],
+)
+def fct_price_features(context: AssetExecutionContext, config: PriceFeaturesConfig) -> None:
+    """Rolling return, volatility and volume features per (ticker, date)."""
+    engine = context.resources.dbt_postgres
+    written = run_price_features(engine, config, logger=context.log.info)
+    context.log.info(f"fct_price_features asset completed — wrote {written} rows.")
+
+
+# CLI entrypoint
+if __name__ == "__main__":
+    engine = engine_from_env()
+    count = run_price_features(engine)
+    print(f"[DONE] Wrote {count} rows into fct_price_features")
@@ -1 +1,62 @@
-jobs = []
\ No newline at end of file
+# dagster/open_quant_kit/jobs.py
+from dagster import AssetSelection, define_asset_job, job
+
+from .dbt import open_quant_kit_dbt_assets
+from .fct.fct_filing_financials import fct_filing_financials
+from .fct.fct_filing_search import fct_filing_search
+from .fct.fct_price_features import fct_price_features
+from .lake.parquet_lake import parquet_lake
+from .raw.raw_filing import raw_filing
+from .raw.raw_filing_archive import raw_filing_archive_backfill
+from .raw.raw_filing_index import raw_filing_index
+from .raw.raw_price import raw_price
+
+# Partitioned raw layers: one run per ticker shard / quarter, so independent
+# partitions and sources run side by side within their pool limits
+raw_price_job = define_asset_job(
+    "raw_price_job",
+    selection=AssetSelection.assets(raw_price),
+    description="Yahoo price ingestion for one ticker shard.",
+)
+
+raw_filing_index_job = define_asset_job(
+    "raw_filing_index_job",
+    selection=AssetSelection.assets(raw_filing_index),
+    description="EDGAR master.idx ingestion for one quarter.",
+)
+
+# dim_cik, the download queue model, the filing downloads, their parsed facts and search index
+sec_filings_job = define_asset_job(
+    "sec_filings_job",
+    selection=AssetSelection.assets(
+        "dim_cik", "stg_filing_download_queue", raw_filing, fct_filing_financials, fct_filing_search,
+    ),
+    description="Refresh dim_cik, queue new filings, download them, parse their facts and index their text.",
+)
+
+dbt_job = define_asset_job(
+    "dbt_job",
+    selection=AssetSelection.assets(open_quant_kit_dbt_assets),
+    description="Build the stale dbt models and seeds.",
+)
+
+price_derived_job = define_asset_job(
+    "price_derived_job",
+    selection=AssetSelection.assets(fct_price_features, parquet_lake),
+    description="Price features and the Parquet lake export, after the raw layers landed.",
+)
+
+
+@job(description="Backfill raw_filing from EDGAR feed archives instead of one request per document.")
+def raw_filing_archive_job():
+    raw_filing_archive_backfill()
+
+
+jobs = [
+    raw_price_job,
+    raw_filing_index_job,
+    sec_filings_job,
+    dbt_job,
+    price_derived_job,
+    raw_filing_archive_job,
+]
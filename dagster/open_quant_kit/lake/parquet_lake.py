@@ -0,0 +1,282 @@
+# dagster/open_quant_kit/lake/parquet_lake.py
+
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+from sqlalchemy import text
+
+from dagster import asset, AssetDep, AssetExecutionContext
+from ..concurrency import POSTGRES_POOL, source_tags
+from ..utils.db import engine_from_env, read_sql_chunks
+
+LAKE_ROOT = os.getenv("OQK_LAKE_DIR", "/app/data/lake")
+EXPORT_CHUNK_ROWS = 500_000
+# Bumped when the export layout changes: a lake with older state is rewritten in full once
+LAKE_STATE_VERSION = 2
+# updated_at and loaded_at are transaction start times, so a load still running
+# during an export commits rows stamped before the saved watermark. Every export
+# looks back this far behind it; rewritten partitions make the overlap harmless.
+WATERMARK_LOOKBACK = pd.Timedelta(days=1)
+
+PRICE_DATASET = "raw_price"
+FILING_INDEX_DATASET = "raw_filing_index"
+
+# Explicit schemas: every file of a dataset has identical column types, whatever pandas inferred for a chunk
+PRICE_SCHEMA = pa.schema([
+    ("ticker", pa.string()),
+    ("date", pa.date32()),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.int64()),
+    ("year", pa.int32()),
+])
+FILING_INDEX_SCHEMA = pa.schema([
+    ("cik", pa.string()),
+    ("company_name", pa.string()),
+    ("form_type", pa.string()),
+    ("date_filed", pa.date32()),
+    ("filename", pa.string()),
+    ("accession", pa.string()),
+    ("loaded_at", pa.timestamp("us")),
+    ("year", pa.int32()),
+    ("quarter", pa.int32()),
+])
+
+PRICE_PARTITIONING = ds.partitioning(pa.schema([("year", pa.int32()), ("ticker", pa.string())]), flavor="hive")
+FILING_INDEX_PARTITIONING = ds.partitioning(pa.schema([("year", pa.int32()), ("quarter", pa.int32())]),
+                                            flavor="hive")
+
+
+def _load_state(dataset_dir: str) -> dict:
+    try:
+        with open(os.path.join(dataset_dir, "_state.json"), "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if state.get("version") == LAKE_STATE_VERSION else {}
+
+
+def _save_state(dataset_dir: str, state: dict) -> None:
+    """Replace the state file atomically, so a crash leaves either the old or the new watermark."""
+    os.makedirs(dataset_dir, exist_ok=True)
+    tmp_path = os.path.join(dataset_dir, f"_state.json.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({**state, "version": LAKE_STATE_VERSION}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(dataset_dir, "_state.json"))
+
+
+def _since(state: dict, key: str):
+    """The saved watermark minus the lookback, or None for a full export."""
+    if not state.get(key):
+        return None
+    return (pd.Timestamp(state[key]) - WATERMARK_LOOKBACK).to_pydatetime()
+
+
+def _rewrite_partitions(batches, dataset_dir: str, schema: pa.Schema, partitioning) -> None:
+    """
+    Write record batches holding every row of the partitions they touch,
+    ordered by partition. Each partition written to is cleared first and gets
+    deterministically named files, so exporting the same rows twice (after a
+    crash before the state was saved, or through the watermark lookback)
+    replaces them instead of duplicating them.
+    """
+    ds.write_dataset(
+        batches,
+        dataset_dir,
+        schema=schema,
+        format="parquet",
+        partitioning=partitioning,
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="delete_matching",
+    )
+
+
+def export_prices(engine, root: str = LAKE_ROOT, logger=print, chunk_rows: int = EXPORT_CHUNK_ROWS) -> int:
+    """
+    Mirror raw_price to <root>/raw_price/year=YYYY/ticker=XYZ/. Every
+    (year, ticker) partition holding a row updated since the watermark is
+    rewritten from Postgres in full, so prices rewritten in place (a full
+    refetch of a ticker) replace the old ones rather than sit beside them.
+    """
+    dataset_dir = os.path.join(root, PRICE_DATASET)
+    state = _load_state(dataset_dir)
+    since = _since(state, "updated_at")
+
+    query = text(f"""
+        WITH touched AS (
+            SELECT DISTINCT ticker, EXTRACT(YEAR FROM date)::int AS year
+            FROM raw_price
+            {"WHERE updated_at >= :since" if since is not None else ""}
+        )
+        SELECT p.ticker, p.date, p.open, p.high, p.low, p.close, p.volume, p.updated_at
+        FROM raw_price p
+        JOIN touched t
+            ON p.ticker = t.ticker
+           AND p.date >= make_date(t.year, 1, 1) AND p.date < make_date(t.year + 1, 1, 1)
+        ORDER BY p.ticker, p.date
+    """)
+    progress = {"rows": 0, "watermark": None}
+
+    def batches():
+        for chunk in read_sql_chunks(engine, query, {"since": since}, chunk_rows):
+            progress["rows"] += len(chunk)
+            latest = pd.Timestamp(chunk["updated_at"].max())
+            if progress["watermark"] is None or latest > progress["watermark"]:
+                progress["watermark"] = latest
+            chunk["date"] = pd.to_datetime(chunk["date"]).dt.date
+            chunk["volume"] = chunk["volume"].astype("Int64")
+            chunk["year"] = pd.to_datetime(chunk["date"]).dt.year.astype("int32")
+            yield from pa.Table.from_pandas(chunk[PRICE_SCHEMA.names], schema=PRICE_SCHEMA,
+                                            preserve_index=False).to_batches()
+
+    _rewrite_partitions(batches(), dataset_dir, PRICE_SCHEMA, PRICE_PARTITIONING)
+    if progress["watermark"] is not None:
+        _save_state(dataset_dir, {"updated_at": progress["watermark"].isoformat()})
+    logger(f"[INFO] Exported {progress['rows']} price rows to {dataset_dir}")
+    return progress["rows"]
+
+
+def export_filing_index(engine, root: str = LAKE_ROOT, logger=print, chunk_rows: int = EXPORT_CHUNK_ROWS) -> int:
+    """
+    Mirror raw_filing_index to <root>/raw_filing_index/year=/quarter=/, rewriting
+    every quarter partition that gained rows since the loaded_at watermark.
+    """
+    dataset_dir = os.path.join(root, FILING_INDEX_DATASET)
+    state = _load_state(dataset_dir)
+    since = _since(state, "loaded_at")
+
+    # Quarters are matched on date_filed ranges, so the BRIN index on date_filed prunes the scan
+    query = text(f"""
+        WITH touched AS (
+            SELECT DISTINCT make_date(EXTRACT(YEAR FROM date_filed)::int,
+                                      EXTRACT(QUARTER FROM date_filed)::int * 3 - 2, 1) AS quarter_start
+            FROM sec_filing_index
+            {"WHERE loaded_at >= :since" if since is not None else ""}
+        )
+        SELECT r.cik, r.company_name, r.form_type, r.date_filed, r.filename, r.accession, r.loaded_at,
+               r.year, r.quarter
+        FROM raw_filing_index r
+        JOIN touched t
+            ON r.date_filed >= t.quarter_start AND r.date_filed < t.quarter_start + interval '3 months'
+        ORDER BY r.year, r.quarter
+    """)
+    progress = {"rows": 0, "watermark": None}
+
+    def batches():
+        for chunk in read_sql_chunks(engine, query, {"since": since}, chunk_rows):
+            progress["rows"] += len(chunk)
+            latest = pd.Timestamp(chunk["loaded_at"].max())
+            if progress["watermark"] is None or latest > progress["watermark"]:
+                progress["watermark"] = latest
+            chunk["date_filed"] = pd.to_datetime(chunk["date_filed"]).dt.date
+            chunk["year"] = chunk["year"].astype("int32")
+            chunk["quarter"] = chunk["quarter"].astype("int32")
+            yield from pa.Table.from_pandas(chunk[FILING_INDEX_SCHEMA.names], schema=FILING_INDEX_SCHEMA,
+                                            preserve_index=False).to_batches()
+
+    _rewrite_partitions(batches(), dataset_dir, FILING_INDEX_SCHEMA, FILING_INDEX_PARTITIONING)
+    if progress["watermark"] is not None:
+        _save_state(dataset_dir, {"loaded_at": progress["watermark"].isoformat()})
+    logger(f"[INFO] Exported {progress['rows']} filing index rows to {dataset_dir}")
+    return progress["rows"]
+
+
+def _dataset(root: str, name: str, schema: pa.Schema, partitioning) -> ds.Dataset:
+    # Memory-mapped reads: column chunks are paged in from the OS cache, not copied
+    return ds.dataset(
+        os.path.join(root, name),
+        schema=schema,
+        format="parquet",
+        partitioning=partitioning,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+        exclude_invalid_files=True,
+    )
+
+
+def _and(expr, condition):
+    return condition if expr is None else expr & condition
+
+
+def _date_filter(column: str, start, end):
+    # The year predicate prunes partition directories before any file is opened
+    expr = None
+    if start is not None:
+        start = pd.Timestamp(start)
+        expr = _and(expr, (ds.field("year") >= start.year) & (ds.field(column) >= pa.scalar(start.date())))
+    if end is not None:
+        end = pd.Timestamp(end)
+        expr = _and(expr, (ds.field("year") <= end.year) & (ds.field(column) <= pa.scalar(end.date())))
+    return expr
+
+
+def load_prices(
+        tickers: list[str] | None = None,
+        start=None,
+        end=None,
+        columns: list[str] | None = None,
+        root: str = LAKE_ROOT,
+) -> pd.DataFrame:
+    """
+    Load a price panel from the Parquet lake. Ticker and year filters prune
+    whole partition directories; date and column selection are pushed down
+    into the Parquet reader.
+    """
+    expr = _date_filter("date", start, end)
+    if tickers is not None:
+        expr = _and(expr, ds.field("ticker").isin(list(tickers)))
+
+    if columns is not None:
+        columns = list(dict.fromkeys(["ticker", "date", *columns]))
+
+    table = _dataset(root, PRICE_DATASET, PRICE_SCHEMA, PRICE_PARTITIONING).to_table(columns=columns, filter=expr)
+    return table.to_pandas().sort_values(["ticker", "date"], ignore_index=True)
+
+
+def load_filing_index(
+        form_types: list[str] | None = None,
+        start=None,
+        end=None,
+        columns: list[str] | None = None,
+        root: str = LAKE_ROOT,
+) -> pd.DataFrame:
+    """Load filing index rows from the Parquet lake, pruning year partitions by the date range."""
+    expr = _date_filter("date_filed", start, end)
+    if form_types is not None:
+        expr = _and(expr, ds.field("form_type").isin(list(form_types)))
+
+    dataset = _dataset(root, FILING_INDEX_DATASET, FILING_INDEX_SCHEMA, FILING_INDEX_PARTITIONING)
+    return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+
+def run_parquet_lake_export(engine, root: str = LAKE_ROOT, logger=print) -> dict:
+    prices = export_prices(engine, root=root, logger=logger)
+    filings = export_filing_index(engine, root=root, logger=logger)
+    return {"price_rows": prices, "filing_index_rows": filings}
+
+
+@asset(
+    compute_kind="python",
+    required_resource_keys={"dbt_postgres"},
+    pool=POSTGRES_POOL,
+    op_tags=source_tags(POSTGRES_POOL),
+    deps=[AssetDep("raw_price"), AssetDep("raw_filing_index")],
+)
+def parquet_lake(context: AssetExecutionContext) -> None:
+    """Mirror raw_price and raw_filing_index into the local Parquet lake."""
+    engine = context.resources.dbt_postgres
+    counts = run_parquet_lake_export(engine, logger=context.log.info)
+    context.log.info(f"parquet_lake asset completed — {counts}")
+
+
+# CLI entrypoint
+if __name__ == "__main__":
+    engine = engine_from_env()
+    print(run_parquet_lake_export(engine))
@@ -0,0 +1,241 @@
+# dagster/open_quant_kit/raw/filing_download_work.py
+
+import os
+import socket
+
+import pandas as pd
+from sqlalchemy import text
+
+# Claimed items are reclaimable by other workers once their lease runs out
+LEASE_SECONDS = int(os.getenv("FILING_LEASE_SECONDS", "900"))
+MAX_ATTEMPTS = int(os.getenv("FILING_MAX_ATTEMPTS", "6"))
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 3600
+
+STATUSES = ("pending", "leased", "done", "poisoned")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def ensure_filing_download_work_schema(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS filing_download_work (
+                accession TEXT PRIMARY KEY,
+                cik TEXT NOT NULL,
+                form_type TEXT,
+                date_filed DATE,
+                year INT,
+                quarter INT,
+                full_url TEXT NOT NULL,
+                tickers TEXT[] NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending'
+                    CHECK (status IN ('pending', 'leased', 'done', 'poisoned')),
+                attempts INT NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMP NOT NULL DEFAULT now(),
+                lease_owner TEXT,
+                lease_expires_at TIMESTAMP,
+                last_error TEXT,
+                enqueued_at TIMESTAMP NOT NULL DEFAULT now(),
+                updated_at TIMESTAMP NOT NULL DEFAULT now()
+            );
+        """))
+        # Claims only look at open items; finished ones stay out of these indexes
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_filing_download_work_pending
+            ON filing_download_work (next_attempt_at) WHERE status = 'pending';
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_filing_download_work_leased
+            ON filing_download_work (lease_expires_at) WHERE status = 'leased';
+        """))
+
+
+def enqueue_filings(engine) -> int:
+    """
+    Add queue rows not yet in filing_download_work, one item per accession with
+    all its tickers. A new ticker for a finished accession reopens the item, so
+    the stored body gets linked to it. Safe to run from several workers at once.
+    """
+    query = text("""
+        INSERT INTO filing_download_work AS w
+            (accession, cik, form_type, date_filed, year, quarter, full_url, tickers)
+        SELECT
+            q.accession,
+            MIN(q.cik),
+            MIN(q.form_type),
+            MIN(q.date_filed)::date,
+            MIN(q.year),
+            MIN(q.quarter),
+            MIN(q.full_url),
+            ARRAY_AGG(DISTINCT q.ticker ORDER BY q.ticker)
+        FROM stg_filing_download_queue q
+        WHERE NOT EXISTS (
+            SELECT 1 FROM filing_download_work w
+            WHERE w.accession = q.accession AND q.ticker = ANY(w.tickers)
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM raw_filing r
+            WHERE r.ticker = q.ticker AND r.accession = q.accession
+        )
+        GROUP BY q.accession
+        ON CONFLICT (accession) DO UPDATE SET
+            tickers = ARRAY(SELECT DISTINCT t FROM UNNEST(w.tickers || EXCLUDED.tickers) t ORDER BY t),
+            status = CASE WHEN w.status = 'done' THEN 'pending' ELSE w.status END,
+            updated_at = now()
+        WHERE NOT (w.tickers @> EXCLUDED.tickers)
+    """)
+    with engine.begin() as conn:
+        return conn.execute(query).rowcount
+
+
+def release_expired_leases(engine, max_attempts: int = MAX_ATTEMPTS) -> int:
+    """Poison items whose worker died holding them on their last attempt; others are reclaimed as they are."""
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            UPDATE filing_download_work
+            SET status = 'poisoned', lease_owner = NULL, lease_expires_at = NULL,
+                last_error = COALESCE(last_error, 'lease expired'), updated_at = now()
+            WHERE status = 'leased' AND lease_expires_at < now() AND attempts >= :max_attempts
+        """), {"max_attempts": max_attempts}).rowcount
+
+
+def claim_batch(
+        engine,
+        worker_id: str,
+        batch_size: int,
+        lease_seconds: int = LEASE_SECONDS,
+) -> pd.DataFrame:
+    """
+    Lease up to `batch_size` due items to `worker_id`, one row per (ticker, accession).
+    SKIP LOCKED lets concurrent workers claim disjoint batches without waiting.
+    """
+    query = text("""
+        WITH claimable AS (
+            SELECT accession
+            FROM filing_download_work
+            WHERE (status = 'pending' AND next_attempt_at <= now())
+               OR (status = 'leased' AND lease_expires_at < now())
+            ORDER BY next_attempt_at
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE filing_download_work w
+        SET status = 'leased',
+            lease_owner = :worker_id,
+            lease_expires_at = now() + make_interval(secs => :lease_seconds),
+            attempts = w.attempts + 1,
+            updated_at = now()
+        FROM claimable c
+        WHERE w.accession = c.accession
+        RETURNING w.accession, w.cik, w.form_type, w.date_filed, w.year, w.quarter, w.full_url, w.tickers
+    """)
+    with engine.begin() as conn:
+        claimed = pd.DataFrame(
+            conn.execute(query, {"worker_id": worker_id, "batch_size": batch_size,
+                                 "lease_seconds": lease_seconds}).mappings().all()
+        )
+    if claimed.empty:
+        return claimed
+    return claimed.explode("tickers").rename(columns={"tickers": "ticker"}).reset_index(drop=True)
+
+
+def settle_batch(
+        engine,
+        worker_id: str,
+        accessions: list[str],
+        error: str = "download or insert failed",
+        max_attempts: int = MAX_ATTEMPTS,
+) -> tuple[int, int]:
+    """
+    Mark leased items done when raw_filing holds every one of their tickers;
+    the rest are retried with exponential backoff, or poisoned after
+    `max_attempts`. Items whose lease passed to another worker are left alone.
+    Returns (done, failed).
+    """
+    params = {"worker_id": worker_id, "accessions": list(accessions)}
+    with engine.begin() as conn:
+        done = conn.execute(text("""
+            UPDATE filing_download_work w
+            SET status = 'done', lease_owner = NULL, lease_expires_at = NULL, last_error = NULL, updated_at = now()
+            WHERE w.accession = ANY(:accessions) AND w.status = 'leased' AND w.lease_owner = :worker_id
+              AND (SELECT COUNT(*) FROM raw_filing r
+                   WHERE r.accession = w.accession AND r.ticker = ANY(w.tickers)) = cardinality(w.tickers)
+        """), params).rowcount
+        failed = conn.execute(text("""
+            UPDATE filing_download_work w
+            SET status = CASE WHEN w.attempts >= :max_attempts THEN 'poisoned' ELSE 'pending' END,
+                next_attempt_at = now() + make_interval(
+                    secs => LEAST(:base_seconds * POWER(2, w.attempts - 1), :max_seconds)),
+                lease_owner = NULL, lease_expires_at = NULL, last_error = :error, updated_at = now()
+            WHERE w.accession = ANY(:accessions) AND w.status = 'leased' AND w.lease_owner = :worker_id
+        """), {**params, "error": error, "max_attempts": max_attempts,
+               "base_seconds": RETRY_BASE_SECONDS, "max_seconds": RETRY_MAX_SECONDS}).rowcount
+    return done, failed
+
+
+def open_work_items(engine, start=None, end=None) -> pd.DataFrame:
+    """
+    Pending and poisoned items and items whose lease expired, one row per
+    (ticker, accession), optionally only those filed between `start` and `end`.
+    Items leased to a live worker are left to it.
+    """
+    query = """
+        SELECT accession, cik, form_type, date_filed, year, quarter, full_url, tickers
+        FROM filing_download_work
+        WHERE (status IN ('pending', 'poisoned') OR (status = 'leased' AND lease_expires_at < now()))
+    """
+    params = {}
+    if start is not None:
+        query += " AND date_filed >= :start"
+        params["start"] = start
+    if end is not None:
+        query += " AND date_filed <= :end"
+        params["end"] = end
+    with engine.connect() as conn:
+        items = pd.DataFrame(conn.execute(text(query), params).mappings().all())
+    if items.empty:
+        return items
+    return items.explode("tickers").rename(columns={"tickers": "ticker"}).reset_index(drop=True)
+
+
+def complete_loaded_items(engine, accessions: list[str]) -> int:
+    """
+    Mark open items done when raw_filing holds every one of their tickers, for
+    bodies loaded outside the lease protocol (bulk archives). Items leased to a
+    live worker are settled by that worker.
+    """
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            UPDATE filing_download_work w
+            SET status = 'done', lease_owner = NULL, lease_expires_at = NULL, last_error = NULL, updated_at = now()
+            WHERE w.accession = ANY(:accessions)
+              AND (w.status IN ('pending', 'poisoned') OR (w.status = 'leased' AND w.lease_expires_at < now()))
+              AND (SELECT COUNT(*) FROM raw_filing r
+                   WHERE r.accession = w.accession AND r.ticker = ANY(w.tickers)) = cardinality(w.tickers)
+        """), {"accessions": list(accessions)}).rowcount
+
+
+def requeue_poisoned(engine, accessions: list[str] | None = None) -> int:
+    """Give poisoned items (all, or the given accessions) a fresh set of attempts."""
+    query = """
+        UPDATE filing_download_work
+        SET status = 'pending', attempts = 0, next_attempt_at = now(), updated_at = now()
+        WHERE status = 'poisoned'
+    """
+    params = {}
+    if accessions is not None:
+        query += " AND accession = ANY(:accessions)"
+        params["accessions"] = list(accessions)
+    with engine.begin() as conn:
+        return conn.execute(text(query), params).rowcount
+
+
+def queue_status(engine) -> dict[str, int]:
+    with engine.connect() as conn:
+        counts = dict(conn.execute(text(
+            "SELECT status, COUNT(*) FROM filing_download_work GROUP BY status"
+        )).fetchall())
+    return {status: counts.get(status, 0) for status in STATUSES}
@@ -0,0 +1,149 @@
+# dagster/open_quant_kit/raw/raw_corporate_action.py
+
+import pandas as pd
+from sqlalchemy import text
+
+from ..utils.bulk_load import copy_upsert
+
+# yfinance columns (lower-cased) carrying corporate actions when downloaded with actions=True
+DIVIDEND_COLUMN = "dividends"
+SPLIT_COLUMN = "stock splits"
+ACTION_COLUMNS = [DIVIDEND_COLUMN, SPLIT_COLUMN]
+
+
+def ensure_raw_corporate_action_schema(engine):
+    """Corporate actions, the per-ticker adjustment factors derived from them, and the adjusted view."""
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS raw_corporate_action (
+                ticker TEXT NOT NULL,
+                ex_date DATE NOT NULL,
+                action_type TEXT NOT NULL CHECK (action_type IN ('split', 'dividend')),
+                -- Split ratio (2.0 for 2-for-1) or unadjusted cash dividend per share
+                value DOUBLE PRECISION NOT NULL,
+                loaded_at TIMESTAMP NOT NULL DEFAULT now(),
+                PRIMARY KEY (ticker, ex_date, action_type)
+            );
+        """))
+        # One row per ticker and interval between actions: adjusted = raw * price_factor
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS price_adjustment_factor (
+                ticker TEXT NOT NULL,
+                valid_from DATE NOT NULL,
+                valid_to DATE NOT NULL,
+                price_factor DOUBLE PRECISION NOT NULL,
+                volume_factor DOUBLE PRECISION NOT NULL,
+                PRIMARY KEY (ticker, valid_to)
+            );
+        """))
+        # Dates after a ticker's last action have no factor row and pass through unchanged
+        conn.execute(text("""
+            CREATE OR REPLACE VIEW price_adjusted AS
+            SELECT
+                p.ticker,
+                p.date,
+                p.open * COALESCE(f.price_factor, 1) AS open,
+                p.high * COALESCE(f.price_factor, 1) AS high,
+                p.low * COALESCE(f.price_factor, 1) AS low,
+                p.close * COALESCE(f.price_factor, 1) AS close,
+                ROUND(p.volume * COALESCE(f.volume_factor, 1))::bigint AS volume,
+                p.close AS close_unadjusted
+            FROM raw_price p
+            LEFT JOIN price_adjustment_factor f
+                ON f.ticker = p.ticker AND p.date >= f.valid_from AND p.date < f.valid_to;
+        """))
+
+
+def unadjust_prices(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Yahoo reports prices, volumes and dividends as split-adjusted up to the
+    download date. Undo the splits inside the downloaded range (the frame's own
+    "stock splits" column) so that stored rows never change when a later split
+    happens. A frame without action columns is returned unchanged.
+    """
+    if SPLIT_COLUMN not in df.columns or df.empty:
+        return df
+
+    df = df.sort_values(["ticker", "date"]).copy()
+    ratio = pd.to_numeric(df[SPLIT_COLUMN], errors="coerce").fillna(0.0)
+    ratio = ratio.where(ratio > 0, 1.0)
+    # Product of the splits strictly after each row's date, within its ticker
+    later_splits = ratio[::-1].groupby(df["ticker"][::-1]).cumprod()[::-1] / ratio
+
+    for column in ("open", "high", "low", "close"):
+        df[column] = df[column] * later_splits
+    df["volume"] = df["volume"] / later_splits
+    if DIVIDEND_COLUMN in df.columns:
+        df[DIVIDEND_COLUMN] = df[DIVIDEND_COLUMN] * later_splits
+    return df
+
+
+def extract_actions(df: pd.DataFrame) -> pd.DataFrame:
+    """Long raw_corporate_action rows from the action columns of a price frame."""
+    frames = []
+    for column, action_type in ((SPLIT_COLUMN, "split"), (DIVIDEND_COLUMN, "dividend")):
+        if column not in df.columns:
+            continue
+        values = pd.to_numeric(df[column], errors="coerce")
+        rows = df.loc[values > 0, ["ticker", "date"]].assign(action_type=action_type, value=values[values > 0])
+        frames.append(rows.rename(columns={"date": "ex_date"}))
+    if not frames:
+        return pd.DataFrame(columns=["ticker", "ex_date", "action_type", "value"])
+    actions = pd.concat(frames, ignore_index=True)
+    actions["ex_date"] = pd.to_datetime(actions["ex_date"]).dt.date
+    return actions
+
+
+def insert_corporate_actions(engine, actions: pd.DataFrame) -> int:
+    if actions.empty:
+        return 0
+    result = copy_upsert(engine, actions, "raw_corporate_action",
+                         key_columns=["ticker", "ex_date", "action_type"], update_columns=["value"])
+    return result.written
+
+
+def refresh_adjustment_factors(engine, tickers: list[str]) -> int:
+    """
+    Recompute price_adjustment_factor for `tickers` from their actions: the
+    factor of a date is the product, over actions with a later ex-date, of
+    1/ratio for splits and 1 - dividend / previous close for dividends
+    (backward adjustment, as Yahoo's adjusted close). Costs one small
+    statement per call, whatever the length of the price history.
+    """
+    if not tickers:
+        return 0
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM price_adjustment_factor WHERE ticker = ANY(:tickers)"),
+                     {"tickers": list(tickers)})
+        return conn.execute(text("""
+            INSERT INTO price_adjustment_factor (ticker, valid_from, valid_to, price_factor, volume_factor)
+            WITH multipliers AS (
+                SELECT
+                    a.ticker,
+                    a.ex_date,
+                    EXP(SUM(LN(CASE
+                        WHEN a.action_type = 'split' THEN 1.0 / a.value
+                        WHEN prev.close > a.value THEN 1.0 - a.value / prev.close
+                        ELSE 1.0
+                    END))) AS price_mult,
+                    EXP(SUM(LN(CASE WHEN a.action_type = 'split' THEN a.value ELSE 1.0 END))) AS volume_mult
+                FROM raw_corporate_action a
+                LEFT JOIN LATERAL (
+                    SELECT p.close FROM raw_price p
+                    WHERE p.ticker = a.ticker AND p.date < a.ex_date
+                    ORDER BY p.date DESC
+                    LIMIT 1
+                ) prev ON true
+                WHERE a.ticker = ANY(:tickers) AND a.value > 0
+                GROUP BY a.ticker, a.ex_date
+            )
+            SELECT
+                ticker,
+                COALESCE(LAG(ex_date) OVER w, '-infinity'::date) AS valid_from,
+                ex_date AS valid_to,
+                EXP(SUM(LN(price_mult)) OVER r) AS price_factor,
+                EXP(SUM(LN(volume_mult)) OVER r) AS volume_factor
+            FROM multipliers
+            WINDOW w AS (PARTITION BY ticker ORDER BY ex_date),
+                   r AS (PARTITION BY ticker ORDER BY ex_date DESC)
+        """), {"tickers": list(tickers)}).rowcount
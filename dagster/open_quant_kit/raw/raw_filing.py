@@ -1,16 +1,40 @@
 # dagster/open_quant_kit/raw/raw_filing.py
 
 import os
+import queue
+import tempfile
+import threading
 from datetime import datetime
 
 import pandas as pd
 import requests
-from sqlalchemy import create_engine, text
-from tqdm import tqdm
+from sqlalchemy import text
 
-from dagster import asset, AssetDep, AssetExecutionContext
+from dagster import asset, AssetDep, AssetExecutionContext, Config, MaterializeResult
+from ..concurrency import SEC_POOL, source_tags
+from ..utils.bulk_load import copy_upsert
+from ..utils.compression import DEFAULT_CODEC, compress_bytes, compress_stream, decompress_bytes
+from ..utils.db import engine_from_env
+from ..utils.http import TokenBucket, build_session, get_with_retry
+from ..utils.http_cache import HttpCache, get_http_cache
+from ..utils.telemetry import ProgressReporter, asset_telemetry, current_telemetry, materialize_result
+from .filing_download_work import (
+    LEASE_SECONDS,
+    claim_batch,
+    default_worker_id,
+    enqueue_filings,
+    ensure_filing_download_work_schema,
+    queue_status,
+    release_expired_leases,
+    settle_batch,
+)
 
 SEC_USER_AGENT = os.getenv("SEC_CONTACT_EMAIL", "your@email.com")
+# SEC fair-access policy allows at most 10 requests/second per client
+SEC_REQUESTS_PER_SECOND = float(os.getenv("SEC_REQUESTS_PER_SECOND", "10"))
+# Bodies larger than this spill from memory to a temporary file while downloading
+SPOOL_MAX_MEMORY_BYTES = 1 << 20
+DOWNLOAD_CHUNK_BYTES = 1 << 16
 
 
 def ensure_raw_filing_schema(engine):
@@ -23,107 +47,418 @@ def ensure_raw_filing_schema(engine):
                 form_type TEXT,
                 filing_date DATE,
                 content TEXT,
+                content_sha256 TEXT,
                 downloaded_at TIMESTAMP,
                 PRIMARY KEY (ticker, accession)
             );
         """))
+        # raw_filing.content is legacy; bodies now live once per accession in raw_filing_content
+        conn.execute(text("ALTER TABLE raw_filing ADD COLUMN IF NOT EXISTS content_sha256 TEXT;"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_raw_filing_accession ON raw_filing (accession);"))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS raw_filing_content (
+                accession TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                codec TEXT NOT NULL,
+                raw_size BIGINT NOT NULL,
+                stored_size BIGINT NOT NULL,
+                content BYTEA NOT NULL,
+                stored_at TIMESTAMP
+            );
+        """))
+        # Payloads are already compressed: store them out of line without a second pglz pass
+        conn.execute(text("ALTER TABLE raw_filing_content ALTER COLUMN content SET STORAGE EXTERNAL;"))
 
 
-def download_filing_text(url: str) -> str | None:
+def filing_accession(url: str) -> str:
+    return os.path.basename(url).replace(".txt", "")
+
+
+def download_filing_to_spool(
+        url: str,
+        session: requests.Session | None = None,
+        rate_limiter: TokenBucket | None = None,
+        cache: HttpCache | None = None,
+):
+    """
+    Stream a filing into a spooled temporary file, rewound and ready to read.
+    With a cache, the cached body file is returned instead (and filled on a miss).
+    """
     try:
-        headers = {"User-Agent": SEC_USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.text
+        if session is None:
+            session = build_session(SEC_USER_AGENT, pool_size=1)
+        if cache is not None:
+            return open(cache.get(session, url, rate_limiter=rate_limiter).path, "rb")
+
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY_BYTES)
+        with get_with_retry(session, url, rate_limiter=rate_limiter, stream=True) as response:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                spool.write(chunk)
+        spool.seek(0)
+        return spool
     except Exception as e:
         print(f"[ERROR] Failed to download {url}: {e}")
         return None
 
 
+def download_filing_text(
+        url: str,
+        session: requests.Session | None = None,
+        rate_limiter: TokenBucket | None = None,
+        cache: HttpCache | None = None,
+) -> str | None:
+    spool = download_filing_to_spool(url, session=session, rate_limiter=rate_limiter, cache=cache)
+    if spool is None:
+        return None
+    with spool:
+        return spool.read().decode("utf-8", errors="replace")
+
+
+def _content_row(accession: str, payload: bytes, sha256: str, raw_size: int, codec: str = DEFAULT_CODEC) -> dict:
+    return {
+        "accession": accession,
+        "sha256": sha256,
+        "codec": codec,
+        "raw_size": raw_size,
+        "stored_size": len(payload),
+        # COPY csv takes bytea in hex form
+        "content": "\\x" + payload.hex(),
+        "stored_at": datetime.utcnow(),
+    }
+
+
+def get_stored_accessions(engine, accessions: list[str]) -> dict[str, str]:
+    """Return {accession: sha256} for accessions whose body is already in raw_filing_content."""
+    if not accessions:
+        return {}
+    query = text("SELECT accession, sha256 FROM raw_filing_content WHERE accession = ANY(:accessions)")
+    with engine.connect() as conn:
+        return dict(conn.execute(query, {"accessions": list(accessions)}).fetchall())
+
+
+def read_filing_content(engine, accession: str) -> str | None:
+    """Return the decompressed body of a filing, falling back to legacy inline content."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("SELECT codec, content FROM raw_filing_content WHERE accession = :accession"),
+            {"accession": accession},
+        ).fetchone()
+        if row is not None:
+            return decompress_bytes(bytes(row.content), row.codec).decode("utf-8", errors="replace")
+
+        legacy = conn.execute(
+            text("SELECT content FROM raw_filing WHERE accession = :accession AND content IS NOT NULL LIMIT 1"),
+            {"accession": accession},
+        ).fetchone()
+        return legacy.content if legacy is not None else None
+
+
+def insert_filing_contents(engine, contents: list[dict]) -> int:
+    """
+    Store compressed bodies. Failures propagate: callers only link raw_filing
+    rows to bodies that this call confirmed stored.
+    """
+    if not contents:
+        return 0
+    df = pd.DataFrame(contents)
+    result = copy_upsert(engine, df, "raw_filing_content", key_columns=["accession"], on_conflict="nothing")
+    return result.inserted
+
+
 def insert_filings(engine, filings: list[dict]) -> int:
     if not filings:
         return 0
     try:
         df = pd.DataFrame(filings)
-        df.to_sql("raw_filing", con=engine, if_exists="append", index=False, method="multi")
-        return len(df)
+        result = copy_upsert(engine, df, "raw_filing", key_columns=["ticker", "accession"], on_conflict="nothing")
     except Exception as e:
         print(f"[ERROR] DB insert failed: {e}")
         return 0
 
+    if result.skipped:
+        print(f"[INFO] raw_filing: {result}")
+    return result.inserted
+
+
+def migrate_inline_filing_content(engine, logger=print, batch_size: int = 50) -> int:
+    """Move legacy raw_filing.content bodies into raw_filing_content, one batch at a time."""
+    query = text("""
+        SELECT DISTINCT ON (accession) accession, content
+        FROM raw_filing
+        WHERE content IS NOT NULL
+        ORDER BY accession
+        LIMIT :limit
+    """)
+    migrated = 0
+    while True:
+        with engine.connect() as conn:
+            batch = conn.execute(query, {"limit": batch_size}).fetchall()
+        if not batch:
+            break
+
+        contents = []
+        for accession, content in batch:
+            payload, sha256, raw_size = compress_bytes(content.encode("utf-8"))
+            contents.append(_content_row(accession, payload, sha256, raw_size))
+        # Let failures propagate: inline bodies are only cleared once their copy is stored
+        copy_upsert(engine, pd.DataFrame(contents), "raw_filing_content", key_columns=["accession"],
+                    on_conflict="nothing")
+
+        with engine.begin() as conn:
+            for row in contents:
+                conn.execute(
+                    text("UPDATE raw_filing SET content = NULL, content_sha256 = :sha256 WHERE accession = :accession"),
+                    {"sha256": row["sha256"], "accession": row["accession"]},
+                )
+        migrated += len(batch)
+
+    if migrated:
+        logger(f"[INFO] Moved {migrated} inline filing bodies to raw_filing_content")
+    return migrated
+
+
+_WORKER_DONE = object()
+
+
+def _feed_work(items: list[dict], work: queue.Queue, num_workers: int) -> None:
+    for item in items:
+        work.put(item)
+    for _ in range(num_workers):
+        work.put(None)
+
+
+def _download_worker(session, rate_limiter, cache, work: queue.Queue, results: queue.Queue) -> None:
+    try:
+        while True:
+            item = work.get()
+            if item is None:
+                return
+
+            spool = download_filing_to_spool(item["url"], session=session, rate_limiter=rate_limiter, cache=cache)
+            if spool is None:
+                results.put((item, None))
+                continue
+            try:
+                with spool, current_telemetry().timer("filing_compress_seconds"):
+                    payload, sha256, raw_size = compress_stream(spool)
+            except Exception as e:
+                print(f"[ERROR] Failed to compress {item['url']}: {e}")
+                results.put((item, None))
+                continue
+            results.put((item, _content_row(item["accession"], payload, sha256, raw_size)))
+    finally:
+        # Always signal, so the writer loop never waits on a dead worker
+        results.put(_WORKER_DONE)
+
+
+def _filing_rows(queue_rows: list[dict], accession: str, sha256: str) -> list[dict]:
+    return [
+        {
+            "ticker": row["ticker"],
+            "cik": row["cik"],
+            "accession": accession,
+            "form_type": row["form_type"],
+            "filing_date": pd.to_datetime(row["date_filed"]).date(),
+            "content_sha256": sha256,
+            "downloaded_at": datetime.utcnow(),
+        }
+        for row in queue_rows
+    ]
+
+
+def _store_batch(engine, contents: list[dict], rows: list[dict], logger=print) -> int:
+    """
+    Write a batch of bodies, then the raw_filing rows that reference them.
+    Bodies go first, so a raw_filing row never points at a missing body: when
+    the body COPY fails, only rows of bodies stored earlier are linked, and the
+    batch's accessions stay unsettled for settle_batch to retry.
+    """
+    if contents:
+        try:
+            insert_filing_contents(engine, contents)
+        except Exception as e:
+            logger(f"[ERROR] DB insert into raw_filing_content failed: {e}")
+            current_telemetry().inc("filings_failed", len(contents))
+            unstored = {content["accession"] for content in contents}
+            rows = [row for row in rows if row["accession"] not in unstored]
+    return insert_filings(engine, rows)
+
+
+def download_filings(
+        engine,
+        filings_df: pd.DataFrame,
+        logger=print,
+        batch_size: int = 25,
+        max_workers: int = 8,
+        requests_per_second: float = SEC_REQUESTS_PER_SECOND,
+        queue_size: int = 64,
+) -> int:
+    """
+    Download filings with a pool of worker threads sharing one keep-alive session
+    and one global rate limiter. Results flow through a bounded queue to the
+    calling thread, which is the only DB writer, so memory stays flat.
+
+    Each accession is downloaded once, however many tickers map to its CIK,
+    and stored compressed in raw_filing_content.
+    """
+    if filings_df.empty:
+        logger("[INFO] Inserted 0 filings to raw_filing")
+        return 0
+
+    by_accession: dict[str, dict] = {}
+    for row in filings_df.to_dict("records"):
+        accession = filing_accession(row["full_url"])
+        item = by_accession.setdefault(accession, {"accession": accession, "url": row["full_url"], "rows": []})
+        item["rows"].append(row)
 
-def download_filings(engine, filings_df: pd.DataFrame, logger=print, batch_size: int = 25) -> int:
     inserted = 0
     rows = []
+    contents = []
 
-    for i, row in tqdm(filings_df.iterrows(), total=len(filings_df), desc="Downloading filings"):
-        ticker = row["ticker"]
-        cik = row["cik"]
-        form = row["form_type"]
-        date_filed = pd.to_datetime(row["date_filed"]).date()
-        url = row["full_url"]
+    # Bodies already stored for another ticker only need their raw_filing references
+    stored = get_stored_accessions(engine, list(by_accession))
+    for accession, sha256 in stored.items():
+        rows.extend(_filing_rows(by_accession.pop(accession)["rows"], accession, sha256))
+    if stored:
+        logger(f"[INFO] {len(stored)} accessions already stored, linking without download")
 
-        accession = os.path.basename(url).replace(".txt", "")
-        year = row.get("year", "unknown")
-        quarter = row.get("quarter", "unknown")
+    items = list(by_accession.values())
+    num_workers = max(1, min(max_workers, len(items)))
+    session = build_session(SEC_USER_AGENT, pool_size=num_workers)
+    rate_limiter = TokenBucket(requests_per_second)
+    cache = get_http_cache()
+    work = queue.Queue(maxsize=queue_size)
+    results = queue.Queue(maxsize=queue_size)
 
-        logger(f"{ticker}: Downloading {form} from {url} ({year} Q{quarter})")
+    threads = [threading.Thread(target=_feed_work, args=(items, work, num_workers), daemon=True)]
+    threads += [
+        threading.Thread(target=_download_worker, args=(session, rate_limiter, cache, work, results), daemon=True)
+        for _ in range(num_workers)
+    ]
+    for thread in threads:
+        thread.start()
 
-        content = download_filing_text(url)
-        if not content:
-            continue
+    finished_workers = 0
 
-        rows.append({
-            "ticker": ticker,
-            "cik": cik,
-            "accession": accession,
-            "form_type": form,
-            "filing_date": date_filed,
-            "content": content,
-            "downloaded_at": datetime.utcnow()
-        })
+    telemetry = current_telemetry()
+    with ProgressReporter(len(items), "Downloading filings", logger=logger) as progress:
+        while finished_workers < num_workers:
+            result = results.get()
+            if result is _WORKER_DONE:
+                finished_workers += 1
+                continue
+
+            item, content = result
+            progress.update(1)
+            if content is None:
+                telemetry.inc("filings_failed")
+                continue
+            telemetry.inc("filing_bytes_stored", content["stored_size"])
 
-        if len(rows) >= batch_size:
-            inserted += insert_filings(engine, rows)
-            rows = []
+            first = item["rows"][0]
+            logger(f"{first['ticker']}: Downloaded {first['form_type']} from {item['url']} "
+                   f"({first.get('year', 'unknown')} Q{first.get('quarter', 'unknown')}, "
+                   f"{content['raw_size']} → {content['stored_size']} bytes)")
+
+            contents.append(content)
+            rows.extend(_filing_rows(item["rows"], item["accession"], content["sha256"]))
+
+            if len(contents) >= batch_size:
+                inserted += _store_batch(engine, contents, rows, logger=logger)
+                contents, rows = [], []
 
     # Insert any remaining rows
-    if rows:
-        inserted += insert_filings(engine, rows)
+    inserted += _store_batch(engine, contents, rows, logger=logger)
 
+    session.close()
+    if cache is not None:
+        logger(f"[INFO] HTTP cache: {cache.stats.as_dict()}")
     logger(f"[INFO] Inserted {inserted} filings to raw_filing")
     return inserted
 
 
-def run_raw_filing_ingestion(engine, logger=print) -> int:
+class RawFilingConfig(Config):
+    batch_size: int = 100
+    """Accessions leased per claim."""
+    lease_seconds: int = LEASE_SECONDS
+    """How long a claimed batch stays with this worker before others may take it over."""
+    max_batches: int = 0
+    """Stop after this many batches; 0 drains the queue."""
+
+
+def run_raw_filing_ingestion(
+        engine,
+        logger=print,
+        worker_id: str | None = None,
+        batch_size: int = 100,
+        lease_seconds: int = LEASE_SECONDS,
+        max_batches: int = 0,
+) -> int:
+    """
+    Drain filing_download_work: claim a leased batch, download it, settle it.
+    Any number of workers, on any machines, can run this against one database;
+    a crashed worker's batch is picked up again once its lease expires.
+    """
     ensure_raw_filing_schema(engine)
+    ensure_filing_download_work_schema(engine)
+    migrate_inline_filing_content(engine, logger=logger)
+    worker_id = worker_id or default_worker_id()
 
     try:
-        df = pd.read_sql("SELECT * FROM stg_filing_download_queue", con=engine)
+        enqueued = enqueue_filings(engine)
     except Exception as e:
         logger(f"[ERROR] Could not read stg_filing_download_queue: {e}")
         return 0
+    logger(f"[INFO] Enqueued or reopened {enqueued} accessions; queue: {queue_status(engine)}")
+
+    telemetry = current_telemetry()
+    inserted = 0
+    batches = 0
+    while not max_batches or batches < max_batches:
+        poisoned = release_expired_leases(engine)
+        if poisoned:
+            logger(f"[ERROR] Poisoned {poisoned} accessions whose last lease expired")
+        claimed = claim_batch(engine, worker_id, batch_size, lease_seconds=lease_seconds)
+        if claimed.empty:
+            break
 
-    logger(f"[INFO] Found {len(df)} filings to download")
-    return download_filings(engine, df, logger=logger)
+        batches += 1
+        accessions = claimed["accession"].unique().tolist()
+        logger(f"[INFO] {worker_id}: claimed batch {batches} of {len(accessions)} accessions")
+        inserted += download_filings(engine, claimed, logger=logger)
+        done, failed = settle_batch(engine, worker_id, accessions)
+        telemetry.inc("work_items_done", done)
+        telemetry.inc("work_items_failed", failed)
+        if failed:
+            logger(f"[ERROR] {failed} accessions failed: retried with backoff, or poisoned after their last attempt")
+
+    logger(f"[INFO] {worker_id}: processed {batches} batches, inserted {inserted}; queue: {queue_status(engine)}")
+    return inserted
 
 
 @asset(
     compute_kind="python",
     required_resource_keys={"dbt_postgres"},
+    pool=SEC_POOL,
+    op_tags=source_tags(SEC_POOL),
     deps=[AssetDep("stg_filing_download_queue")],
 )
-def raw_filing(context: AssetExecutionContext):
+def raw_filing(context: AssetExecutionContext, config: RawFilingConfig) -> MaterializeResult:
     engine = context.resources.dbt_postgres
-    inserted = run_raw_filing_ingestion(engine, logger=context.log.info)
+    with asset_telemetry(context) as telemetry:
+        inserted = run_raw_filing_ingestion(
+            engine,
+            logger=context.log.info,
+            worker_id=f"{default_worker_id()}:{context.run_id[:8]}",
+            batch_size=config.batch_size,
+            lease_seconds=config.lease_seconds,
+            max_batches=config.max_batches,
+        )
     context.log.info(f"raw_filing complete. Inserted: {inserted}")
+    return materialize_result(telemetry, inserted=inserted, **{f"queue_{k}": v for k, v in queue_status(engine).items()})
 
 
 # CLI entrypoint
 if __name__ == "__main__":
-    DATABASE_URL = os.getenv("POSTGRES_DB_URL", "").replace("postgres://", "postgresql://")
-    if not DATABASE_URL:
-        raise ValueError("POSTGRES_DB_URL is not set")
-
-    engine = create_engine(DATABASE_URL)
+    engine = engine_from_env()
     run_raw_filing_ingestion(engine)
@@ -0,0 +1,306 @@
+# dagster/open_quant_kit/raw/raw_filing_archive.py
+
+import gzip
+import os
+import re
+import sys
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from dagster import AssetMaterialization, Config, OpExecutionContext, op
+from ..concurrency import SEC_POOL, source_tags
+from ..utils.compression import compress_stream
+from ..utils.db import create_pg_engine, engine_from_env
+from ..utils.http import TokenBucket, build_session, get_with_retry
+from ..utils.http_cache import get_http_cache
+from ..utils.telemetry import ProgressReporter, Telemetry, activate, current_telemetry
+from .filing_download_work import (
+    complete_loaded_items,
+    enqueue_filings,
+    ensure_filing_download_work_schema,
+    open_work_items,
+    queue_status,
+)
+from .raw_filing import (
+    SEC_REQUESTS_PER_SECOND,
+    SEC_USER_AGENT,
+    _content_row,
+    _filing_rows,
+    ensure_raw_filing_schema,
+    insert_filing_contents,
+    insert_filings,
+)
+from .raw_filing_index import SEC_ARCHIVES_URL
+
+# Members are full submissions named by accession: 0000950170-23-000394.nc, .txt or .corr01.nc, maybe gzipped
+_MEMBER_ACCESSION_RE = re.compile(r"^([0-9]{10}-[0-9]{2}-[0-9]{6})\b")
+_ARCHIVE_DATE_RE = re.compile(r"(?<![0-9])((?:19|20)[0-9]{6})(?![0-9])")
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz")
+# A feed archive holds the submissions disseminated that day; their filing date can
+# be a few days earlier (late acceptances, corrections), so the queue lookup is widened
+ARCHIVE_DATE_SLACK_DAYS = 5
+# Accessions written per COPY round trip in a worker
+ARCHIVE_BATCH_ACCESSIONS = 50
+
+
+def feed_archive_url(day: date) -> str:
+    """EDGAR's daily feed archive: every full submission disseminated on `day`."""
+    quarter = (day.month - 1) // 3 + 1
+    return f"{SEC_ARCHIVES_URL}/edgar/Feed/{day.year}/QTR{quarter}/{day:%Y%m%d}.nc.tar.gz"
+
+
+def feed_archive_urls(start: date, end: date) -> list[str]:
+    """Feed archive URLs for the weekdays between `start` and `end`; holidays simply fail to download."""
+    return [feed_archive_url(day.date()) for day in pd.bdate_range(start, end)]
+
+
+def expand_sources(sources: list[str]) -> list[str]:
+    """Directories expand to the archives they hold; files and URLs pass through."""
+    expanded = []
+    for source in sources:
+        if os.path.isdir(source):
+            expanded.extend(sorted(
+                os.path.join(source, name) for name in os.listdir(source) if name.endswith(ARCHIVE_SUFFIXES)
+            ))
+        else:
+            expanded.append(source)
+    return expanded
+
+
+def archive_date(source: str) -> date | None:
+    match = _ARCHIVE_DATE_RE.search(os.path.basename(source))
+    if match is None:
+        return None
+    try:
+        return datetime.strptime(match.group(1), "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def member_accession(name: str) -> str | None:
+    match = _MEMBER_ACCESSION_RE.match(os.path.basename(name))
+    return match.group(1) if match else None
+
+
+@contextmanager
+def open_archive(source: str, use_cache: bool = False):
+    """
+    Open a tar archive (plain, gzip, bzip2 or xz) as a forward-only stream of
+    members, from a local path or a URL. URLs are streamed straight from the
+    response, so nothing is written to disk; with `use_cache`, a feed archive
+    (several GB) is first downloaded in full into the HTTP cache.
+    """
+    session = None
+    if source.startswith(("http://", "https://")):
+        session = build_session(SEC_USER_AGENT, pool_size=1)
+        rate_limiter = TokenBucket(SEC_REQUESTS_PER_SECOND)
+        cache = get_http_cache() if use_cache else None
+        if cache is not None:
+            fileobj = open(cache.get(session, source, rate_limiter=rate_limiter).path, "rb")
+        else:
+            fileobj = get_with_retry(session, source, rate_limiter=rate_limiter, stream=True, timeout=300).raw
+    else:
+        fileobj = open(source, "rb")
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            yield archive
+    finally:
+        fileobj.close()
+        if session is not None:
+            session.close()
+
+
+def _queued_by_accession(engine, source: str) -> dict[str, list[dict]]:
+    day = archive_date(source)
+    slack = timedelta(days=ARCHIVE_DATE_SLACK_DAYS)
+    items = open_work_items(engine, *((day - slack, day + slack) if day else (None, None)))
+    queued: dict[str, list[dict]] = {}
+    for row in items.to_dict("records"):
+        queued.setdefault(row["accession"], []).append(row)
+    return queued
+
+
+def ingest_archive(
+        source: str,
+        db_url: str,
+        batch_accessions: int = ARCHIVE_BATCH_ACCESSIONS,
+        use_cache: bool = False,
+) -> dict:
+    """
+    Stream one archive and store the submissions of open queue items, member by
+    member: each body is compressed straight from the tar stream and written in
+    COPY batches. Runs in a worker process with its own connection.
+    """
+    start = time.perf_counter()
+    stats = {"source": source, "members": 0, "matched": 0, "inserted": 0, "completed": 0, "failed": 0,
+             "raw_bytes": 0, "stored_bytes": 0, "error": None}
+    engine = create_pg_engine(db_url, pool_size=1, max_overflow=0)
+    contents, rows = [], []
+
+    def flush() -> None:
+        nonlocal contents, rows
+        if not contents:
+            return
+        # Bodies first, so a raw_filing row never points at a missing body
+        try:
+            insert_filing_contents(engine, contents)
+        except Exception as e:
+            # Nothing of the batch is linked or completed: its items stay open for raw_filing
+            stats["failed"] += len(contents)
+            stats["error"] = f"{type(e).__name__}: {e}"
+        else:
+            stats["inserted"] += insert_filings(engine, rows)
+            # Settled per batch, so a failure later in the stream keeps what was stored. Only
+            # items whose raw_filing rows all landed are completed, so a failed row insert
+            # leaves its items open too
+            stats["completed"] += complete_loaded_items(engine, [content["accession"] for content in contents])
+        contents, rows = [], []
+
+    try:
+        queued = _queued_by_accession(engine, source)
+        if queued:
+            with open_archive(source, use_cache=use_cache) as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    stats["members"] += 1
+                    accession = member_accession(member.name)
+                    queue_rows = queued.pop(accession, None) if accession else None
+                    if queue_rows is None:
+                        continue
+
+                    body = archive.extractfile(member)
+                    if member.name.endswith(".gz"):
+                        body = gzip.GzipFile(fileobj=body)
+                    with body:
+                        payload, sha256, raw_size = compress_stream(body)
+                    content = _content_row(accession, payload, sha256, raw_size)
+                    contents.append(content)
+                    rows.extend(_filing_rows(queue_rows, accession, sha256))
+                    stats["matched"] += 1
+                    stats["raw_bytes"] += raw_size
+                    stats["stored_bytes"] += content["stored_size"]
+                    if len(contents) >= batch_accessions:
+                        flush()
+                    if not queued:
+                        # Every queued accession of this window is stored; skip the rest of the stream
+                        break
+        flush()
+    except Exception as e:
+        stats["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        engine.dispose()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def run_filing_archive_ingestion(
+        engine,
+        sources: list[str],
+        logger=print,
+        max_workers: int = 0,
+        use_http_cache: bool = False,
+) -> int:
+    """
+    Backfill raw_filing from EDGAR bulk feed archives instead of one request per
+    document. Each archive is streamed by a worker process that keeps only the
+    submissions of open filing_download_work items; loaded items are marked
+    done, so the regular raw_filing run only fetches what the archives missed.
+    """
+    ensure_raw_filing_schema(engine)
+    ensure_filing_download_work_schema(engine)
+    try:
+        enqueued = enqueue_filings(engine)
+    except Exception as e:
+        logger(f"[ERROR] Could not read stg_filing_download_queue: {e}")
+        return 0
+    logger(f"[INFO] Enqueued or reopened {enqueued} accessions; queue: {queue_status(engine)}")
+
+    sources = expand_sources(sources)
+    if not sources:
+        logger("[INFO] No archives to ingest")
+        return 0
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(sources)))
+    db_url = engine.url.render_as_string(hide_password=False)
+    logger(f"[INFO] Ingesting {len(sources)} archives with {workers} processes")
+    telemetry = current_telemetry()
+    inserted = 0
+
+    with ProgressReporter(len(sources), "Ingesting archives", logger=logger) as progress, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(ingest_archive, source, db_url, use_cache=use_http_cache) for source in sources]
+        for future in as_completed(futures):
+            stats = future.result()
+            progress.update(1)
+            telemetry.observe("archive_seconds", stats["seconds"])
+            telemetry.inc("archive_members_scanned", stats["members"])
+            telemetry.inc("filings_matched", stats["matched"])
+            telemetry.inc("work_items_done", stats["completed"])
+            telemetry.inc("filings_failed", stats["failed"])
+            telemetry.inc("filing_bytes_stored", stats["stored_bytes"])
+            if stats["error"]:
+                telemetry.inc("archives_failed")
+                logger(f"[ERROR] {stats['source']}: {stats['error']}")
+            else:
+                logger(f"[INFO] {os.path.basename(stats['source'])}: {stats['matched']} of {stats['members']} "
+                       f"submissions queued, {stats['raw_bytes']} → {stats['stored_bytes']} bytes "
+                       f"in {stats['seconds']:.1f}s")
+            inserted += stats["inserted"]
+
+    logger(f"[INFO] Inserted {inserted} filings from archives; queue: {queue_status(engine)}")
+    return inserted
+
+
+class RawFilingArchiveConfig(Config):
+    sources: list[str] = []
+    """Archive files, directories of archives or URLs."""
+    start: str | None = None
+    """With `end`, also ingest EDGAR's daily feed archives for this range (YYYY-MM-DD)."""
+    end: str | None = None
+    """Last feed archive day, inclusive."""
+    max_workers: int = 0
+    """Archive processes; 0 uses every core."""
+    use_http_cache: bool = False
+    """Download archive URLs in full into the HTTP cache before reading them, instead of streaming them."""
+
+
+@op(
+    required_resource_keys={"dbt_postgres"},
+    pool=SEC_POOL,
+    tags=source_tags(SEC_POOL),
+)
+def raw_filing_archive_backfill(context: OpExecutionContext, config: RawFilingArchiveConfig):
+    """Bulk mode of raw_filing: load queued filings from feed archives."""
+    engine = context.resources.dbt_postgres
+    sources = list(config.sources)
+    if config.start and config.end:
+        sources += feed_archive_urls(date.fromisoformat(config.start), date.fromisoformat(config.end))
+    with activate(Telemetry("raw_filing_archive")) as telemetry:
+        inserted = run_filing_archive_ingestion(engine, sources, logger=context.log.info,
+                                                max_workers=config.max_workers,
+                                                use_http_cache=config.use_http_cache)
+    context.log_event(AssetMaterialization(
+        asset_key="raw_filing",
+        description="Bulk archive backfill",
+        metadata={**telemetry.as_metadata(), "inserted": inserted, "archives": len(sources),
+                  **{f"queue_{k}": v for k, v in queue_status(engine).items()}},
+    ))
+
+
+# CLI entrypoint: archive paths, directories or URLs, or a START END date range of feed archives
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    try:
+        start, end = (date.fromisoformat(arg) for arg in args)
+        args = feed_archive_urls(start, end)
+    except ValueError:
+        pass
+    engine = engine_from_env()
+    count = run_filing_archive_ingestion(engine, args)
+    print(f"[DONE] Inserted {count} filings from {len(args)} archives")
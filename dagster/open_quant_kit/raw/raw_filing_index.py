@@ -1,151 +1,582 @@
 # dagster/open_quant_kit/raw/raw_filing_index.py
 
+import csv
+import io
 import os
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Iterator, NamedTuple
+
 import pandas as pd
-import requests
-from sqlalchemy import create_engine, text
-from datetime import datetime
-from tqdm import tqdm
-
-from dagster import asset, AssetExecutionContext
-
-
-def get_latest_ingested_quarter(engine):
-    query = text("""
-        SELECT year, quarter
-        FROM raw_filing_index
-        GROUP BY year, quarter
-        ORDER BY year DESC, quarter DESC
-        LIMIT 1
-    """)
-    try:
-        df = pd.read_sql(query, con=engine)
-        if df.empty:
-            return None, None
-        return int(df["year"].iloc[0]), int(df["quarter"].iloc[0])
-    except Exception as e:
-        print(f"[ERROR] Failed to retrieve latest year/quarter: {e}")
-        return None, None
+from sqlalchemy import text
 
+from dagster import asset, AssetExecutionContext, Config, MaterializeResult, TimeWindowPartitionsDefinition
+from ..concurrency import SEC_INDEX_POOL, source_tags
+from ..utils.bulk_load import COPY_CHUNK_ROWS, copy_frame
+from ..utils.db import engine_from_env
+from ..utils.http import build_session, get_with_retry
+from ..utils.http_cache import get_http_cache
+from ..utils.telemetry import ProgressReporter, asset_telemetry, current_telemetry, materialize_result
+
+# Overridable so benchmarks can point the ingestion at a local EDGAR stand-in
+SEC_ARCHIVES_URL = os.getenv("SEC_ARCHIVES_URL", "https://www.sec.gov/Archives").rstrip("/")
+FIRST_INDEX_YEAR = 1994
+# A quarter's master.idx is treated as final once it was ingested this many days after quarter end
+QUARTER_SETTLE_DAYS = 7
+
+# One partition per calendar quarter; end_offset=1 includes the quarter still in progress
+raw_filing_index_partitions = TimeWindowPartitionsDefinition(
+    cron_schedule="0 0 1 1,4,7,10 *",
+    start=datetime(FIRST_INDEX_YEAR, 1, 1),
+    fmt="%Y-%m-%d",
+    end_offset=1,
+)
 
-def ensure_raw_filing_index_schema(engine):
+
+# Accession numbers look like 0000950170-23-000394: 18 digits, so they fit a BIGINT
+ACCESSION_PATTERN = r"^[0-9]{10}-[0-9]{2}-[0-9]{6}$"
+# Pinned ids of the forms stg_filing_download_queue reads, so partial indexes and
+# the dbt model can name them as literals
+PERIODIC_FORM_TYPE_IDS = {"10-K": 1, "10-Q": 2}
+
+
+def ensure_raw_filing_index_schema(engine, logger=print):
+    """
+    Normalized filing index: sec_filing_index holds one narrow row per
+    (accession, cik) with integer keys, form types are dictionary-encoded in
+    sec_form_type and company names live once per CIK in sec_company_name.
+    raw_filing_index is a view with the original text columns.
+
+    Quarter partitions call this concurrently, so the DDL only runs while the
+    schema is incomplete, serialized by an advisory lock: concurrent CREATE OR
+    REPLACE of one function or view fails with "tuple concurrently updated".
+    """
+    if _raw_filing_index_schema_ready(engine):
+        return
     with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('raw_filing_index_schema'))"))
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION sec_accession_id(accession TEXT) RETURNS BIGINT
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE
+            AS $$ SELECT replace(accession, '-', '')::bigint $$;
+        """))
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION sec_accession_text(accession BIGINT) RETURNS TEXT
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE
+            AS $$
+                SELECT substr(a, 1, 10) || '-' || substr(a, 11, 2) || '-' || substr(a, 13, 6)
+                FROM lpad(accession::text, 18, '0') a
+            $$;
+        """))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS sec_form_type (
+                form_type_id SMALLSERIAL PRIMARY KEY,
+                form_type TEXT NOT NULL UNIQUE
+            );
+        """))
+        pinned = conn.execute(text("""
+            INSERT INTO sec_form_type (form_type_id, form_type)
+            SELECT * FROM unnest(CAST(:ids AS SMALLINT[]), CAST(:form_types AS TEXT[]))
+            ON CONFLICT DO NOTHING
+        """), {"ids": list(PERIODIC_FORM_TYPE_IDS.values()), "form_types": list(PERIODIC_FORM_TYPE_IDS)}).rowcount
+        if pinned:
+            # Move the sequence past the pinned ids once, when they were first written
+            conn.execute(text("""
+                SELECT setval(pg_get_serial_sequence('sec_form_type', 'form_type_id'), MAX(form_type_id))
+                FROM sec_form_type
+            """))
+        # Every name a CIK filed under, with the first and last filing date seen for it
         conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS raw_filing_index (
-                cik TEXT NOT NULL,
-                company_name TEXT,
-                form_type TEXT,
-                date_filed DATE,
-                filename TEXT,
-                year INT,
-                quarter INT,
-                PRIMARY KEY (cik, form_type, date_filed, filename)
+            CREATE TABLE IF NOT EXISTS sec_company_name (
+                company_name_id SERIAL PRIMARY KEY,
+                cik INT NOT NULL,
+                company_name TEXT NOT NULL,
+                first_filed DATE NOT NULL,
+                last_filed DATE NOT NULL,
+                UNIQUE (cik, company_name)
             );
         """))
+        # Columns ordered widest first to avoid alignment padding. filename is only
+        # stored when it differs from edgar/data/<cik>/<accession>.txt. No foreign keys:
+        # the loader resolves every id itself and per-row RI checks would dominate the load
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS sec_filing_index (
+                accession BIGINT NOT NULL,
+                loaded_at TIMESTAMP NOT NULL DEFAULT now(),
+                cik INT NOT NULL,
+                company_name_id INT NOT NULL,
+                date_filed DATE NOT NULL,
+                form_type_id SMALLINT NOT NULL,
+                filename_override TEXT,
+                PRIMARY KEY (accession, cik)
+            );
+        """))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_sec_filing_index_cik ON sec_filing_index (cik);"))
+        periodic_ids = ", ".join(str(i) for i in PERIODIC_FORM_TYPE_IDS.values())
+        conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS idx_sec_filing_index_periodic_loaded_at
+            ON sec_filing_index (loaded_at) WHERE form_type_id IN ({periodic_ids});
+        """))
+        # Rows are appended in load order, so a BRIN index serves the loaded_at watermark scans
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_sec_filing_index_loaded_at
+            ON sec_filing_index USING brin (loaded_at);
+        """))
+        # Quarters load as blocks, so date_filed follows the physical order too (Parquet lake quarter reads)
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_sec_filing_index_date_filed
+            ON sec_filing_index USING brin (date_filed);
+        """))
+
+        legacy = conn.execute(text("""
+            SELECT c.relkind FROM pg_class c
+            WHERE c.oid = to_regclass('raw_filing_index')
+        """)).scalar()
+        if legacy == "r":
+            _migrate_legacy_filing_index(conn, logger)
+
+        conn.execute(text("""
+            CREATE OR REPLACE VIEW raw_filing_index AS
+            SELECT
+                lpad(f.cik::text, 10, '0') AS cik,
+                n.company_name,
+                t.form_type,
+                f.date_filed,
+                COALESCE(
+                    f.filename_override,
+                    'edgar/data/' || f.cik || '/' || sec_accession_text(f.accession) || '.txt'
+                ) AS filename,
+                EXTRACT(YEAR FROM f.date_filed)::int AS year,
+                EXTRACT(QUARTER FROM f.date_filed)::int AS quarter,
+                sec_accession_text(f.accession) AS accession,
+                f.loaded_at
+            FROM sec_filing_index f
+            JOIN sec_form_type t USING (form_type_id)
+            JOIN sec_company_name n USING (company_name_id);
+        """))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS raw_filing_index_state (
+                year INT NOT NULL,
+                quarter INT NOT NULL,
+                status TEXT NOT NULL,
+                row_count BIGINT,
+                inserted_count BIGINT,
+                etag TEXT,
+                last_modified TEXT,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                error TEXT,
+                PRIMARY KEY (year, quarter)
+            );
+        """))
+
+
+def _raw_filing_index_schema_ready(engine) -> bool:
+    """True when every object of the normalized layout exists and no legacy table is left."""
+    with engine.connect() as conn:
+        return bool(conn.execute(text("""
+            SELECT to_regprocedure('sec_accession_id(text)') IS NOT NULL
+               AND to_regprocedure('sec_accession_text(bigint)') IS NOT NULL
+               AND to_regclass('sec_filing_index') IS NOT NULL
+               AND to_regclass('idx_sec_filing_index_date_filed') IS NOT NULL
+               AND to_regclass('raw_filing_index_state') IS NOT NULL
+               AND (SELECT relkind FROM pg_class WHERE oid = to_regclass('raw_filing_index')) = 'v'
+        """)).scalar())
+
+
+def _normalize_staged_rows(conn, stage: str, loaded_at: str) -> int:
+    """
+    Add the form types and company names of the rows in `stage` to their
+    dictionaries, then insert the rows into sec_filing_index. `stage` has the
+    STAGE_COLUMNS (integer accession and cik); `loaded_at` is a SQL expression.
+    Returns the number of new rows.
+    """
+    # Insert only missing keys: ON CONFLICT alone would burn a sequence value per existing row
+    conn.execute(text(f"""
+        INSERT INTO sec_form_type (form_type)
+        SELECT DISTINCT s.form_type FROM {stage} s
+        WHERE NOT EXISTS (SELECT 1 FROM sec_form_type t WHERE t.form_type = s.form_type)
+        ON CONFLICT (form_type) DO NOTHING
+    """))
+    conn.execute(text(f"""
+        CREATE TEMP TABLE {stage}_names ON COMMIT DROP AS
+        SELECT cik, company_name, MIN(date_filed) AS first_filed, MAX(date_filed) AS last_filed
+        FROM {stage}
+        GROUP BY cik, company_name
+    """))
+    conn.execute(text(f"""
+        UPDATE sec_company_name n
+        SET first_filed = LEAST(n.first_filed, s.first_filed), last_filed = GREATEST(n.last_filed, s.last_filed)
+        FROM {stage}_names s
+        WHERE n.cik = s.cik AND n.company_name = s.company_name
+          AND (s.first_filed < n.first_filed OR s.last_filed > n.last_filed)
+    """))
+    conn.execute(text(f"""
+        INSERT INTO sec_company_name (cik, company_name, first_filed, last_filed)
+        SELECT s.cik, s.company_name, s.first_filed, s.last_filed FROM {stage}_names s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM sec_company_name n WHERE n.cik = s.cik AND n.company_name = s.company_name
+        )
+        ON CONFLICT (cik, company_name) DO NOTHING
+    """))
+    return conn.execute(text(f"""
+        INSERT INTO sec_filing_index
+            (accession, loaded_at, cik, company_name_id, date_filed, form_type_id, filename_override)
+        SELECT s.accession, {loaded_at}, s.cik, n.company_name_id, s.date_filed, t.form_type_id, s.filename_override
+        FROM {stage} s
+        JOIN sec_form_type t ON t.form_type = s.form_type
+        JOIN sec_company_name n ON n.cik = s.cik AND n.company_name = s.company_name
+        ON CONFLICT (accession, cik) DO NOTHING
+    """)).rowcount
+
+
+def _migrate_legacy_filing_index(conn, logger=print) -> None:
+    """One-time move of the old text-keyed raw_filing_index table into the normalized layout."""
+    has_loaded_at = conn.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'raw_filing_index' AND column_name = 'loaded_at'
+    """)).fetchone()
+    total = conn.execute(text("SELECT COUNT(*) FROM raw_filing_index")).scalar()
+    logger(f"[INFO] Migrating {total} raw_filing_index rows to sec_filing_index")
+
+    conn.execute(text("ALTER TABLE raw_filing_index RENAME TO raw_filing_index_legacy"))
+    conn.execute(text(f"""
+        CREATE TEMP TABLE raw_filing_index_legacy_rows ON COMMIT DROP AS
+        SELECT
+            sec_accession_id(accession) AS accession,
+            cik,
+            company_name,
+            form_type,
+            date_filed,
+            NULLIF(filename, 'edgar/data/' || cik || '/' || accession || '.txt') AS filename_override,
+            loaded_at
+        FROM (
+            SELECT
+                cik::int AS cik,
+                COALESCE(company_name, '') AS company_name,
+                COALESCE(form_type, '') AS form_type,
+                date_filed,
+                filename,
+                regexp_replace(filename, '^.*/|\\.txt$', '', 'g') AS accession,
+                {"COALESCE(loaded_at, now())" if has_loaded_at else "now()"} AS loaded_at
+            FROM raw_filing_index_legacy
+            WHERE cik ~ '^[0-9]{{1,10}}$' AND date_filed IS NOT NULL
+        ) legacy
+        WHERE accession ~ :pattern
+    """), {"pattern": ACCESSION_PATTERN})
+    conn.execute(text("ANALYZE raw_filing_index_legacy_rows"))
+    migrated = _normalize_staged_rows(conn, "raw_filing_index_legacy_rows", "s.loaded_at")
+    conn.execute(text("DROP TABLE raw_filing_index_legacy"))
+    logger(f"[INFO] Migrated {migrated} of {total} rows; {total - migrated} duplicate or malformed rows dropped")
+
+
+def partition_key_to_quarter(partition_key: str) -> tuple[int, int]:
+    start = datetime.strptime(partition_key, "%Y-%m-%d")
+    return start.year, (start.month - 1) // 3 + 1
+
+
+def quarter_end(year: int, quarter: int) -> date:
+    if quarter == 4:
+        return date(year, 12, 31)
+    return date(year, 3 * quarter + 1, 1) - timedelta(days=1)
 
 
-def download_master_idx(year: int, quarter: int):
-    url = f"https://www.sec.gov/Archives/edgar/full-index/{year}/QTR{quarter}/master.idx"
+def get_quarter_state(engine, year: int, quarter: int) -> dict | None:
+    query = text("SELECT * FROM raw_filing_index_state WHERE year = :year AND quarter = :quarter")
+    with engine.connect() as conn:
+        row = conn.execute(query, {"year": year, "quarter": quarter}).mappings().fetchone()
+    return dict(row) if row is not None else None
+
+
+def set_quarter_state(engine, year: int, quarter: int, status: str, **fields) -> None:
+    """Upsert the state row of one quarter; only the given fields are overwritten."""
+    values = {"year": year, "quarter": quarter, "status": status, **fields}
+    columns = ", ".join(values)
+    placeholders = ", ".join(f":{c}" for c in values)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in values if c not in ("year", "quarter"))
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            INSERT INTO raw_filing_index_state ({columns}) VALUES ({placeholders})
+            ON CONFLICT (year, quarter) DO UPDATE SET {updates}
+        """), values)
+
+
+def is_quarter_final(state: dict | None, year: int, quarter: int) -> bool:
+    """A quarter is final once it completed after its master.idx stopped changing."""
+    if not state or state["status"] != "complete" or state["finished_at"] is None:
+        return False
+    return state["finished_at"].date() >= quarter_end(year, quarter) + timedelta(days=QUARTER_SETTLE_DAYS)
+
+
+MASTER_IDX_COLUMNS = ["cik", "company_name", "form_type", "date_filed", "filename"]
+# Rows per chunk streamed from the parser into the bulk writer
+INDEX_CHUNK_ROWS = 100_000
+
+
+class MasterIdxFetch(NamedTuple):
+    data: bytes | None
+    etag: str | None = None
+    last_modified: str | None = None
+    not_modified: bool = False
+
+
+def fetch_master_idx(
+        year: int,
+        quarter: int,
+        etag: str | None = None,
+        last_modified: str | None = None,
+) -> MasterIdxFetch:
+    """
+    Download master.idx through the HTTP cache. Settled quarters are served from
+    disk; open ones are revalidated. `etag`/`last_modified` are the validators of
+    the last ingest: when they still match, the result is flagged not_modified.
+    """
+    url = f"{SEC_ARCHIVES_URL}/edgar/full-index/{year}/QTR{quarter}/master.idx"
+    session = build_session("OpenQuantKit/1.0 <your@email.com>", pool_size=1)
+    cache = get_http_cache()
+
     try:
-        response = requests.get(url, headers={"User-Agent": "OpenQuantKit/1.0 <your@email.com>"})
-        if response.status_code != 200:
-            print(f"[WARN] Failed to download {url} (status {response.status_code})")
-            return []
-
-        lines = response.text.splitlines()
-        start_index = next(i for i, line in enumerate(lines) if line.startswith("CIK|"))
-        rows = []
-
-        for line in lines[start_index + 1:]:
-            parts = line.split("|")
-            if len(parts) == 5:
-                cik, name, form_type, date_filed, filename = parts
-                try:
-                    date_parsed = pd.to_datetime(date_filed, errors="coerce")
-                    if pd.isna(date_parsed):
-                        continue
-                    filing_year = date_parsed.year
-                    filing_quarter = (date_parsed.month - 1) // 3 + 1
-                    rows.append({
-                        "cik": str(cik).zfill(10),
-                        "company_name": name,
-                        "form_type": form_type,
-                        "date_filed": date_parsed.date(),
-                        "filename": filename,
-                        "year": filing_year,
-                        "quarter": filing_quarter,
-                    })
-                except Exception:
-                    continue
-        return rows
+        if cache is None:
+            response = get_with_retry(session, url)
+            data, new_etag, new_last_modified = (
+                response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        else:
+            cached = cache.get(session, url)
+            data, new_etag, new_last_modified = cached.read_bytes(), cached.etag, cached.last_modified
     except Exception as e:
-        print(f"[ERROR] {url}: {e}")
-        return []
+        print(f"[WARN] Failed to download {url}: {e}")
+        return MasterIdxFetch(None)
+    finally:
+        session.close()
+
+    if (etag or last_modified) and (etag, last_modified) == (new_etag, new_last_modified):
+        return MasterIdxFetch(None, etag, last_modified, not_modified=True)
+    return MasterIdxFetch(data, new_etag, new_last_modified)
+
+
+def _master_idx_body(data: bytes) -> io.BytesIO:
+    """Skip the free-text preamble, the 'CIK|...' header and the dashed separator line."""
+    header = data.find(b"CIK|")
+    if header < 0:
+        return io.BytesIO(b"")
+    body = data.find(b"\n", header)
+    if data.startswith(b"-", body + 1):
+        body = data.find(b"\n", body + 1)
+    return io.BytesIO(data[body + 1:] if body >= 0 else b"")
+
+
+def _finalize_master_idx(df: pd.DataFrame) -> pd.DataFrame:
+    """Whole-column date parsing, CIK padding and year/quarter derivation."""
+    dates = pd.to_datetime(df["date_filed"], format="%Y-%m-%d", errors="coerce")
+    valid = dates.notna().to_numpy()
+    df = df.loc[valid]
+    dates = dates[valid]
+
+    return pd.DataFrame({
+        "cik": df["cik"].str.zfill(10),
+        "company_name": df["company_name"],
+        "form_type": df["form_type"],
+        "date_filed": dates,
+        "filename": df["filename"],
+        "year": dates.dt.year.astype("int32"),
+        "quarter": ((dates.dt.month - 1) // 3 + 1).astype("int32"),
+        "accession": df["filename"].str.rsplit("/", n=1).str[-1].str.removesuffix(".txt"),
+    })
+
+
+def iter_master_idx_chunks(data: bytes, chunksize: int = INDEX_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Parse a master.idx body in one columnar pass, yielding chunks of at most `chunksize` rows."""
+    reader = pd.read_csv(
+        _master_idx_body(data),
+        sep="|",
+        names=MASTER_IDX_COLUMNS,
+        header=None,
+        dtype=str,
+        na_filter=False,
+        quoting=csv.QUOTE_NONE,
+        encoding="latin-1",
+        on_bad_lines="skip",
+        engine="c",
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        chunk = _finalize_master_idx(chunk)
+        if not chunk.empty:
+            yield chunk
+
+
+def parse_master_idx(data: bytes) -> pd.DataFrame:
+    chunks = list(iter_master_idx_chunks(data))
+    if not chunks:
+        return pd.DataFrame(columns=MASTER_IDX_COLUMNS + ["year", "quarter", "accession"])
+    return pd.concat(chunks, ignore_index=True)
+
+
+def download_master_idx(year: int, quarter: int) -> pd.DataFrame:
+    data = fetch_master_idx(year, quarter).data
+    if data is None:
+        return pd.DataFrame(columns=MASTER_IDX_COLUMNS + ["year", "quarter", "accession"])
+    return parse_master_idx(data)
+
+
+def to_stage_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parsed master.idx rows as sec_filing_index staging rows: integer accession
+    and cik, and filename only where it is not the derivable default. Rows with
+    a malformed accession or CIK are dropped.
+    """
+    accession = df["accession"].where(df["accession"].str.fullmatch(ACCESSION_PATTERN, na=False))
+    cik = pd.to_numeric(df["cik"], errors="coerce")
+    valid = (accession.notna() & cik.notna()).to_numpy()
+    df, accession, cik = df.loc[valid], accession[valid], cik[valid].astype("int64")
+
+    default_filename = "edgar/data/" + cik.astype(str) + "/" + accession + ".txt"
+    return pd.DataFrame({
+        "accession": accession.str.replace("-", "", regex=False).astype("int64"),
+        "cik": cik,
+        "company_name": df["company_name"],
+        "form_type": df["form_type"],
+        "date_filed": df["date_filed"],
+        "filename_override": df["filename"].where(df["filename"] != default_filename),
+    })
 
 
 def insert_filing_index(engine, df: pd.DataFrame):
+    """
+    COPY parsed master.idx rows into a staging table and normalize them into
+    sec_filing_index. Failures propagate, so the quarter is recorded as failed
+    and retried instead of being marked complete with rows missing.
+    """
     if df.empty:
         return 0
-    try:
-        with engine.begin() as conn:
-            df.to_sql("raw_filing_index", con=conn, if_exists="append", index=False, method="multi")
-        return len(df)
-    except Exception as e:
-        print(f"[ERROR] Insert failed: {e}")
+    stage_df = to_stage_frame(df)
+    if len(stage_df) < len(df):
+        current_telemetry().inc("index_rows_rejected", len(df) - len(stage_df))
+    stage = f"_filing_index_{uuid.uuid4().hex[:8]}"
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            CREATE TEMP TABLE {stage} (
+                accession BIGINT, cik INT, company_name TEXT, form_type TEXT,
+                date_filed DATE, filename_override TEXT
+            ) ON COMMIT DROP
+        """))
+        copy_frame(conn.connection.cursor(), stage_df, stage, COPY_CHUNK_ROWS)
+        conn.execute(text(f"ANALYZE {stage}"))
+        inserted = _normalize_staged_rows(conn, stage, "now()")
+
+    if inserted < len(df):
+        print(f"[INFO] raw_filing_index: inserted {inserted}, skipped {len(df) - inserted}")
+    return inserted
+
+
+def ingest_filing_index_quarter(engine, year: int, quarter: int, logger=print, force: bool = False) -> int:
+    """
+    Ingest one quarter idempotently and record the outcome in raw_filing_index_state.
+    Final quarters are skipped unless forced; open quarters are revalidated and
+    re-parsed only when the source changed.
+    """
+    telemetry = current_telemetry()
+    state = get_quarter_state(engine, year, quarter)
+    if not force and is_quarter_final(state, year, quarter):
+        telemetry.inc("quarters_final")
+        logger(f"{year} Q{quarter}: final, {state['row_count']} rows already ingested")
         return 0
 
+    revalidate = not force and state is not None and state["status"] == "complete"
+    fetched = fetch_master_idx(
+        year, quarter,
+        etag=state["etag"] if revalidate else None,
+        last_modified=state["last_modified"] if revalidate else None,
+    )
+    if fetched.not_modified:
+        telemetry.inc("quarters_not_modified")
+        set_quarter_state(engine, year, quarter, "complete", finished_at=datetime.utcnow())
+        logger(f"{year} Q{quarter}: not modified since last ingest")
+        return 0
+    if fetched.data is None:
+        telemetry.inc("quarters_failed")
+        set_quarter_state(engine, year, quarter, "failed", finished_at=datetime.utcnow(), error="download failed")
+        # Fail the partition run, so the quarter shows as failed and can be retried
+        raise RuntimeError(f"Failed to download master.idx for {year} Q{quarter}")
 
-def run_raw_filing_index_ingestion(engine, from_year=1994, logger=print):
-    ensure_raw_filing_index_schema(engine)
-    latest_year, latest_quarter = get_latest_ingested_quarter(engine)
+    set_quarter_state(engine, year, quarter, "running", started_at=datetime.utcnow(), error=None)
+    row_count = 0
+    inserted = 0
+    try:
+        # Stream parsed chunks straight into the bulk writer
+        for chunk in iter_master_idx_chunks(fetched.data):
+            row_count += len(chunk)
+            inserted += insert_filing_index(engine, chunk)
+    except Exception as e:
+        telemetry.inc("quarters_failed")
+        set_quarter_state(engine, year, quarter, "failed", finished_at=datetime.utcnow(), error=str(e))
+        raise
 
-    if latest_year and latest_quarter:
-        logger(f"Latest existing filings: {latest_year} Q{latest_quarter}")
-    else:
-        logger("No existing filings found in database — starting from scratch.")
+    telemetry.inc("index_rows_parsed", row_count)
+    set_quarter_state(
+        engine, year, quarter, "complete",
+        row_count=row_count,
+        inserted_count=inserted,
+        etag=fetched.etag,
+        last_modified=fetched.last_modified,
+        finished_at=datetime.utcnow(),
+    )
+    logger(f"{year} Q{quarter}: Parsed {row_count}, inserted {inserted}")
+    return inserted
 
-    today = datetime.today()
-    total_inserted = 0
 
-    for year in tqdm(range(from_year, today.year + 1), desc="Year"):
+def iter_quarters(from_year: int = FIRST_INDEX_YEAR, today: date | None = None) -> Iterator[tuple[int, int]]:
+    today = today or date.today()
+    current_quarter = (today.month - 1) // 3 + 1
+    for year in range(from_year, today.year + 1):
         for quarter in range(1, 5):
             # Skip future quarters
-            if year == today.year and quarter > (today.month - 1) // 3 + 1:
-                break
+            if year == today.year and quarter > current_quarter:
+                return
+            yield year, quarter
 
-            # Skip previously ingested quarters
-            if latest_year is not None:
-                if year < latest_year or (year == latest_year and quarter <= latest_quarter):
-                    continue
 
-            filings = download_master_idx(year, quarter)
-            if not filings:
-                continue
+def run_raw_filing_index_ingestion(engine, from_year=FIRST_INDEX_YEAR, logger=print):
+    ensure_raw_filing_index_schema(engine, logger=logger)
 
-            df = pd.DataFrame(filings)
-            count = insert_filing_index(engine, df)
-            logger(f"{year} Q{quarter}: Inserted {count}")
-            total_inserted += count
+    total_inserted = 0
+    quarters = list(iter_quarters(from_year))
+    with ProgressReporter(len(quarters), "Quarter", logger=logger) as progress:
+        for year, quarter in quarters:
+            try:
+                total_inserted += ingest_filing_index_quarter(engine, year, quarter, logger=logger)
+            except Exception as e:
+                logger(f"[ERROR] {year} Q{quarter}: {e}")
+            progress.update(1)
 
     logger(f"[DONE] Total inserted: {total_inserted}")
     return total_inserted
 
 
+class RawFilingIndexConfig(Config):
+    force: bool = False
+    """Re-download and re-parse the quarter even if it is already final."""
+
+
 @asset(
     compute_kind="python",
     required_resource_keys={"dbt_postgres"},
+    pool=SEC_INDEX_POOL,
+    op_tags=source_tags(SEC_INDEX_POOL),
+    partitions_def=raw_filing_index_partitions,
 )
-def raw_filing_index(context: AssetExecutionContext) -> None:
+def raw_filing_index(context: AssetExecutionContext, config: RawFilingIndexConfig) -> MaterializeResult:
     engine = context.resources.dbt_postgres
-    inserted = run_raw_filing_index_ingestion(engine, logger=context.log.info)
-    context.log.info(f"raw_filing_index asset completed — inserted {inserted} rows.")
+    year, quarter = partition_key_to_quarter(context.partition_key)
+
+    ensure_raw_filing_index_schema(engine, logger=context.log.info)
+    with asset_telemetry(context) as telemetry:
+        inserted = ingest_filing_index_quarter(engine, year, quarter, logger=context.log.info, force=config.force)
+    context.log.info(f"raw_filing_index {year} Q{quarter} completed — inserted {inserted} rows.")
+    return materialize_result(telemetry, inserted=inserted)
 
 
 # CLI test hook
 if __name__ == "__main__":
-    DATABASE_URL = os.getenv('POSTGRES_DB_URL', '').replace("postgres://", "postgresql://")
-    if not DATABASE_URL:
-        raise ValueError("POSTGRES_DB_URL not set")
-
-    engine = create_engine(DATABASE_URL)
+    engine = engine_from_env()
     run_raw_filing_index_ingestion(engine)
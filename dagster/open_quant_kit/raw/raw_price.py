@@ -1,33 +1,139 @@
+import hashlib
 import os
+import random
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import timedelta
+from typing import Callable
 
 import pandas as pd
 import yfinance as yf
 from pandas.tseries.offsets import BDay
-from sqlalchemy import create_engine, text
-from tqdm import tqdm
-
-from dagster import asset, AssetDep, AssetExecutionContext
+from sqlalchemy import text
+
+from dagster import asset, AssetDep, AssetExecutionContext, MaterializeResult, StaticPartitionsDefinition
+from ..concurrency import YAHOO_POOL, source_tags
+from ..utils.bulk_load import copy_upsert
+from ..utils.db import engine_from_env
+from ..utils.telemetry import ProgressReporter, asset_telemetry, current_telemetry, materialize_result
+from .raw_corporate_action import (
+    ACTION_COLUMNS,
+    ensure_raw_corporate_action_schema,
+    extract_actions,
+    insert_corporate_actions,
+    refresh_adjustment_factors,
+    unadjust_prices,
+)
 
 
-def ensure_raw_price_schema(engine) -> None:
-    """Ensure raw_price table and indexes exist."""
+RAW_PRICE_COLUMNS_DDL = """
+    ticker TEXT NOT NULL,
+    date DATE NOT NULL,
+    open DOUBLE PRECISION,
+    high DOUBLE PRECISION,
+    low DOUBLE PRECISION,
+    close DOUBLE PRECISION,
+    volume BIGINT,
+    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (ticker, date)
+"""
+
+# Years for which a raw_price partition is known to exist in this process
+_known_partition_years: set[int] = set()
+
+
+def _raw_price_relkind(conn) -> str | None:
+    return conn.execute(text("""
+        SELECT c.relkind FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema() AND c.relname = 'raw_price'
+    """)).scalar()
+
+
+def _create_year_partition(conn, year: int) -> None:
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS raw_price_y{year} PARTITION OF raw_price
+        FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01');
+    """))
+
+
+def ensure_raw_price_partitions(engine, years) -> None:
+    """Create the yearly partitions needed for `years`; cheap once a year is known."""
+    missing = sorted({int(y) for y in years} - _known_partition_years)
+    for year in missing:
+        try:
+            with engine.begin() as conn:
+                _create_year_partition(conn, year)
+        except Exception:
+            # Another shard may have created it concurrently; verify it exists now
+            with engine.connect() as conn:
+                if conn.execute(text(f"SELECT to_regclass('raw_price_y{year}')")).scalar() is None:
+                    raise
+        _known_partition_years.add(year)
+
+
+def migrate_raw_price_to_partitioned(conn, logger=print) -> None:
+    """Move a legacy heap raw_price into the partitioned layout, in the caller's transaction."""
+    logger("[INFO] Migrating raw_price to a year-partitioned table")
+    conn.execute(text("ALTER TABLE raw_price RENAME TO raw_price_legacy;"))
+    conn.execute(text("ALTER TABLE raw_price_legacy RENAME CONSTRAINT raw_price_pkey TO raw_price_legacy_pkey;"))
+    conn.execute(text("DROP INDEX IF EXISTS idx_raw_price_date, idx_raw_price_ticker, idx_raw_price_ticker_date;"))
+    conn.execute(text(f"CREATE TABLE raw_price ({RAW_PRICE_COLUMNS_DDL}) PARTITION BY RANGE (date);"))
+
+    bounds = conn.execute(text(
+        "SELECT EXTRACT(YEAR FROM MIN(date))::int, EXTRACT(YEAR FROM MAX(date))::int FROM raw_price_legacy"
+    )).fetchone()
+    if bounds[0] is not None:
+        for year in range(bounds[0], bounds[1] + 1):
+            _create_year_partition(conn, year)
+
+    conn.execute(text("""
+        INSERT INTO raw_price (ticker, date, open, high, low, close, volume)
+        SELECT ticker, date, open, high, low, close, volume FROM raw_price_legacy;
+    """))
+    conn.execute(text("DROP TABLE raw_price_legacy;"))
+
+
+def ensure_raw_price_schema(engine, logger=print) -> None:
+    """
+    Ensure raw_price exists as a table range-partitioned by year on date.
+    Only the (ticker, date) primary key and a BRIN index on date are kept;
+    a legacy unpartitioned table is migrated in place. Prices are stored
+    unadjusted; see raw_corporate_action for the adjusted view.
+    """
     with engine.begin() as conn:
+        relkind = _raw_price_relkind(conn)
+        if relkind == "r":
+            migrate_raw_price_to_partitioned(conn, logger=logger)
+        elif relkind is None:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS raw_price ({RAW_PRICE_COLUMNS_DDL}) PARTITION BY RANGE (date);"))
+
+        # The PK serves ticker and (ticker, date) lookups; these B-trees only duplicated it
+        conn.execute(text("DROP INDEX IF EXISTS idx_raw_price_date, idx_raw_price_ticker, idx_raw_price_ticker_date;"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_raw_price_date_brin ON raw_price USING brin (date);"))
+        # Set on insert and on every changed upsert; the Parquet lake exports by it. Checked first:
+        # ADD COLUMN IF NOT EXISTS would still queue for an exclusive lock behind running loads
+        has_updated_at = conn.execute(text("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'raw_price' AND column_name = 'updated_at'
+        """)).fetchone()
+        if not has_updated_at:
+            conn.execute(text("ALTER TABLE raw_price ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT now();"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_raw_price_updated_at_brin ON raw_price USING brin (updated_at);"))
+
+        # Tickers whose stored history is unadjusted; others (loaded with auto_adjust) are fetched again in full.
+        # updated_at moves whenever a ticker's history is rewritten: fct_ticker_data_quality and
+        # fct_price_features rebuild that ticker from scratch when it does
         conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS raw_price (
-                ticker TEXT NOT NULL,
-                date DATE NOT NULL,
-                open DOUBLE PRECISION,
-                high DOUBLE PRECISION,
-                low DOUBLE PRECISION,
-                close DOUBLE PRECISION,
-                volume BIGINT,
-                PRIMARY KEY (ticker, date)
+            CREATE TABLE IF NOT EXISTS raw_price_basis (
+                ticker TEXT PRIMARY KEY,
+                basis TEXT NOT NULL,
+                updated_at TIMESTAMP NOT NULL DEFAULT now()
             );
         """))
-        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_raw_price_date ON raw_price(date);"))
-        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_raw_price_ticker ON raw_price(ticker);"))
-        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_raw_price_ticker_date ON raw_price(ticker, date);"))
+
+    ensure_raw_corporate_action_schema(engine)
 
 
 def get_safe_lag_date() -> pd.Timestamp:
@@ -36,11 +142,12 @@ def get_safe_lag_date() -> pd.Timestamp:
 
 
 def get_ticker_max_date_pg(engine, ticker: str) -> pd.Timestamp | None:
-    """Get the latest date for which we have data for this ticker."""
+    """Latest stored date for this ticker; None when it has no unadjusted history yet."""
     query = text("""
         SELECT MAX(date) AS max_date
         FROM raw_price
         WHERE ticker = :ticker
+          AND EXISTS (SELECT 1 FROM raw_price_basis b WHERE b.ticker = :ticker AND b.basis = 'unadjusted')
     """)
     try:
         df = pd.read_sql(query, con=engine, params={"ticker": ticker})
@@ -52,23 +159,74 @@ def get_ticker_max_date_pg(engine, ticker: str) -> pd.Timestamp | None:
 
 
 def upsert_price_data_pg(engine, df: pd.DataFrame) -> int:
-    """Insert price data using Pandas with primary key constraint to avoid duplicates."""
+    """
+    Bulk upsert unadjusted price data via COPY + ON CONFLICT on (ticker, date).
+    Splits and dividends in the frame's action columns go to raw_corporate_action,
+    and only the affected tickers get their adjustment factors recomputed.
+    """
     if df.empty:
         return 0
 
-    df = df.copy()
+    df = unadjust_prices(df)
+    actions = extract_actions(df)
+    df = df[PRICE_COLUMNS].copy()
     df["date"] = pd.to_datetime(df["date"]).dt.date
+    df["volume"] = pd.to_numeric(df["volume"]).round().astype("Int64")
+    tickers = df["ticker"].unique().tolist()
 
     try:
-        df.to_sql("raw_price", con=engine, if_exists="append", index=False, method="multi")
-        return len(df)
+        ensure_raw_price_partitions(engine, pd.to_datetime(df["date"]).dt.year.unique())
+        result = copy_upsert(engine, df, "raw_price", key_columns=["ticker", "date"], touch_columns=["updated_at"])
     except Exception as e:
         print(f"Error writing to raw_price: {e}")
         return 0
 
+    try:
+        # Prices first: dividend factors read the close before each ex-date
+        if not actions.empty:
+            insert_corporate_actions(engine, actions)
+            refresh_adjustment_factors(engine, actions["ticker"].unique().tolist())
+            current_telemetry().inc("corporate_actions_loaded", len(actions))
+        mark_unadjusted(engine, tickers)
+    except Exception as e:
+        # The prices are stored, their actions are not: forget the basis so the
+        # next run refetches these tickers in full, actions included
+        current_telemetry().inc("corporate_action_failures", len(tickers))
+        print(f"[ERROR] Corporate actions of {', '.join(tickers)} failed, refetching in full next run: {e}")
+        try:
+            reset_price_basis(engine, tickers)
+        except Exception as reset_error:
+            print(f"[ERROR] Could not reset the price basis of {', '.join(tickers)}: {reset_error}")
+
+    if result.skipped:
+        print(f"raw_price: {result}")
+    return result.written
 
-def update_ticker_pg(engine, ticker: str) -> tuple[pd.Timestamp | None, int]:
-    """Download and update price data for one ticker with full history support."""
+
+def mark_unadjusted(engine, tickers: list[str]) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO raw_price_basis (ticker, basis)
+            SELECT UNNEST(CAST(:tickers AS TEXT[])), 'unadjusted'
+            ON CONFLICT (ticker) DO UPDATE SET basis = EXCLUDED.basis, updated_at = now()
+            WHERE raw_price_basis.basis <> EXCLUDED.basis
+        """), {"tickers": list(tickers)})
+
+
+def reset_price_basis(engine, tickers: list[str]) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM raw_price_basis WHERE ticker = ANY(:tickers)"), {"tickers": list(tickers)})
+
+
+def update_ticker_pg(
+        engine,
+        ticker: str,
+        download: Callable[..., pd.DataFrame] = yf.download,
+) -> tuple[pd.Timestamp | None, int]:
+    """
+    Download and update price data for one ticker with full history support.
+    `download` takes yf.download's keyword arguments; benchmarks pass a stand-in.
+    """
     end_date = get_safe_lag_date()
     start_date = None
 
@@ -87,7 +245,8 @@ def update_ticker_pg(engine, ticker: str) -> tuple[pd.Timestamp | None, int]:
         "tickers": ticker,
         "end": end_date + timedelta(days=1),
         "progress": False,
-        "auto_adjust": True,
+        "auto_adjust": False,
+        "actions": True,
         "threads": False,
         "multi_level_index": False,
     }
@@ -98,7 +257,7 @@ def update_ticker_pg(engine, ticker: str) -> tuple[pd.Timestamp | None, int]:
         download_kwargs["start"] = start_date
 
     try:
-        df = yf.download(**download_kwargs)
+        df = download(**download_kwargs)
     except Exception as e:
         print(f"{ticker}: Download error - {e}")
         return None, 0
@@ -119,7 +278,7 @@ def update_ticker_pg(engine, ticker: str) -> tuple[pd.Timestamp | None, int]:
         return None, 0
 
     df["ticker"] = ticker
-    df = df[["ticker", "date", "open", "high", "low", "close", "volume"]]
+    df = df[PRICE_COLUMNS + [c for c in ACTION_COLUMNS if c in df.columns]]
 
     row_count = upsert_price_data_pg(engine, df)
 
@@ -130,9 +289,235 @@ def update_ticker_pg(engine, ticker: str) -> tuple[pd.Timestamp | None, int]:
     return df["date"].max(), row_count
 
 
-def run_raw_price_ingestion(engine, logger=print) -> int:
+PRICE_COLUMNS = ["ticker", "date", "open", "high", "low", "close", "volume"]
+
+# A fetcher takes (tickers, start, end) and returns a long DataFrame with PRICE_COLUMNS,
+# plus ACTION_COLUMNS when the source reports splits and dividends.
+# start=None means "full history".
+PriceFetcher = Callable[[list[str], pd.Timestamp | None, pd.Timestamp], pd.DataFrame]
+
+
+# Ticker shards: "hash" spreads symbols evenly over RAW_PRICE_SHARDS buckets,
+# "letter" uses the first letter of the symbol (A-Z plus "other")
+RAW_PRICE_SHARDS = int(os.getenv("RAW_PRICE_SHARDS", "16"))
+RAW_PRICE_SHARD_STRATEGY = os.getenv("RAW_PRICE_SHARD_STRATEGY", "hash")
+
+
+def price_shard_keys(num_shards: int = RAW_PRICE_SHARDS, strategy: str = RAW_PRICE_SHARD_STRATEGY) -> list[str]:
+    if strategy == "letter":
+        return list(string.ascii_uppercase) + ["other"]
+    if strategy == "hash":
+        return [f"shard_{i:02d}" for i in range(num_shards)]
+    raise ValueError(f"Unknown shard strategy: {strategy}")
+
+
+def ticker_shard(ticker: str, num_shards: int = RAW_PRICE_SHARDS, strategy: str = RAW_PRICE_SHARD_STRATEGY) -> str:
+    """
+    Deterministic shard of a ticker. It depends only on the symbol, so adding or
+    removing tickers never moves other tickers between shards.
+    """
+    symbol = ticker.strip().upper()
+    if strategy == "letter":
+        first = symbol[:1]
+        return first if first in string.ascii_uppercase else "other"
+    if strategy == "hash":
+        # md5 rather than hash(): Python's str hash is salted per process
+        bucket = int(hashlib.md5(symbol.encode("utf-8")).hexdigest()[:8], 16) % num_shards
+        return f"shard_{bucket:02d}"
+    raise ValueError(f"Unknown shard strategy: {strategy}")
+
+
+raw_price_partitions = StaticPartitionsDefinition(price_shard_keys())
+
+
+def get_ticker_watermarks_pg(engine, shard: str | None = None) -> dict[str, pd.Timestamp | None]:
+    """
+    Return dim_ticker symbols with their latest raw_price date, in one query.
+    With `shard`, only the symbols of that shard are looked up. Tickers without
+    unadjusted history get None, so their full history is fetched again.
+    """
+    symbols = pd.read_sql("SELECT DISTINCT symbol FROM dim_ticker WHERE symbol IS NOT NULL", con=engine)["symbol"]
+    if shard is not None:
+        symbols = symbols[symbols.map(ticker_shard) == shard]
+
+    query = text("""
+        SELECT t.symbol AS ticker,
+               CASE WHEN b.basis = 'unadjusted'
+                    THEN (SELECT MAX(p.date) FROM raw_price p WHERE p.ticker = t.symbol)
+               END AS max_date
+        FROM unnest(CAST(:symbols AS TEXT[])) AS t(symbol)
+        LEFT JOIN raw_price_basis b ON b.ticker = t.symbol
+    """)
+    df = pd.read_sql(query, con=engine, params={"symbols": symbols.tolist()})
+    return {
+        row.ticker: pd.to_datetime(row.max_date) if pd.notnull(row.max_date) else None
+        for row in df.itertuples(index=False)
+    }
+
+
+def plan_price_batches(
+        watermarks: dict[str, pd.Timestamp | None],
+        end_date: pd.Timestamp,
+        batch_size: int = 50,
+) -> list[tuple[pd.Timestamp | None, list[str]]]:
+    """Group tickers sharing a start date into multi-ticker download batches."""
+    by_start: dict[pd.Timestamp | None, list[str]] = {}
+    for ticker, max_date in watermarks.items():
+        if max_date is None:
+            start_date = None
+        else:
+            start_date = max_date + timedelta(days=1)
+            if start_date > end_date:
+                continue
+        by_start.setdefault(start_date, []).append(ticker)
+
+    batches = []
+    for start_date, tickers in by_start.items():
+        tickers = sorted(tickers)
+        for i in range(0, len(tickers), batch_size):
+            batches.append((start_date, tickers[i:i + batch_size]))
+    return batches
+
+
+def normalize_price_frame(df: pd.DataFrame, tickers: list[str]) -> pd.DataFrame:
+    """Turn a (possibly multi-ticker) yfinance frame into long PRICE_COLUMNS rows."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+
+    if isinstance(df.columns, pd.MultiIndex):
+        # group_by="ticker" puts the symbol on the first column level
+        df = df.stack(level=0, future_stack=True).reset_index()
+        df = df.rename(columns={df.columns[0]: "date", df.columns[1]: "ticker"})
+    else:
+        df = df.reset_index()
+        df["ticker"] = tickers[0]
+
+    df = df.rename(columns={col: str(col).lower() for col in df.columns})
+    missing_required = set(PRICE_COLUMNS) - set(df.columns)
+    if missing_required:
+        print(f"{tickers[0]}..: Missing required columns {missing_required}, skipping batch")
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+
+    df = df.dropna(subset=["open", "high", "low", "close"], how="all")
+    return df[PRICE_COLUMNS + [c for c in ACTION_COLUMNS if c in df.columns]]
+
+
+def yfinance_fetcher(tickers: list[str], start_date: pd.Timestamp | None, end_date: pd.Timestamp) -> pd.DataFrame:
+    """Default fetcher: one multi-ticker yf.download call per batch."""
+    download_kwargs = {
+        "tickers": tickers,
+        "end": end_date + timedelta(days=1),
+        "progress": False,
+        "auto_adjust": False,
+        "actions": True,
+        "threads": False,
+        "group_by": "ticker",
+        "multi_level_index": True,
+    }
+    if start_date is None:
+        download_kwargs["period"] = "max"
+    else:
+        download_kwargs["start"] = start_date
+
+    return normalize_price_frame(yf.download(**download_kwargs), tickers)
+
+
+def fetch_with_retry(
+        fetcher: PriceFetcher,
+        tickers: list[str],
+        start_date: pd.Timestamp | None,
+        end_date: pd.Timestamp,
+        max_retries: int = 3,
+        backoff_seconds: float = 2.0,
+) -> pd.DataFrame:
+    """Call the fetcher, retrying with exponential backoff and jitter on failure."""
+    telemetry = current_telemetry()
+    for attempt in range(max_retries + 1):
+        try:
+            with telemetry.timer("price_fetch_seconds"):
+                return fetcher(tickers, start_date, end_date)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            telemetry.inc("price_fetch_retries")
+            delay = backoff_seconds * (2 ** attempt) * (1 + random.random())
+            print(f"{tickers[0]}..: Download error ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def run_raw_price_ingestion_batched(
+        engine,
+        logger=print,
+        fetcher: PriceFetcher = yfinance_fetcher,
+        batch_size: int = 50,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        shard: str | None = None,
+) -> int:
+    """
+    Batched ingestion: read all watermarks at once, download multi-ticker batches
+    on a worker pool and write results from the calling thread only.
+    With `shard`, only the tickers of that shard are ingested.
+    """
+    ensure_raw_price_schema(engine, logger=logger)
+
+    logger(f"[INFO] Reading ticker watermarks from dim_ticker/raw_price (shard: {shard or 'all'})")
+    try:
+        watermarks = get_ticker_watermarks_pg(engine, shard=shard)
+    except Exception as e:
+        logger(f"[ERROR] Failed to read ticker watermarks: {e}")
+        raise
+
+    end_date = get_safe_lag_date()
+    batches = plan_price_batches(watermarks, end_date, batch_size=batch_size)
+    pending = sum(len(tickers) for _, tickers in batches)
+    logger(f"[INFO] {len(watermarks)} tickers, {pending} need updates in {len(batches)} batches")
+
+    total_inserted = 0
+    updated_tickers = set()
+    failed_batches = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(fetch_with_retry, fetcher, tickers, start_date, end_date, max_retries): tickers
+            for start_date, tickers in batches
+        }
+        progress = ProgressReporter(len(futures), "Updating prices", logger=logger)
+        for future in as_completed(futures):
+            tickers = futures[future]
+            progress.update(1)
+            try:
+                df = future.result()
+            except Exception as e:
+                failed_batches += 1
+                logger(f"[ERROR] Batch {tickers[0]}..{tickers[-1]} failed: {e}")
+                continue
+
+            if df.empty:
+                continue
+
+            # Single writer: only this thread touches the database
+            total_inserted += upsert_price_data_pg(engine, df)
+            updated_tickers.update(df["ticker"].unique())
+
+        progress.close()
+
+    skipped = pending - len(updated_tickers)
+    telemetry = current_telemetry()
+    telemetry.inc("tickers_updated", len(updated_tickers))
+    telemetry.inc("tickers_skipped", skipped)
+    telemetry.inc("price_batches_failed", failed_batches)
+    logger(f"[INFO] Ingestion completed. Total rows inserted: {total_inserted}")
+    logger(f"[INFO] Updated tickers: {len(updated_tickers)}, skipped: {skipped}, failed batches: {failed_batches}")
+    return total_inserted
+
+
+def run_raw_price_ingestion(engine, logger=print, batched: bool = True, **batch_kwargs) -> int:
     """Core logic to ingest price data for all tickers."""
-    ensure_raw_price_schema(engine)
+    if batched:
+        return run_raw_price_ingestion_batched(engine, logger=logger, **batch_kwargs)
+
+    ensure_raw_price_schema(engine, logger=logger)
 
     logger("[INFO] Reading tickers from dim_ticker")
     try:
@@ -147,11 +532,15 @@ def run_raw_price_ingestion(engine, logger=print) -> int:
     total_inserted = 0
     skipped_tickers = []
 
-    for ticker in tqdm(tickers, desc="Updating prices"):
-        _, inserted = update_ticker_pg(engine, ticker)
-        total_inserted += inserted
-        if inserted == 0:
-            skipped_tickers.append(ticker)
+    with ProgressReporter(len(tickers), "Updating prices", logger=logger) as progress:
+        for ticker in tickers:
+            _, inserted = update_ticker_pg(engine, ticker)
+            total_inserted += inserted
+            if inserted == 0:
+                skipped_tickers.append(ticker)
+            progress.update(1)
+
+    current_telemetry().inc("tickers_skipped", len(skipped_tickers))
 
     logger(f"[INFO] Ingestion completed. Total rows inserted: {total_inserted}")
     logger(f"[INFO] Skipped tickers: {len(skipped_tickers)}")
@@ -165,20 +554,22 @@ def run_raw_price_ingestion(engine, logger=print) -> int:
 @asset(
     compute_kind="python",
     required_resource_keys={"dbt_postgres"},
+    pool=YAHOO_POOL,
+    op_tags=source_tags(YAHOO_POOL),
     deps=[AssetDep("dim_ticker")],
+    partitions_def=raw_price_partitions,
 )
-def raw_price(context: AssetExecutionContext) -> None:
-    """Dagster asset that wraps raw price ingestion."""
+def raw_price(context: AssetExecutionContext) -> MaterializeResult:
+    """Dagster asset that wraps raw price ingestion, one ticker shard per partition."""
     engine = context.resources.dbt_postgres
-    inserted = run_raw_price_ingestion(engine, logger=context.log.info)
-    context.log.info(f"raw_price asset completed successfully. Inserted: {inserted}")
+    shard = context.partition_key
+    with asset_telemetry(context) as telemetry:
+        inserted = run_raw_price_ingestion(engine, logger=context.log.info, shard=shard)
+    context.log.info(f"raw_price {shard} completed successfully. Inserted: {inserted}")
+    return materialize_result(telemetry, inserted=inserted)
 
 
 # CLI entry point
 if __name__ == "__main__":
-    DATABASE_URL = os.getenv('POSTGRES_DB_URL', '').replace("postgres://", "postgresql://")
-    if not DATABASE_URL:
-        raise ValueError("POSTGRES_DB_URL environment variable not set")
-
-    engine = create_engine(DATABASE_URL)
+    engine = engine_from_env()
     run_raw_price_ingestion(engine)
@@ -1,6 +1,7 @@
 # dagster/open_quant_kit/repository.py
 from dagster import Definitions
 from .assets import assets
+from .concurrency import oqk_executor
 from .dbt import dbt_resource
 
 from .jobs import jobs
@@ -15,6 +16,7 @@ defs = Definitions(
     assets=assets,
     jobs=jobs,
     schedules=schedules,
+    executor=oqk_executor,
     resources={
         "dbt": dbt_resource,
         "dbt_postgres": dbt_postgres,
@@ -1,15 +1,43 @@
-import os
+from dagster import Field, resource
 
-from dagster import resource
-from sqlalchemy import create_engine
+from .utils.db import (
+    MAX_OVERFLOW,
+    POOL_SIZE,
+    SLOW_QUERY_SECONDS,
+    STATEMENT_TIMEOUT_MS,
+    create_pg_engine,
+    database_url,
+)
 
 
-@resource
+@resource(
+    config_schema={
+        "pool_size": Field(int, default_value=POOL_SIZE,
+                           description="Pooled connections per step process; match the widest in-asset "
+                                       "fan-out (e.g. raw_price batch workers)."),
+        "max_overflow": Field(int, default_value=MAX_OVERFLOW,
+                              description="Extra connections opened above pool_size under bursts."),
+        "statement_timeout_ms": Field(int, default_value=STATEMENT_TIMEOUT_MS,
+                                      description="Server-side statement timeout; 0 disables it."),
+        "slow_query_seconds": Field(float, default_value=SLOW_QUERY_SECONDS,
+                                    description="Queries slower than this are logged; 0 disables it."),
+    }
+)
 def dbt_postgres(init_context):
     """
-    This resource provides a connection to the PostgreSQL database used by dbt.
+    This resource provides a pooled connection to the PostgreSQL database used by dbt.
+    Each step process gets one engine, disposed when the step ends.
     """
-    db_url = os.getenv('POSTGRES_DB_URL').replace("postgres://", "postgresql://")
-    engine = create_engine(db_url)
-    return engine
-
+    config = init_context.resource_config
+    engine = create_pg_engine(
+        database_url(),
+        pool_size=config["pool_size"],
+        max_overflow=config["max_overflow"],
+        statement_timeout_ms=config["statement_timeout_ms"],
+        slow_query_seconds=config["slow_query_seconds"],
+        logger=init_context.log.info,
+    )
+    try:
+        yield engine
+    finally:
+        engine.dispose()
@@ -1 +1,51 @@
-schedules = []
+# dagster/open_quant_kit/schedules.py
+from dagster import RunRequest, ScheduleDefinition, ScheduleEvaluationContext, schedule
+
+from .jobs import dbt_job, price_derived_job, raw_filing_index_job, raw_price_job, sec_filings_job
+from .raw.raw_filing_index import raw_filing_index_partitions
+from .raw.raw_price import raw_price_partitions
+
+# Market data settles after the US close; EDGAR publishes the daily index overnight
+EXECUTION_TIMEZONE = "America/New_York"
+
+
+@schedule(job=raw_price_job, cron_schedule="0 18 * * 1-5", execution_timezone=EXECUTION_TIMEZONE)
+def raw_price_schedule(context: ScheduleEvaluationContext):
+    """One run per ticker shard; the yahoo pool decides how many download at once."""
+    day = context.scheduled_execution_time.strftime("%Y-%m-%d")
+    for shard in raw_price_partitions.get_partition_keys():
+        yield RunRequest(run_key=f"{day}:{shard}", partition_key=shard)
+
+
+@schedule(job=raw_filing_index_job, cron_schedule="0 6 * * *", execution_timezone=EXECUTION_TIMEZONE)
+def raw_filing_index_schedule(context: ScheduleEvaluationContext):
+    """
+    The quarter in progress and the one before it: a quarter keeps changing
+    until it settles, and final quarters are skipped by the asset itself.
+    """
+    day = context.scheduled_execution_time.strftime("%Y-%m-%d")
+    keys = raw_filing_index_partitions.get_partition_keys(current_time=context.scheduled_execution_time)
+    for key in keys[-2:]:
+        yield RunRequest(run_key=f"{day}:{key}", partition_key=key)
+
+
+sec_filings_schedule = ScheduleDefinition(
+    job=sec_filings_job, cron_schedule="0 8 * * *", execution_timezone=EXECUTION_TIMEZONE,
+)
+
+price_derived_schedule = ScheduleDefinition(
+    job=price_derived_job, cron_schedule="0 20 * * 1-5", execution_timezone=EXECUTION_TIMEZONE,
+)
+
+# After prices, derived tables and the morning filing run; only stale models build
+dbt_schedule = ScheduleDefinition(
+    job=dbt_job, cron_schedule="30 20 * * *", execution_timezone=EXECUTION_TIMEZONE,
+)
+
+schedules = [
+    raw_price_schedule,
+    raw_filing_index_schedule,
+    sec_filings_schedule,
+    price_derived_schedule,
+    dbt_schedule,
+]
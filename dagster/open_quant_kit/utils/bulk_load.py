@@ -0,0 +1,192 @@
+# dagster/open_quant_kit/utils/bulk_load.py
+
+import io
+import time
+import uuid
+from dataclasses import dataclass
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; pandas' CSV writer is the slower fallback
+    pa = None
+
+from .telemetry import current_telemetry
+
+COPY_CHUNK_ROWS = 50_000
+
+
+@dataclass
+class BulkLoadResult:
+    """Row counts reported by a COPY + merge load."""
+    staged: int = 0
+    inserted: int = 0
+    updated: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.staged - self.inserted - self.updated
+
+    @property
+    def written(self) -> int:
+        return self.inserted + self.updated
+
+    def __str__(self) -> str:
+        return f"inserted {self.inserted}, updated {self.updated}, skipped {self.skipped}"
+
+
+def quote_ident(identifier: str) -> str:
+    """Double-quote a column or table name for interpolation into SQL."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _arrow_csv(chunk: pd.DataFrame) -> io.BytesIO | None:
+    """CSV-encode with Arrow's native writer; None when a column has no Arrow equivalent."""
+    try:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+    except (pa.ArrowException, TypeError, ValueError):
+        return None
+    buffer = io.BytesIO()
+    # Strings are always quoted and nulls written unquoted-empty, which COPY reads as NULL
+    pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=False))
+    buffer.seek(0)
+    return buffer
+
+
+def copy_frame(cursor, df: pd.DataFrame, table: str, chunk_rows: int) -> None:
+    """Stream a DataFrame into `table` with COPY, one CSV chunk at a time."""
+    columns = ", ".join(quote_ident(c) for c in df.columns)
+    arrow_sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    pandas_sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        buffer = _arrow_csv(chunk) if pa is not None else None
+        if buffer is not None:
+            cursor.copy_expert(arrow_sql, buffer)
+            continue
+        buffer = io.StringIO()
+        chunk.to_csv(buffer, index=False, header=False, na_rep="\\N")
+        buffer.seek(0)
+        cursor.copy_expert(pandas_sql, buffer)
+
+
+def copy_select(engine, query: str, params: dict | None = None, **read_csv_kwargs) -> pd.DataFrame:
+    """
+    Read the result of `query` with COPY ... TO STDOUT instead of a row-by-row
+    fetch. `query` uses psycopg2 pyformat placeholders, e.g. %(ticker)s.
+    """
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        select_sql = cursor.mogrify(query, params or {}).decode("utf-8")
+        buffer = io.StringIO()
+        cursor.copy_expert(f"COPY ({select_sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+        connection.commit()
+    finally:
+        connection.close()
+
+    buffer.seek(0)
+    return pd.read_csv(buffer, **read_csv_kwargs)
+
+
+def copy_upsert(
+        engine,
+        df: pd.DataFrame,
+        table: str,
+        key_columns: list[str],
+        on_conflict: str = "update",
+        update_columns: list[str] | None = None,
+        chunk_rows: int = COPY_CHUNK_ROWS,
+        touch_columns: list[str] | None = None,
+) -> BulkLoadResult:
+    """
+    Bulk load `df` into `table`: COPY into an unlogged (temporary) staging table,
+    then merge with INSERT ... ON CONFLICT DO UPDATE / DO NOTHING.
+
+    Duplicate keys inside `df` are collapsed before the merge. With
+    on_conflict="update", rows identical to the stored ones are counted as skipped;
+    `touch_columns` (e.g. updated_at) are set to now() on rows that did change.
+    """
+    if on_conflict not in ("update", "nothing"):
+        raise ValueError(f"on_conflict must be 'update' or 'nothing', got {on_conflict!r}")
+    if df.empty:
+        return BulkLoadResult()
+
+    columns = list(df.columns)
+    if update_columns is None:
+        update_columns = [c for c in columns if c not in key_columns]
+
+    stage = f"_stage_{table}_{uuid.uuid4().hex[:8]}"
+    column_list = ", ".join(quote_ident(c) for c in columns)
+    key_list = ", ".join(quote_ident(c) for c in key_columns)
+
+    if on_conflict == "update" and update_columns:
+        assignments = ", ".join(
+            [f"{quote_ident(c)} = EXCLUDED.{quote_ident(c)}" for c in update_columns]
+            + [f"{quote_ident(c)} = now()" for c in touch_columns or []]
+        )
+        current = ", ".join(f"{table}.{quote_ident(c)}" for c in update_columns)
+        excluded = ", ".join(f"EXCLUDED.{quote_ident(c)}" for c in update_columns)
+        conflict_action = f"DO UPDATE SET {assignments} WHERE ({current}) IS DISTINCT FROM ({excluded})"
+    else:
+        conflict_action = "DO NOTHING"
+
+    key_match = " AND ".join(f"t.{quote_ident(c)} = s.{quote_ident(c)}" for c in key_columns)
+    # Counted before the merge: RETURNING xmax is not available on partitioned tables
+    count_sql = f"""
+        SELECT COUNT(*), COUNT(*) FILTER (WHERE EXISTS (SELECT 1 FROM {table} t WHERE {key_match}))
+        FROM (SELECT DISTINCT {key_list} FROM {stage}) s
+    """
+    merge_sql = f"""
+        INSERT INTO {table} ({column_list})
+        SELECT DISTINCT ON ({key_list}) {column_list}
+        FROM {stage}
+        ORDER BY {key_list}
+        ON CONFLICT ({key_list}) {conflict_action}
+    """
+
+    start = time.perf_counter()
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        # Temporary tables skip the WAL, are private to this session and vanish on commit
+        cursor.execute(f"CREATE TEMP TABLE {stage} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+        copy_frame(cursor, df, stage, chunk_rows)
+        cursor.execute(count_sql)
+        distinct_keys, existing_keys = cursor.fetchone()
+        cursor.execute(merge_sql)
+        inserted = min(distinct_keys - existing_keys, cursor.rowcount)
+        updated = max(cursor.rowcount - inserted, 0)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    result = BulkLoadResult(staged=len(df), inserted=inserted, updated=updated)
+    current_telemetry().record_write(table, time.perf_counter() - start, result.written, result.skipped)
+    return result
+
+
+def copy_append(engine, df: pd.DataFrame, table: str, chunk_rows: int = COPY_CHUNK_ROWS) -> BulkLoadResult:
+    """COPY `df` straight into `table`: no staging table, no conflict handling."""
+    if df.empty:
+        return BulkLoadResult()
+
+    start = time.perf_counter()
+    connection = engine.raw_connection()
+    try:
+        copy_frame(connection.cursor(), df, table, chunk_rows)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    result = BulkLoadResult(staged=len(df), inserted=len(df))
+    current_telemetry().record_write(table, time.perf_counter() - start, result.written)
+    return result
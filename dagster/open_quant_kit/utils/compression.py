@@ -0,0 +1,60 @@
+# dagster/open_quant_kit/utils/compression.py
+
+import hashlib
+import io
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; fall back to zlib from the standard library
+    zstandard = None
+
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+READ_CHUNK_BYTES = 1 << 20
+
+DEFAULT_CODEC = "zstd" if zstandard is not None else "zlib"
+
+
+def _compressor(codec: str):
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("codec 'zstd' requires the zstandard package")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    if codec == "zlib":
+        return zlib.compressobj(ZLIB_LEVEL)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def compress_stream(fileobj, codec: str = DEFAULT_CODEC) -> tuple[bytes, str, int]:
+    """
+    Compress a binary file object chunk by chunk.
+    Returns (payload, sha256 of the uncompressed bytes, uncompressed size).
+    """
+    compressor = _compressor(codec)
+    digest = hashlib.sha256()
+    raw_size = 0
+    out = io.BytesIO()
+
+    for chunk in iter(lambda: fileobj.read(READ_CHUNK_BYTES), b""):
+        digest.update(chunk)
+        raw_size += len(chunk)
+        out.write(compressor.compress(chunk))
+    out.write(compressor.flush())
+
+    return out.getvalue(), digest.hexdigest(), raw_size
+
+
+def compress_bytes(data: bytes, codec: str = DEFAULT_CODEC) -> tuple[bytes, str, int]:
+    return compress_stream(io.BytesIO(data), codec=codec)
+
+
+def decompress_bytes(payload: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("codec 'zstd' requires the zstandard package")
+        # Streamed frames carry no content size, so use a decompressobj
+        return zstandard.ZstdDecompressor().decompressobj().decompress(payload)
+    if codec == "zlib":
+        return zlib.decompress(payload)
+    raise ValueError(f"Unknown codec: {codec}")
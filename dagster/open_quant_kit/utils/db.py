@@ -0,0 +1,130 @@
+# dagster/open_quant_kit/utils/db.py
+
+import os
+import time
+from typing import Iterator
+
+import pandas as pd
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+from .bulk_load import COPY_CHUNK_ROWS, BulkLoadResult, copy_append, copy_upsert
+from .telemetry import current_telemetry
+
+# Pool sized for the widest in-process fan-out (raw_price's batch workers); each
+# multiprocess-executor step runs in its own process with its own pool
+POOL_SIZE = int(os.getenv("PG_POOL_SIZE", "8"))
+MAX_OVERFLOW = int(os.getenv("PG_MAX_OVERFLOW", "4"))
+POOL_TIMEOUT_SECONDS = int(os.getenv("PG_POOL_TIMEOUT_SECONDS", "30"))
+# Recycle before typical server/proxy idle timeouts drop the connection
+POOL_RECYCLE_SECONDS = int(os.getenv("PG_POOL_RECYCLE_SECONDS", "1800"))
+# 0 disables the server-side statement timeout
+STATEMENT_TIMEOUT_MS = int(os.getenv("PG_STATEMENT_TIMEOUT_MS", "0"))
+SLOW_QUERY_SECONDS = float(os.getenv("PG_SLOW_QUERY_SECONDS", "10"))
+# Rows per INSERT ... VALUES statement when SQLAlchemy batches an executemany
+INSERT_PAGE_SIZE = 1000
+READ_CHUNK_ROWS = 50_000
+APPLICATION_NAME = "open_quant_kit"
+
+
+def database_url() -> str:
+    url = os.getenv("POSTGRES_DB_URL", "").replace("postgres://", "postgresql://")
+    if not url:
+        raise ValueError("POSTGRES_DB_URL is not set")
+    return url
+
+
+def _install_timing_hooks(engine: Engine, slow_query_seconds: float, logger) -> None:
+    """Time every statement into the active telemetry and log the slow ones."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_start"].pop()
+        telemetry = current_telemetry()
+        telemetry.inc("db_queries")
+        telemetry.observe("db_query_seconds", seconds)
+        if slow_query_seconds and seconds >= slow_query_seconds:
+            logger(f"[INFO] Slow query ({seconds:.1f}s): {' '.join(statement.split())[:200]}")
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+        current_telemetry().inc("db_query_errors")
+
+
+def create_pg_engine(
+        url: str | None = None,
+        pool_size: int = POOL_SIZE,
+        max_overflow: int = MAX_OVERFLOW,
+        pool_timeout: int = POOL_TIMEOUT_SECONDS,
+        pool_recycle: int = POOL_RECYCLE_SECONDS,
+        statement_timeout_ms: int = STATEMENT_TIMEOUT_MS,
+        slow_query_seconds: float = SLOW_QUERY_SECONDS,
+        application_name: str = APPLICATION_NAME,
+        logger=print,
+) -> Engine:
+    """
+    Pooled psycopg2 engine shared by the assets and CLIs: pre-pinged, recycled
+    connections, an optional statement timeout, batched executemany inserts and
+    per-query timing into the run's telemetry.
+    """
+    connect_args = {"application_name": application_name}
+    if statement_timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    engine = create_engine(
+        url or database_url(),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=True,
+        executemany_mode="values_plus_batch",
+        insertmanyvalues_page_size=INSERT_PAGE_SIZE,
+        connect_args=connect_args,
+    )
+    _install_timing_hooks(engine, slow_query_seconds, logger)
+    return engine
+
+
+def engine_from_env(**kwargs) -> Engine:
+    """Engine for CLI entry points, from POSTGRES_DB_URL and the PG_* settings."""
+    return create_pg_engine(database_url(), **kwargs)
+
+
+def read_sql_chunks(
+        engine,
+        query,
+        params: dict | None = None,
+        chunk_rows: int = READ_CHUNK_ROWS,
+        **read_sql_kwargs,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the result of `query` as DataFrames of at most `chunk_rows` rows,
+    pulled through a server-side cursor, so memory stays flat however large
+    the result.
+    """
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=chunk_rows) as conn:
+        yield from pd.read_sql(query, con=conn, params=params, chunksize=chunk_rows, **read_sql_kwargs)
+
+
+def bulk_write(
+        engine,
+        df: pd.DataFrame,
+        table: str,
+        key_columns: list[str] | None = None,
+        chunk_rows: int = COPY_CHUNK_ROWS,
+        **upsert_kwargs,
+) -> BulkLoadResult:
+    """
+    Write `df` with COPY: appended as is without `key_columns`, otherwise merged
+    on them through copy_upsert (see there for `on_conflict`/`update_columns`).
+    """
+    if key_columns is None:
+        return copy_append(engine, df, table, chunk_rows=chunk_rows)
+    return copy_upsert(engine, df, table, key_columns, chunk_rows=chunk_rows, **upsert_kwargs)
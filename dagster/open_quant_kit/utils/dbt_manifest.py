@@ -0,0 +1,124 @@
+# dagster/open_quant_kit/utils/dbt_manifest.py
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from functools import lru_cache
+
+DBT_PROJECT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../dbt"))
+DBT_PROFILES = os.path.join(DBT_PROJECT_PATH, "config")
+TARGET_PATH = os.path.join(DBT_PROJECT_PATH, "target")
+MANIFEST_PATH = os.path.join(TARGET_PATH, "manifest.json")
+FINGERPRINT_PATH = os.path.join(TARGET_PATH, "manifest.fingerprint")
+# Manifest of the last successful full build, for state comparison and --defer
+STATE_PATH = os.path.join(TARGET_PATH, "state")
+
+# Everything `dbt parse` reads to build the manifest
+SOURCE_DIRS = ["models", "macros", "seeds", "snapshots", "tests", "analyses"]
+SOURCE_FILES = ["dbt_project.yml", "packages.yml", "config/profiles.yml"]
+
+
+def project_fingerprint(project_dir: str = DBT_PROJECT_PATH) -> str:
+    """Hash of the path, size and mtime of every project source file: stats only, no reads."""
+    digest = hashlib.sha256()
+    paths = [os.path.join(project_dir, name) for name in SOURCE_FILES]
+    for name in SOURCE_DIRS:
+        for root, dirs, files in os.walk(os.path.join(project_dir, name)):
+            dirs.sort()
+            paths.extend(os.path.join(root, f) for f in sorted(files))
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, project_dir)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def prepare_manifest(force: bool = False, logger=print) -> str:
+    """
+    Return the manifest path, running `dbt deps` + `dbt parse` only when the
+    project changed since the manifest was written. The common case (webserver,
+    daemon and run-worker startup with an unchanged project) costs a directory
+    walk instead of a dbt parse. Concurrent callers serialize on a lock file.
+    """
+    fingerprint = project_fingerprint()
+    if not force and os.path.exists(MANIFEST_PATH) and _read(FINGERPRINT_PATH) == fingerprint:
+        return MANIFEST_PATH
+
+    os.makedirs(TARGET_PATH, exist_ok=True)
+    with open(os.path.join(TARGET_PATH, ".prepare.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        # Another process may have parsed while we waited
+        if not force and os.path.exists(MANIFEST_PATH) and _read(FINGERPRINT_PATH) == fingerprint:
+            return MANIFEST_PATH
+
+        dbt_args = ["--project-dir", DBT_PROJECT_PATH, "--profiles-dir", DBT_PROFILES]
+        if os.path.exists(os.path.join(DBT_PROJECT_PATH, "packages.yml")):
+            logger("[INFO] Installing dbt dependencies")
+            subprocess.run(["dbt", "deps", *dbt_args], check=True)
+        logger("[INFO] Parsing dbt project")
+        subprocess.run(["dbt", "parse", "--quiet", *dbt_args], check=True)
+
+        with open(FINGERPRINT_PATH + ".tmp", "w") as f:
+            f.write(fingerprint)
+        os.replace(FINGERPRINT_PATH + ".tmp", FINGERPRINT_PATH)
+    return MANIFEST_PATH
+
+
+def existing_manifest(logger=print) -> str:
+    """
+    Manifest path for code location imports, which must not shell out to dbt:
+    compose/dagster/start runs prepare_manifest before Dagster starts. A stale
+    manifest is used as is; only a missing one is parsed here.
+    """
+    if not os.path.exists(MANIFEST_PATH):
+        return prepare_manifest(logger=logger)
+    if _read(FINGERPRINT_PATH) != project_fingerprint():
+        logger("[WARN] dbt project changed since the manifest was parsed; "
+               "run `python -m open_quant_kit.utils.dbt_manifest` to refresh it")
+    return MANIFEST_PATH
+
+
+@lru_cache(maxsize=4)
+def _state_checksums(path: str, mtime_ns: int) -> dict[str, str]:
+    with open(path) as f:
+        manifest = json.load(f)
+    return {
+        unique_id: node["checksum"]["checksum"]
+        for unique_id, node in manifest.get("nodes", {}).items()
+        if node.get("checksum")
+    }
+
+
+def state_checksums() -> dict[str, str] | None:
+    """unique_id -> checksum of the state manifest, or None when there is no state yet."""
+    path = os.path.join(STATE_PATH, "manifest.json")
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _state_checksums(path, mtime_ns)
+
+
+def save_state_manifest(manifest_path: str) -> None:
+    """Atomically make `manifest_path` the state manifest."""
+    os.makedirs(STATE_PATH, exist_ok=True)
+    target = os.path.join(STATE_PATH, "manifest.json")
+    shutil.copyfile(manifest_path, target + ".tmp")
+    os.replace(target + ".tmp", target)
+
+
+# CLI entrypoint
+if __name__ == "__main__":
+    path = prepare_manifest()
+    print(f"[DONE] dbt manifest ready at {path}")
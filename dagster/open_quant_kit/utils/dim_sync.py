@@ -0,0 +1,144 @@
+# dagster/open_quant_kit/utils/dim_sync.py
+
+import uuid
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .bulk_load import COPY_CHUNK_ROWS, copy_frame, quote_ident
+
+# A snapshot that would delete more than this share of a dimension is rejected (likely a bad download)
+MAX_DELETE_RATIO = 0.5
+
+
+@dataclass
+class DimSyncResult:
+    """Row changes applied by one sync_dimension call."""
+    sync_id: str = ""
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+    def __str__(self) -> str:
+        return (f"inserted {self.inserted}, updated {self.updated}, deleted {self.deleted}, "
+                f"unchanged {self.unchanged}")
+
+
+def ensure_dim_change_log_schema(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dim_change_log (
+            id BIGSERIAL PRIMARY KEY,
+            sync_id TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            change TEXT NOT NULL CHECK (change IN ('insert', 'update', 'delete')),
+            key JSONB NOT NULL,
+            -- New row for inserts and updates, the removed row for deletes
+            row_data JSONB,
+            changed_at TIMESTAMP NOT NULL DEFAULT now()
+        );
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_dim_change_log_table_changed_at
+        ON dim_change_log (table_name, changed_at);
+    """)
+
+
+def sync_dimension(
+        engine,
+        df: pd.DataFrame,
+        table: str,
+        key_columns: list[str],
+        max_delete_ratio: float = MAX_DELETE_RATIO,
+) -> DimSyncResult:
+    """
+    Make `table` equal to the snapshot `df` by applying only the differences.
+
+    The snapshot is copied into a temporary staging table and compared with
+    `table` by key and by an md5 hash of the remaining columns. Deletes,
+    updates and inserts are applied in one transaction, so readers see either
+    the old or the new dimension, never an empty one, and unchanged rows are
+    not rewritten. Every changed key is appended to dim_change_log.
+    """
+    df = df.drop_duplicates(subset=key_columns, keep="first")
+    columns = list(df.columns)
+    value_columns = [c for c in columns if c not in key_columns]
+    sync_id = uuid.uuid4().hex
+    stage = f"_sync_{table}_{sync_id[:8]}"
+    changes = f"_changes_{table}_{sync_id[:8]}"
+
+    key_list = ", ".join(quote_ident(c) for c in key_columns)
+    key_match = " AND ".join(f"t.{quote_ident(c)} = c.{quote_ident(c)}" for c in key_columns)
+    stage_match = " AND ".join(f"s.{quote_ident(c)} = c.{quote_ident(c)}" for c in key_columns)
+    row_hash = "md5(ROW({})::text)".format(", ".join(quote_ident(c) for c in value_columns) or "NULL")
+    key_json = ", ".join(f"'{c}', c.{quote_ident(c)}" for c in key_columns)
+    assignments = ", ".join(f"{quote_ident(c)} = s.{quote_ident(c)}" for c in value_columns)
+    column_list = ", ".join(quote_ident(c) for c in columns)
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        ensure_dim_change_log_schema(cursor)
+        cursor.execute(f"CREATE TEMP TABLE {stage} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+        copy_frame(cursor, df, stage, COPY_CHUNK_ROWS)
+
+        # FULL JOIN ... USING merges the key columns: unqualified, they hold whichever side exists
+        cursor.execute(f"""
+            CREATE TEMP TABLE {changes} ON COMMIT DROP AS
+            SELECT
+                {key_list},
+                CASE WHEN t.h IS NULL THEN 'insert' WHEN s.h IS NULL THEN 'delete' ELSE 'update' END AS change
+            FROM (SELECT {key_list}, {row_hash} AS h FROM {stage}) s
+            FULL JOIN (SELECT {key_list}, {row_hash} AS h FROM {table}) t USING ({key_list})
+            WHERE s.h IS DISTINCT FROM t.h
+        """)
+
+        cursor.execute(f"SELECT change, COUNT(*) FROM {changes} GROUP BY change")
+        counts = dict(cursor.fetchall())
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        existing = cursor.fetchone()[0]
+        deleting = counts.get("delete", 0)
+        if existing and deleting > existing * max_delete_ratio:
+            raise ValueError(
+                f"Refusing to sync {table}: snapshot would delete {deleting} of {existing} rows"
+            )
+
+        # Logged before applying, while deleted rows can still be read
+        cursor.execute(f"""
+            INSERT INTO dim_change_log (sync_id, table_name, change, key, row_data)
+            SELECT %(sync_id)s, %(table)s, c.change, jsonb_build_object({key_json}), COALESCE(to_jsonb(s), to_jsonb(t))
+            FROM {changes} c
+            LEFT JOIN {stage} s ON {stage_match}
+            LEFT JOIN {table} t ON {key_match}
+        """, {"sync_id": sync_id, "table": table})
+        cursor.execute(f"DELETE FROM {table} t USING {changes} c WHERE c.change = 'delete' AND {key_match}")
+        if value_columns:
+            cursor.execute(f"""
+                UPDATE {table} t SET {assignments}
+                FROM {stage} s JOIN {changes} c ON {stage_match}
+                WHERE c.change = 'update' AND {key_match}
+            """)
+        cursor.execute(f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {", ".join(f"s.{quote_ident(c)}" for c in columns)}
+            FROM {stage} s JOIN {changes} c ON {stage_match}
+            WHERE c.change = 'insert'
+        """)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    return DimSyncResult(
+        sync_id=sync_id,
+        inserted=counts.get("insert", 0),
+        updated=counts.get("update", 0),
+        deleted=deleting,
+        unchanged=len(df) - counts.get("insert", 0) - counts.get("update", 0),
+    )
@@ -0,0 +1,104 @@
+# dagster/open_quant_kit/utils/http.py
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .telemetry import current_telemetry
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def build_session(user_agent: str, pool_size: int = 10) -> requests.Session:
+    """Session with a keep-alive connection pool sized for `pool_size` concurrent workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": user_agent, "Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def _retry_delay(response: requests.Response | None, attempt: int, backoff_seconds: float) -> float:
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    # Exponential backoff with full jitter so workers do not retry in lockstep
+    return random.uniform(0, backoff_seconds * (2 ** attempt))
+
+
+def _count_bytes(telemetry, response: requests.Response, stream: bool) -> None:
+    # Content-Length is the size on the wire, i.e. before gzip decoding
+    length = response.headers.get("Content-Length", "")
+    if length.isdigit():
+        telemetry.inc("http_bytes_downloaded", int(length))
+    elif not stream:
+        telemetry.inc("http_bytes_downloaded", len(response.content))
+
+
+def get_with_retry(
+        session: requests.Session,
+        url: str,
+        rate_limiter: TokenBucket | None = None,
+        max_retries: int = 5,
+        backoff_seconds: float = 1.0,
+        timeout: float = 30,
+        **kwargs,
+) -> requests.Response:
+    """GET `url`, retrying connection errors and 429/5xx responses with jittered backoff."""
+    telemetry = current_telemetry()
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+
+        response = None
+        telemetry.inc("http_requests")
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == max_retries:
+                telemetry.inc("http_errors")
+                raise
+        else:
+            # Time to response headers; streamed bodies are read later by the caller
+            telemetry.observe("http_request_seconds", time.perf_counter() - start)
+            if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                if response.status_code >= 400:
+                    telemetry.inc("http_errors")
+                response.raise_for_status()
+                _count_bytes(telemetry, response, kwargs.get("stream", False))
+                return response
+            response.close()
+
+        telemetry.inc("http_retries")
+        time.sleep(_retry_delay(response, attempt, backoff_seconds))
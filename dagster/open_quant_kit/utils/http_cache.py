@@ -0,0 +1,240 @@
+# dagster/open_quant_kit/utils/http_cache.py
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Callable, NamedTuple
+
+import requests
+
+from .http import TokenBucket, get_with_retry
+
+HTTP_CACHE_DIR = os.getenv("OQK_HTTP_CACHE_DIR", "/tmp/oqk_http_cache")
+HTTP_CACHE_MAX_BYTES = int(os.getenv("OQK_HTTP_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+DOWNLOAD_CHUNK_BYTES = 1 << 16
+# Eviction trims the cache to this fraction of its cap, so the directory scan runs rarely
+HTTP_CACHE_LOW_WATER = 0.9
+# Same settle period raw_filing_index uses before treating a quarter's index as final
+QUARTER_SETTLE_DAYS = 7
+
+_FULL_INDEX_RE = re.compile(r"/Archives/edgar/full-index/(\d{4})/QTR([1-4])/")
+
+
+def is_immutable_sec_url(url: str) -> bool:
+    """Filed documents and feed archives never change, nor do full-index files of settled quarters."""
+    if "/Archives/edgar/data/" in url or "/Archives/edgar/Feed/" in url:
+        return True
+    match = _FULL_INDEX_RE.search(url)
+    if match:
+        year, quarter = int(match.group(1)), int(match.group(2))
+        next_quarter_start = date(year + quarter // 4, quarter % 4 * 3 + 1, 1)
+        return date.today() >= next_quarter_start + timedelta(days=QUARTER_SETTLE_DAYS)
+    return False
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    bytes_downloaded: int = 0
+    bytes_served: int = 0
+    evicted: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class CachedResponse(NamedTuple):
+    url: str
+    path: str
+    etag: str | None
+    last_modified: str | None
+    from_cache: bool
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class HttpCache:
+    """
+    On-disk HTTP cache with conditional revalidation and size-based LRU eviction.
+
+    Bodies are stored as files named by the SHA-256 of the URL, with a JSON
+    sidecar holding ETag/Last-Modified. URLs for which `immutable(url)` is true
+    are served from disk without touching the network.
+    """
+
+    def __init__(
+            self,
+            cache_dir: str = HTTP_CACHE_DIR,
+            max_bytes: int = HTTP_CACHE_MAX_BYTES,
+            immutable: Callable[[str], bool] = is_immutable_sec_url,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.immutable = immutable
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._size = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        directory = os.path.join(self.cache_dir, digest[:2])
+        return os.path.join(directory, digest), os.path.join(directory, digest + ".json")
+
+    def _load_meta(self, url: str) -> dict | None:
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if os.path.exists(body_path) else None
+
+    def _hit(self, url: str, meta: dict, revalidated: bool) -> CachedResponse | None:
+        """The cached entry, or None when another process evicted its body meanwhile."""
+        body_path, _ = self._paths(url)
+        # Bump mtime: eviction removes the least recently used bodies first
+        try:
+            os.utime(body_path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.revalidated += int(revalidated)
+            self.stats.bytes_served += meta.get("size", 0)
+        return CachedResponse(url, body_path, meta.get("etag"), meta.get("last_modified"), True)
+
+    def get(
+            self,
+            session: requests.Session,
+            url: str,
+            rate_limiter: TokenBucket | None = None,
+            **kwargs,
+    ) -> CachedResponse:
+        meta = self._load_meta(url)
+        base_headers = dict(kwargs.pop("headers", None) or {})
+        headers = dict(base_headers)
+
+        if meta is not None:
+            if self.immutable(url):
+                hit = self._hit(url, meta, revalidated=False)
+                if hit is not None:
+                    return hit
+                meta = None
+            else:
+                if meta.get("etag"):
+                    headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    headers["If-Modified-Since"] = meta["last_modified"]
+
+        with get_with_retry(session, url, rate_limiter=rate_limiter, stream=True, headers=headers,
+                            **kwargs) as response:
+            if response.status_code != 304 or meta is None:
+                return self._store(url, response)
+            hit = self._hit(url, meta, revalidated=True)
+            if hit is not None:
+                return hit
+
+        # Evicted between the 304 and the hit: fetch the body unconditionally
+        with get_with_retry(session, url, rate_limiter=rate_limiter, stream=True, headers=base_headers,
+                            **kwargs) as response:
+            return self._store(url, response)
+
+    def _store(self, url: str, response: requests.Response) -> CachedResponse:
+        body_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(body_path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, body_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "size": size,
+            "stored_at": time.time(),
+        }
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+        with self._lock:
+            self.stats.misses += 1
+            self.stats.bytes_downloaded += size
+            if self._size is not None:
+                self._size += size
+        self._evict_if_needed()
+        return CachedResponse(url, body_path, meta["etag"], meta["last_modified"], False)
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith((".json", ".part")):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict_if_needed(self) -> None:
+        """
+        Once the running size total passes the cap, scan the cache once and
+        remove the least recently used bodies down to the low-water mark. The
+        scan also resyncs the total with what other processes wrote or evicted.
+        """
+        with self._lock:
+            if self._size is not None and self._size <= self.max_bytes:
+                return
+
+            entries = sorted(self._scan())
+            self._size = sum(size for _, size, _ in entries)
+            if self._size <= self.max_bytes:
+                return
+            low_water = self.max_bytes * HTTP_CACHE_LOW_WATER
+            for _, size, path in entries:
+                if self._size <= low_water:
+                    break
+                for stale in (path, path + ".json"):
+                    try:
+                        os.unlink(stale)
+                    except OSError:
+                        pass
+                self._size -= size
+                self.stats.evicted += 1
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> HttpCache | None:
+    """Process-wide cache rooted at OQK_HTTP_CACHE_DIR; set it to an empty string to disable caching."""
+    global _default_cache
+    if not HTTP_CACHE_DIR:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+        return _default_cache
@@ -0,0 +1,299 @@
+# dagster/open_quant_kit/utils/telemetry.py
+
+import bisect
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from dagster import MaterializeResult, MetadataValue
+
+# Prometheus textfile-collector directory; unset means no .prom files are written
+METRICS_DIR = os.getenv("OQK_METRICS_DIR", "")
+# Sampling profiler: runs at least this long get a profile attached; unset disables profiling
+PROFILE_MIN_SECONDS = float(os.getenv("OQK_PROFILE_MIN_SECONDS", "0") or 0)
+PROFILE_INTERVAL_SECONDS = float(os.getenv("OQK_PROFILE_INTERVAL_SECONDS", "0.01"))
+PROFILE_DIR = os.getenv("OQK_PROFILE_DIR", tempfile.gettempdir())
+PROGRESS_INTERVAL_SECONDS = float(os.getenv("OQK_PROGRESS_INTERVAL_SECONDS", "30"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus style); quantiles are interpolated within buckets."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.50), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6),
+        }
+
+
+class Telemetry:
+    """Thread-safe counters and histograms for one asset run."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counters: Counter = Counter()
+        self.histograms: dict[str, Histogram] = {}
+        self.started = time.monotonic()
+        # (path, markdown summary) of the sampling profile, when one was taken
+        self.profile: tuple[str, str] | None = None
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def record_write(self, table: str, seconds: float, written: int, skipped: int = 0) -> None:
+        with self._lock:
+            self.counters["db_rows_written"] += written
+            self.counters["db_rows_skipped"] += skipped
+            self.counters[f"db_rows_written.{table}"] += written
+        self.observe("db_write_seconds", seconds)
+
+    def as_metadata(self) -> dict:
+        with self._lock:
+            metadata = {"duration_seconds": round(time.monotonic() - self.started, 3)}
+            for name, value in sorted(self.counters.items()):
+                metadata[name] = value
+            writes = self.histograms.get("db_write_seconds")
+            if writes is not None and writes.sum > 0:
+                metadata["db_rows_per_second"] = round(self.counters["db_rows_written"] / writes.sum, 1)
+            for name, histogram in sorted(self.histograms.items()):
+                metadata[name] = MetadataValue.json(histogram.summary())
+        return metadata
+
+    def to_prometheus(self) -> str:
+        label = f'asset="{self.name}"'
+        lines = []
+        with self._lock:
+            typed = set()
+            for name, value in sorted(self.counters.items()):
+                metric, _, table = name.partition(".")
+                labels = f'{label},table="{table}"' if table else label
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE oqk_{metric}_total counter")
+                lines.append(f"oqk_{metric}_total{{{labels}}} {value}")
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f"# TYPE oqk_{name} histogram")
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'oqk_{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'oqk_{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f"oqk_{name}_sum{{{label}}} {histogram.sum}")
+                lines.append(f"oqk_{name}_count{{{label}}} {histogram.count}")
+        lines.append("# TYPE oqk_run_duration_seconds gauge")
+        lines.append(f"oqk_run_duration_seconds{{{label}}} {time.monotonic() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, metrics_dir: str = METRICS_DIR) -> str | None:
+        """Write <metrics_dir>/oqk_<name>.prom atomically, for node_exporter's textfile collector."""
+        if not metrics_dir:
+            return None
+        os.makedirs(metrics_dir, exist_ok=True)
+        path = os.path.join(metrics_dir, f"oqk_{self.name}.prom")
+        fd, tmp_path = tempfile.mkstemp(dir=metrics_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+
+# Process-wide active telemetry: worker threads record into it without the
+# object being threaded through every helper. Outside a run, records are discarded.
+_discard = Telemetry("discard")
+_active: Telemetry | None = None
+
+
+def current_telemetry() -> Telemetry:
+    return _active if _active is not None else _discard
+
+
+@contextmanager
+def activate(telemetry: Telemetry):
+    global _active
+    previous, _active = _active, telemetry
+    try:
+        yield telemetry
+    finally:
+        _active = previous
+
+
+class SamplingProfiler:
+    """
+    Samples every thread's Python stack at a fixed interval from a background
+    thread and aggregates them as folded stacks (flamegraph.pl / speedscope input).
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="oqk-sampling-profiler", daemon=True)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path: str) -> str:
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def top_functions(self, limit: int = 15) -> str:
+        """Markdown table of the functions most often on top of a sampled stack."""
+        leaves: Counter = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        rows = ["| function | samples | share |", "|---|---:|---:|"]
+        rows += [f"| `{name}` | {count} | {count / total:.1%} |" for name, count in leaves.most_common(limit)]
+        return "\n".join(rows)
+
+
+class ProgressReporter:
+    """Logs progress at most once per `interval` seconds, plus once when closed."""
+
+    def __init__(self, total: int, desc: str, logger=print, interval: float = PROGRESS_INTERVAL_SECONDS):
+        self.total = total
+        self.desc = desc
+        self.logger = logger
+        self.interval = interval
+        self.done = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def update(self, n: int = 1) -> None:
+        with self._lock:
+            self.done += n
+            now = time.monotonic()
+            if now - self._last_report < self.interval:
+                return
+            self._last_report = now
+        self._report(now)
+
+    def _report(self, now: float) -> None:
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.done / elapsed
+        message = f"[PROGRESS] {self.desc}: {self.done}/{self.total} ({self.done / max(self.total, 1):.0%}), {rate:.1f}/s"
+        if 0 < self.done < self.total and rate > 0:
+            message += f", ETA {(self.total - self.done) / rate:.0f}s"
+        self.logger(message)
+
+    def close(self) -> None:
+        self._report(time.monotonic())
+
+    def __enter__(self) -> "ProgressReporter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@contextmanager
+def asset_telemetry(context):
+    """
+    Collect telemetry for one asset run; pass the yielded object to
+    `materialize_result`. Also writes the Prometheus text file and, for runs
+    slower than OQK_PROFILE_MIN_SECONDS, a folded-stack profile.
+    """
+    name = context.asset_key.to_user_string().replace("/", "_")
+    telemetry = Telemetry(name)
+    profiler = SamplingProfiler().start() if PROFILE_MIN_SECONDS > 0 else None
+    try:
+        with activate(telemetry):
+            yield telemetry
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            elapsed = time.monotonic() - telemetry.started
+            if elapsed >= PROFILE_MIN_SECONDS and profiler.samples:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                path = profiler.write_folded(os.path.join(PROFILE_DIR, f"{name}-{context.run_id}.folded"))
+                telemetry.profile = (path, profiler.top_functions())
+                context.log.info(f"[INFO] Run took {elapsed:.0f}s, profile written to {path}")
+        try:
+            telemetry.write_prometheus()
+        except OSError as e:
+            context.log.warning(f"[WARN] Could not write Prometheus metrics: {e}")
+
+
+def materialize_result(telemetry: Telemetry, **metadata) -> MaterializeResult:
+    """MaterializeResult carrying the run's telemetry plus any extra metadata."""
+    merged = telemetry.as_metadata()
+    merged.update(metadata)
+    if telemetry.profile is not None:
+        path, top_functions = telemetry.profile
+        merged["profile_path"] = MetadataValue.path(path)
+        merged["profile_top_functions"] = MetadataValue.md(top_functions)
+    return MaterializeResult(metadata=merged)